@@ -0,0 +1,10 @@
+"""
+Async counterparts of app.api.crud for request handlers.
+
+The sync modules in app.api.crud stay in use by Celery workers and the
+webhook consumer. Relationships that routes read are loaded eagerly here,
+since lazy loads are not available on an AsyncSession.
+"""
+from app.api.async_crud import user, project, deployment, domain
+
+__all__ = ["user", "project", "deployment", "domain"]
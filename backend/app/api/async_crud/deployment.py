@@ -0,0 +1,187 @@
+import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer
+
+from app.core.config import settings
+from app.core.pagination import Cursor, encode_cursor
+from app.db.models import Deployment, Project
+from app.db.partitions import retention_cutoff
+from app.api.schemas.deployment import DeploymentCreate
+from app.services.routing import publish_route_invalidation_async
+
+# Deployment responses embed the project, the user and legacy build logs
+DEPLOYMENT_LOAD_OPTIONS = (
+    selectinload(Deployment.project),
+    selectinload(Deployment.user),
+    undefer(Deployment.build_logs),
+)
+
+
+async def get_by_id(db: AsyncSession, deployment_id: str) -> Optional[Deployment]:
+    return await db.scalar(
+        select(Deployment)
+        .options(*DEPLOYMENT_LOAD_OPTIONS)
+        .where(Deployment.id == deployment_id)
+    )
+
+
+def history_filter(query, user_id: Optional[str], project_id: Optional[str]):
+    if user_id is not None:
+        query = query.where(Deployment.user_id == user_id)
+    if project_id is not None:
+        query = query.where(Deployment.project_id == project_id)
+    return query
+
+
+async def get_summaries(
+    db: AsyncSession,
+    *,
+    fields: Sequence[str],
+    user_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    cursor: Optional[Cursor] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Newest deployments of a user or project as plain rows holding only
+    `fields`, in a single query. `project_name` joins the project.
+    
+    Pages are keyset paginated on (created_at, id), which the
+    (user_id | project_id, created_at desc, id) indexes serve directly.
+    Rows inside the retention window are read first with a created_at
+    bound, so only its partitions are scanned; older partitions, which
+    hold just production and restored deployments, are only read once a
+    page runs past the window. Returns the rows and the cursor of the next
+    page, if any.
+    """
+    columns = [
+        Project.name.label("project_name") if field == "project_name" else getattr(Deployment, field)
+        for field in fields
+    ]
+    if "created_at" not in fields:
+        columns.append(Deployment.created_at)
+    query = history_filter(select(*columns).select_from(Deployment), user_id, project_id)
+    if "project_name" in fields:
+        query = query.outerjoin(Project, Project.id == Deployment.project_id)
+    if cursor:
+        query = query.where(tuple_(Deployment.created_at, Deployment.id) < tuple_(*cursor))
+    
+    async def fetch(query, count: int) -> List[Dict[str, Any]]:
+        result = await db.execute(
+            query.order_by(Deployment.created_at.desc(), Deployment.id.desc()).limit(count)
+        )
+        return [dict(row) for row in result.mappings()]
+    
+    cutoff = retention_cutoff()
+    if skip and not cursor:
+        # Offsets can't be split across the two ranges
+        rows = await fetch(query.offset(skip), limit + 1)
+    elif cutoff is None:
+        rows = await fetch(query, limit + 1)
+    else:
+        rows = []
+        if not cursor or cursor[0] >= cutoff:
+            rows = await fetch(query.where(Deployment.created_at >= cutoff), limit + 1)
+        if len(rows) <= limit:
+            rows += await fetch(query.where(Deployment.created_at < cutoff), limit + 1 - len(rows))
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    if "created_at" not in fields:
+        for row in rows:
+            del row["created_at"]
+    return rows, next_cursor
+
+
+async def estimate_count(
+    db: AsyncSession, *, user_id: Optional[str] = None, project_id: Optional[str] = None
+) -> Tuple[int, bool]:
+    """
+    Count a user's or project's deployments, stopping at
+    DEPLOYMENT_COUNT_ESTIMATE_CAP so the count stays an index-only scan of
+    bounded size. Partitions before the retention window are only counted
+    when the window itself stays under the cap. Returns the count and
+    whether it hit the cap.
+    """
+    cap = settings.DEPLOYMENT_COUNT_ESTIMATE_CAP
+    query = history_filter(select(Deployment.id), user_id, project_id)
+    
+    async def count(query, limit: int) -> int:
+        return await db.scalar(select(func.count()).select_from(query.limit(limit + 1).subquery()))
+    
+    cutoff = retention_cutoff()
+    if cutoff is None:
+        total = await count(query, cap)
+    else:
+        total = await count(query.where(Deployment.created_at >= cutoff), cap)
+        if total <= cap:
+            total += await count(query.where(Deployment.created_at < cutoff), cap - total)
+    return min(total, cap), total > cap
+
+
+async def create(
+    db: AsyncSession, *, obj_in: DeploymentCreate, user_id: str, branch: Optional[str] = None
+) -> Deployment:
+    created_at = datetime.datetime.utcnow()
+    db_obj = Deployment(
+        commit_hash=obj_in.commit_hash,
+        commit_message=obj_in.commit_message,
+        project_id=obj_in.project_id,
+        branch=branch,
+        user_id=user_id,
+        created_at=created_at,
+    )
+    db.add(db_obj)
+    # Kept on the project for sorting project lists by activity
+    await db.execute(
+        update(Project)
+        .where(Project.id == obj_in.project_id)
+        .values(last_deployment_at=created_at)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return await get_by_id(db, db_obj.id)
+
+
+async def cancel_superseded(
+    db: AsyncSession,
+    *,
+    project_id: str,
+    branch: Optional[str],
+    created_before: datetime.datetime,
+    superseded_by: str,
+    stages: List[str],
+) -> List[str]:
+    """
+    Cancel older deployments of a project and branch that are still queued,
+    or building but only in one of `stages`. Returns the canceled ids.
+    """
+    result = await db.scalars(
+        update(Deployment)
+        .where(Deployment.project_id == project_id)
+        .where(Deployment.branch == branch)
+        .where(Deployment.created_at < created_before)
+        .where(
+            (Deployment.status == "queued")
+            | ((Deployment.status == "building") & Deployment.stage.in_(stages))
+        )
+        .values(status="canceled", error_message=f"Superseded by deployment {superseded_by}")
+        .returning(Deployment.id)
+        .execution_options(synchronize_session=False)
+    )
+    deployment_ids = list(result)
+    await db.commit()
+    return deployment_ids
+
+
+async def remove(db: AsyncSession, *, deployment: Deployment) -> Deployment:
+    await db.delete(deployment)
+    await db.commit()
+    await publish_route_invalidation_async(deployment.project_id)
+    return deployment
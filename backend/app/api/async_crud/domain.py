@@ -0,0 +1,73 @@
+import random
+import string
+from typing import List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Domain
+from app.api.schemas.domain import DomainCreate, DomainUpdate
+from app.services.routing import publish_route_invalidation_async
+
+
+async def get_domain(db: AsyncSession, domain_id: str) -> Optional[Domain]:
+    """Get a domain by ID."""
+    return await db.get(Domain, domain_id)
+
+
+async def get_domain_by_name(db: AsyncSession, name: str) -> Optional[Domain]:
+    """Get a domain by name."""
+    return await db.scalar(select(Domain).where(Domain.name == name))
+
+
+async def get_domains_by_project(db: AsyncSession, project_id: str) -> List[Domain]:
+    """Get all domains for a project."""
+    result = await db.scalars(select(Domain).where(Domain.project_id == project_id))
+    return list(result)
+
+
+async def create_domain(db: AsyncSession, domain: DomainCreate, project_id: str) -> Domain:
+    """Create a new domain."""
+    # Generate a random verification code
+    verification_code = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
+    
+    db_domain = Domain(
+        name=domain.name,
+        verified=False,
+        verification_code=verification_code,
+        project_id=project_id
+    )
+    db.add(db_domain)
+    await db.commit()
+    await db.refresh(db_domain)
+    await publish_route_invalidation_async(db_domain.project_id)
+    return db_domain
+
+
+async def update_domain(db: AsyncSession, db_domain: Domain, domain_update: DomainUpdate) -> Domain:
+    """Update a domain."""
+    update_data = domain_update.dict(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_domain, field, value)
+    
+    await db.commit()
+    await db.refresh(db_domain)
+    await publish_route_invalidation_async(db_domain.project_id)
+    return db_domain
+
+
+async def verify_domain(db: AsyncSession, db_domain: Domain) -> Domain:
+    """Mark a domain as verified."""
+    db_domain.verified = True
+    await db.commit()
+    await db.refresh(db_domain)
+    await publish_route_invalidation_async(db_domain.project_id)
+    return db_domain
+
+
+async def delete_domain(db: AsyncSession, db_domain: Domain) -> bool:
+    """Delete a domain."""
+    await db.delete(db_domain)
+    await db.commit()
+    await publish_route_invalidation_async(db_domain.project_id)
+    return True
@@ -0,0 +1,123 @@
+import logging
+import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import Cursor
+from app.core.redis import get_async_redis
+from app.core.repository import normalize_repository_url
+from app.db.models import Project, project_team_members
+from app.api.crud.project import paginate_projects, repo_cache_key, user_projects_query
+from app.api.schemas.project import ProjectCreate, ProjectUpdate
+from app.services.principals import publish_principal_invalidation_async
+from app.services.routing import publish_route_invalidation_async
+
+logger = logging.getLogger(__name__)
+
+
+async def invalidate_repo_cache(*pairs: Tuple[Optional[str], Optional[str]]):
+    """Drop cached project ids of the given (repo_key, branch) pairs"""
+    keys = [repo_cache_key(repo_key, branch) for repo_key, branch in pairs if repo_key]
+    if not keys:
+        return
+    try:
+        await get_async_redis().delete(*keys)
+    except Exception as e:
+        logger.error(f"Error invalidating repository cache: {e}")
+
+
+async def get_by_id(db: AsyncSession, project_id: str) -> Optional[Project]:
+    return await db.get(Project, project_id)
+
+
+async def get_user_projects(
+    db: AsyncSession,
+    *,
+    user_id: str,
+    sort: str = "created",
+    cursor: Optional[Cursor] = None,
+    deployed_after: Optional[datetime.datetime] = None,
+    limit: int = 100,
+) -> Tuple[List[Project], Optional[str]]:
+    """Get a page of the projects a user has access to (owned + team) and the next cursor"""
+    projects = await db.scalars(user_projects_query(
+        user_id=user_id, sort=sort, cursor=cursor, deployed_after=deployed_after, limit=limit
+    ))
+    return paginate_projects(list(projects), sort, limit)
+
+
+async def create(
+    db: AsyncSession, *, obj_in: ProjectCreate, owner_id: str
+) -> Project:
+    db_obj = Project(
+        name=obj_in.name,
+        description=obj_in.description,
+        repository_url=obj_in.repository_url,
+        repo_key=normalize_repository_url(obj_in.repository_url),
+        branch=obj_in.branch,
+        build_command=obj_in.build_command,
+        output_directory=obj_in.output_directory,
+        environment_variables=obj_in.environment_variables,
+        fetch_strategy=obj_in.fetch_strategy,
+        sparse_paths=obj_in.sparse_paths,
+        deployment_mode=obj_in.deployment_mode,
+        webhook_secret=obj_in.webhook_secret,
+        owner_id=owner_id,
+    )
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    await invalidate_repo_cache((db_obj.repo_key, db_obj.branch))
+    await publish_principal_invalidation_async([owner_id])
+    return db_obj
+
+
+async def update(
+    db: AsyncSession, *, db_obj: Project, obj_in: Union[ProjectUpdate, Dict[str, Any]]
+) -> Project:
+    if isinstance(obj_in, dict):
+        update_data = obj_in
+    else:
+        update_data = obj_in.dict(exclude_unset=True)
+    
+    previous = (db_obj.repo_key, db_obj.branch)
+    for field, value in update_data.items():
+        setattr(db_obj, field, value)
+    if "repository_url" in update_data:
+        db_obj.repo_key = normalize_repository_url(db_obj.repository_url or "")
+        
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    await invalidate_repo_cache(previous, (db_obj.repo_key, db_obj.branch))
+    return db_obj
+
+
+async def remove(db: AsyncSession, *, project_id: str) -> Optional[Project]:
+    project = await db.get(Project, project_id)
+    if not project:
+        return None
+    team_member_ids = await db.scalars(
+        select(project_team_members.c.user_id).where(project_team_members.c.project_id == project_id)
+    )
+    member_ids = [project.owner_id, *team_member_ids]
+    await db.delete(project)
+    await db.commit()
+    await publish_route_invalidation_async(project_id)
+    await invalidate_repo_cache((project.repo_key, project.branch))
+    await publish_principal_invalidation_async(member_ids)
+    return project
+
+
+async def update_project_env_vars(
+    db: AsyncSession, *, db_obj: Project, env_vars: Dict[str, str]
+) -> Project:
+    """
+    Update a project's environment variables.
+    """
+    db_obj.environment_variables = env_vars
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj
@@ -0,0 +1,86 @@
+from typing import Any, Dict, Optional, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import password_hasher
+from app.db.models import User
+from app.api.schemas.user import UserCreate, UserUpdate
+from app.services.principals import publish_principal_invalidation_async
+
+
+async def get_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
+    return await db.get(User, user_id)
+
+
+async def get_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.email == email))
+
+
+async def get_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.username == username))
+
+
+async def get_multi(
+    db: AsyncSession, *, skip: int = 0, limit: int = 100
+) -> list[User]:
+    result = await db.scalars(select(User).offset(skip).limit(limit))
+    return list(result)
+
+
+async def create(db: AsyncSession, *, obj_in: UserCreate) -> User:
+    # Hashing is CPU bound, keep it off the event loop
+    hashed_password = await password_hasher.hash(obj_in.password)
+    db_obj = User(
+        email=obj_in.email,
+        username=obj_in.username,
+        hashed_password=hashed_password,
+        full_name=obj_in.full_name,
+        is_superuser=obj_in.is_superuser,
+        is_active=obj_in.is_active,
+    )
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj
+
+
+async def update(
+    db: AsyncSession, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
+) -> User:
+    if isinstance(obj_in, dict):
+        update_data = obj_in
+    else:
+        update_data = obj_in.dict(exclude_unset=True)
+    
+    if update_data.get("password"):
+        hashed_password = await password_hasher.hash(update_data["password"])
+        del update_data["password"]
+        update_data["hashed_password"] = hashed_password
+    
+    for field, value in update_data.items():
+        setattr(db_obj, field, value)
+        
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    await publish_principal_invalidation_async([db_obj.id])
+    return db_obj
+
+
+async def authenticate(
+    db: AsyncSession, *, email: str, password: str
+) -> Optional[User]:
+    user = await get_by_email(db=db, email=email)
+    if not user:
+        return None
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
+        return None
+    
+    # Upgrade hashes made with an outdated cost while we have the password
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
+
@@ -1,3 +1,3 @@
-from app.api.crud import user, project, deployment, domain
+from app.api.crud import user, project, deployment, domain, build_cache
 
-__all__ = ["user", "project", "deployment", "domain"] 
\ No newline at end of file
+__all__ = ["user", "project", "deployment", "domain", "build_cache"] 
\ No newline at end of file
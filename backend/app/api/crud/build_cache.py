@@ -0,0 +1,91 @@
+from typing import List, Optional
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import BuildFingerprint
+
+
+def get_by_fingerprint(db: Session, fingerprint: str) -> Optional[BuildFingerprint]:
+    return db.query(BuildFingerprint).filter(BuildFingerprint.fingerprint == fingerprint).first()
+
+
+def record(
+    db: Session,
+    *,
+    fingerprint: str,
+    project_id: str,
+    deployment_id: str,
+    image_tag: Optional[str] = None,
+    artifact_path: Optional[str] = None
+) -> BuildFingerprint:
+    """Store the output of a successful build under its fingerprint"""
+    db_obj = get_by_fingerprint(db, fingerprint=fingerprint)
+    if not db_obj:
+        db_obj = BuildFingerprint(fingerprint=fingerprint)
+    
+    db_obj.image_tag = image_tag
+    db_obj.artifact_path = artifact_path
+    db_obj.project_id = project_id
+    db_obj.deployment_id = deployment_id
+    db_obj.last_used_at = datetime.datetime.utcnow()
+    
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+
+def mark_used(db: Session, *, db_obj: BuildFingerprint) -> BuildFingerprint:
+    db_obj.last_used_at = datetime.datetime.utcnow()
+    db_obj.hit_count = (db_obj.hit_count or 0) + 1
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+
+def remove(db: Session, *, fingerprint: str) -> Optional[BuildFingerprint]:
+    db_obj = get_by_fingerprint(db, fingerprint=fingerprint)
+    if not db_obj:
+        return None
+    db.delete(db_obj)
+    db.commit()
+    return db_obj
+
+
+def evict(
+    db: Session, *, max_age_days: int, max_entries_per_project: int
+) -> int:
+    """
+    Drop fingerprints unused for `max_age_days`, then trim each project to
+    its `max_entries_per_project` most recently used entries.
+    Returns the number of removed rows.
+    """
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=max_age_days)
+    removed = (
+        db.query(BuildFingerprint)
+        .filter(BuildFingerprint.last_used_at < cutoff)
+        .delete(synchronize_session=False)
+    )
+    
+    project_ids: List[str] = [
+        row.project_id for row in db.query(BuildFingerprint.project_id).distinct()
+    ]
+    for project_id in project_ids:
+        stale = (
+            db.query(BuildFingerprint.fingerprint)
+            .filter(BuildFingerprint.project_id == project_id)
+            .order_by(BuildFingerprint.last_used_at.desc())
+            .offset(max_entries_per_project)
+            .subquery()
+        )
+        removed += (
+            db.query(BuildFingerprint)
+            .filter(BuildFingerprint.fingerprint.in_(select(stale.c.fingerprint)))
+            .delete(synchronize_session=False)
+        )
+    
+    db.commit()
+    return removed
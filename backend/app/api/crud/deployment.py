@@ -1,8 +1,13 @@
+import datetime
 from typing import Any, Dict, Optional, Union, List
 from sqlalchemy.orm import Session
 
 from app.db.models import Deployment, Project
 from app.api.schemas.deployment import DeploymentCreate, DeploymentUpdate
+from app.services.routing import publish_route_invalidation
+
+# Fields that change where a deployment's hosts are routed
+ROUTING_FIELDS = {"status", "upstream_url", "artifact_path", "scaled_to_zero"}
 
 
 def get_by_id(db: Session, deployment_id: str) -> Optional[Deployment]:
@@ -41,16 +46,45 @@ def get_by_user(
     )
 
 
+def get_with_legacy_build_logs(db: Session, *, limit: int = 100) -> List[Deployment]:
+    """Deployments whose build logs are still stored in the build_logs column"""
+    return (
+        db.query(Deployment)
+        .filter(Deployment.build_logs.isnot(None))
+        .filter(Deployment.status.notin_(["queued", "building"]))
+        .limit(limit)
+        .all()
+    )
+
+
+def get_running_containers(db: Session) -> List[Deployment]:
+    """Ready container deployments that have not been scaled to zero"""
+    return (
+        db.query(Deployment)
+        .filter(Deployment.status == "ready")
+        .filter(Deployment.upstream_url.isnot(None))
+        .filter(Deployment.scaled_to_zero.isnot(True))
+        .all()
+    )
+
+
 def create(
-    db: Session, *, obj_in: DeploymentCreate, user_id: str
+    db: Session, *, obj_in: DeploymentCreate, user_id: str, branch: Optional[str] = None
 ) -> Deployment:
+    created_at = datetime.datetime.utcnow()
     db_obj = Deployment(
         commit_hash=obj_in.commit_hash,
         commit_message=obj_in.commit_message,
         project_id=obj_in.project_id,
+        branch=branch,
         user_id=user_id,
+        created_at=created_at,
     )
     db.add(db_obj)
+    # Kept on the project for sorting project lists by activity
+    db.query(Project).filter(Project.id == obj_in.project_id).update(
+        {"last_deployment_at": created_at}, synchronize_session=False
+    )
     db.commit()
     db.refresh(db_obj)
     return db_obj
@@ -70,6 +104,9 @@ def update(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    
+    if ROUTING_FIELDS.intersection(update_data):
+        publish_route_invalidation(db_obj.project_id)
     return db_obj
 
 
@@ -84,13 +121,63 @@ def update_status(
     db.add(deployment)
     db.commit()
     db.refresh(deployment)
+    publish_route_invalidation(deployment.project_id)
     return deployment
 
 
+def start_stage(db: Session, *, db_obj: Deployment, stage: str) -> bool:
+    """
+    Move a deployment into a pipeline stage unless it has been canceled,
+    in a single conditional update so a concurrent cancel is never lost.
+    """
+    updated = (
+        db.query(Deployment)
+        .filter(Deployment.id == db_obj.id, Deployment.status != "canceled")
+        .update({"status": "building", "stage": stage}, synchronize_session=False)
+    )
+    db.commit()
+    db.refresh(db_obj)
+    return bool(updated)
+
+
+def cancel_superseded(
+    db: Session,
+    *,
+    project_id: str,
+    branch: Optional[str],
+    created_before: datetime.datetime,
+    superseded_by: str,
+    stages: List[str],
+) -> List[str]:
+    """
+    Cancel older deployments of a project and branch that are still queued,
+    or building but only in one of `stages`. Returns the canceled ids.
+    """
+    query = (
+        db.query(Deployment)
+        .filter(Deployment.project_id == project_id)
+        .filter(Deployment.branch == branch)
+        .filter(Deployment.created_at < created_before)
+        .filter(
+            (Deployment.status == "queued")
+            | ((Deployment.status == "building") & Deployment.stage.in_(stages))
+        )
+    )
+    deployment_ids = [deployment.id for deployment in query.with_entities(Deployment.id)]
+    if deployment_ids:
+        query.filter(Deployment.id.in_(deployment_ids)).update(
+            {"status": "canceled", "error_message": f"Superseded by deployment {superseded_by}"},
+            synchronize_session=False,
+        )
+        db.commit()
+    return deployment_ids
+
+
 def remove(db: Session, *, deployment_id: str) -> Optional[Deployment]:
     deployment = db.query(Deployment).filter(Deployment.id == deployment_id).first()
     if not deployment:
         return None
     db.delete(deployment)
     db.commit()
+    publish_route_invalidation(deployment.project_id)
     return deployment 
\ No newline at end of file
@@ -4,8 +4,9 @@ import uuid
 import random
 import string
 
-from app.models.domain import Domain
+from app.db.models import Domain
 from app.api.schemas.domain import DomainCreate, DomainUpdate
+from app.services.routing import publish_route_invalidation
 
 
 def get_domain(db: Session, domain_id: str) -> Optional[Domain]:
@@ -38,6 +39,7 @@ def create_domain(db: Session, domain: DomainCreate, project_id: str) -> Domain:
     db.add(db_domain)
     db.commit()
     db.refresh(db_domain)
+    publish_route_invalidation(db_domain.project_id)
     return db_domain
 
 
@@ -53,6 +55,7 @@ def update_domain(db: Session, domain_id: str, domain_update: DomainUpdate) -> O
     
     db.commit()
     db.refresh(db_domain)
+    publish_route_invalidation(db_domain.project_id)
     return db_domain
 
 
@@ -65,6 +68,7 @@ def verify_domain(db: Session, domain_id: str) -> Optional[Domain]:
     db_domain.verified = True
     db.commit()
     db.refresh(db_domain)
+    publish_route_invalidation(db_domain.project_id)
     return db_domain
 
 
@@ -76,4 +80,5 @@ def delete_domain(db: Session, domain_id: str) -> bool:
     
     db.delete(db_domain)
     db.commit()
+    publish_route_invalidation(db_domain.project_id)
     return True 
\ No newline at end of file
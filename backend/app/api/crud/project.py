@@ -1,8 +1,50 @@
-from typing import Any, Dict, Optional, Union, List
+import json
+import logging
+import datetime
+from typing import Any, Dict, Optional, Union, List, Tuple
+from sqlalchemy import func, select, tuple_, union
 from sqlalchemy.orm import Session
 
-from app.db.models import Project, User
+from app.core.config import settings
+from app.core.pagination import Cursor, encode_cursor
+from app.core.redis import get_redis
+from app.core.repository import normalize_repository_url
+from app.db.models import Project, User, project_team_members
 from app.api.schemas.project import ProjectCreate, ProjectUpdate
+from app.services.principals import publish_principal_invalidation
+from app.services.routing import publish_route_invalidation
+
+logger = logging.getLogger(__name__)
+
+
+def repo_cache_key(repo_key: str, branch: str) -> str:
+    return f"repo-projects:{repo_key}:{branch}"
+
+
+def invalidate_repo_cache(*pairs: Tuple[Optional[str], Optional[str]]):
+    """Drop cached project ids of the given (repo_key, branch) pairs"""
+    keys = [repo_cache_key(repo_key, branch) for repo_key, branch in pairs if repo_key]
+    if not keys:
+        return
+    try:
+        get_redis().delete(*keys)
+    except Exception as e:
+        logger.error(f"Error invalidating repository cache: {e}")
+
+
+def _apply_update(db: Session, db_project: Project, update_data: Dict[str, Any]) -> Project:
+    """Set fields on a project, keeping repo_key and the repository cache in step"""
+    previous = (db_project.repo_key, db_project.branch)
+    for field, value in update_data.items():
+        setattr(db_project, field, value)
+    if "repository_url" in update_data:
+        db_project.repo_key = normalize_repository_url(db_project.repository_url or "")
+        
+    db.add(db_project)
+    db.commit()
+    db.refresh(db_project)
+    invalidate_repo_cache(previous, (db_project.repo_key, db_project.branch))
+    return db_project
 
 
 def get_by_id(db: Session, project_id: str) -> Optional[Project]:
@@ -27,24 +69,73 @@ def get_by_owner(
     )
 
 
+# Orderings of a user's project list
+PROJECT_SORTS = ("created", "last_deployment")
+# Projects never deployed sort after every deployed one
+NEVER_DEPLOYED = datetime.datetime(1970, 1, 1)
+
+
+def project_sort_key(sort: str):
+    if sort == "last_deployment":
+        return func.coalesce(Project.last_deployment_at, NEVER_DEPLOYED)
+    return Project.created_at
+
+
+def project_cursor(project: Project, sort: str) -> str:
+    if sort == "last_deployment":
+        return encode_cursor(project.last_deployment_at or NEVER_DEPLOYED, project.id)
+    return encode_cursor(project.created_at, project.id)
+
+
+def user_projects_query(
+    *,
+    user_id: str,
+    sort: str = "created",
+    cursor: Optional[Cursor] = None,
+    deployed_after: Optional[datetime.datetime] = None,
+    limit: int = 100,
+):
+    """
+    One query for the projects a user owns or is a team member of, newest
+    first by `sort` and keyset paginated on (sort key, id). Fetches one row
+    more than `limit` so callers can tell whether another page follows.
+    """
+    sort_key = project_sort_key(sort)
+    # A UNION of two index lookups rather than an OR, which would scan projects
+    project_ids = union(
+        select(Project.id).where(Project.owner_id == user_id),
+        select(project_team_members.c.project_id).where(project_team_members.c.user_id == user_id),
+    )
+    query = select(Project).where(Project.id.in_(project_ids))
+    if deployed_after is not None:
+        query = query.where(Project.last_deployment_at > deployed_after)
+    if cursor:
+        query = query.where(tuple_(sort_key, Project.id) < tuple_(*cursor))
+    return query.order_by(sort_key.desc(), Project.id.desc()).limit(limit + 1)
+
+
+def paginate_projects(projects: List[Project], sort: str, limit: int) -> Tuple[List[Project], Optional[str]]:
+    """Trim the extra row of user_projects_query into the next page's cursor"""
+    if len(projects) <= limit:
+        return projects, None
+    projects = projects[:limit]
+    return projects, project_cursor(projects[-1], sort)
+
+
 def get_user_projects(
-    db: Session, *, user_id: str, skip: int = 0, limit: int = 100
-) -> List[Project]:
-    """Get all projects a user has access to (owned + team)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return []
-    
-    owned_projects = get_by_owner(db=db, owner_id=user_id, skip=skip, limit=limit)
-    team_projects = user.team_projects
-    
-    # Combine and deduplicate projects
-    all_projects = {p.id: p for p in owned_projects}
-    for p in team_projects:
-        if p.id not in all_projects:
-            all_projects[p.id] = p
-    
-    return list(all_projects.values())
+    db: Session,
+    *,
+    user_id: str,
+    sort: str = "created",
+    cursor: Optional[Cursor] = None,
+    deployed_after: Optional[datetime.datetime] = None,
+    limit: int = 100,
+) -> Tuple[List[Project], Optional[str]]:
+    """Get a page of the projects a user has access to (owned + team) and the next cursor"""
+    projects = db.scalars(user_projects_query(
+        user_id=user_id, sort=sort, cursor=cursor, deployed_after=deployed_after, limit=limit
+    )).all()
+    return paginate_projects(list(projects), sort, limit)
 
 
 def create(
@@ -54,15 +145,22 @@ def create(
         name=obj_in.name,
         description=obj_in.description,
         repository_url=obj_in.repository_url,
+        repo_key=normalize_repository_url(obj_in.repository_url),
         branch=obj_in.branch,
         build_command=obj_in.build_command,
         output_directory=obj_in.output_directory,
         environment_variables=obj_in.environment_variables,
+        fetch_strategy=obj_in.fetch_strategy,
+        sparse_paths=obj_in.sparse_paths,
+        deployment_mode=obj_in.deployment_mode,
+        webhook_secret=obj_in.webhook_secret,
         owner_id=owner_id,
     )
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_repo_cache((db_obj.repo_key, db_obj.branch))
+    publish_principal_invalidation([owner_id])
     return db_obj
 
 
@@ -74,21 +172,19 @@ def update(
     else:
         update_data = obj_in.dict(exclude_unset=True)
     
-    for field, value in update_data.items():
-        setattr(db_obj, field, value)
-        
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
+    return _apply_update(db, db_obj, update_data)
 
 
 def remove(db: Session, *, project_id: str) -> Optional[Project]:
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         return None
+    member_ids = [project.owner_id] + [member.id for member in project.team_members]
     db.delete(project)
     db.commit()
+    publish_route_invalidation(project_id)
+    invalidate_repo_cache((project.repo_key, project.branch))
+    publish_principal_invalidation(member_ids)
     return project
 
 
@@ -108,6 +204,7 @@ def add_team_member(db: Session, *, project_id: str, user_id: str) -> Optional[P
     db.add(project)
     db.commit()
     db.refresh(project)
+    publish_principal_invalidation([user_id])
     return project
 
 
@@ -127,6 +224,7 @@ def remove_team_member(db: Session, *, project_id: str, user_id: str) -> Optiona
     db.add(project)
     db.commit()
     db.refresh(project)
+    publish_principal_invalidation([user_id])
     return project
 
 
@@ -136,11 +234,40 @@ def get_projects_by_repo_and_branch(
     """
     Get projects that match a specific repository URL and branch.
     Used for webhook integrations to trigger auto-deployments.
+    
+    URLs are matched by their normalized repo_key, so https, ssh, `.git` and
+    case variants of a repository find the same projects. Matching project
+    ids are cached for REPO_PROJECTS_CACHE_TTL_SECONDS.
     """
-    return db.query(Project).filter(
-        Project.repository_url == repository_url,
+    repo_key = normalize_repository_url(repository_url)
+    cache_key = repo_cache_key(repo_key, branch)
+    
+    try:
+        cached = get_redis().get(cache_key)
+    except Exception as e:
+        logger.error(f"Error reading repository cache: {e}")
+        cached = None
+        
+    if cached is not None:
+        project_ids = json.loads(cached)
+        if not project_ids:
+            return []
+        return db.query(Project).filter(Project.id.in_(project_ids)).all()
+        
+    projects = db.query(Project).filter(
+        Project.repo_key == repo_key,
         Project.branch == branch
     ).all()
+    
+    try:
+        get_redis().set(
+            cache_key,
+            json.dumps([p.id for p in projects]),
+            ex=settings.REPO_PROJECTS_CACHE_TTL_SECONDS
+        )
+    except Exception as e:
+        logger.error(f"Error writing repository cache: {e}")
+    return projects
 
 
 def update_project(
@@ -154,12 +281,7 @@ def update_project(
         return None
     
     update_data = project_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_project, field, value)
-    
-    db.commit()
-    db.refresh(db_project)
-    return db_project
+    return _apply_update(db, db_project, update_data)
 
 
 def update_project_env_vars(
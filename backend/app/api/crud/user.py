@@ -2,9 +2,10 @@ from typing import Any, Dict, Optional, Union
 
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash, verify_and_update_password
 from app.db.models import User
 from app.api.schemas.user import UserCreate, UserUpdate
+from app.services.principals import publish_principal_invalidation
 
 
 def get_by_id(db: Session, user_id: str) -> Optional[User]:
@@ -63,6 +64,7 @@ def update(
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    publish_principal_invalidation([db_obj.id])
     return db_obj
 
 
@@ -72,8 +74,12 @@ def authenticate(
     user = get_by_email(db=db, email=email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
 
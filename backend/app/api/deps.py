@@ -1,24 +1,23 @@
-from typing import Generator, Optional
-
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import crud
 from app.api.schemas.token import TokenPayload
 from app.core.config import settings
 from app.core.security import ALGORITHM
-from app.db.base import get_db
-from app.db.models import User
+from app.db.base import get_async_db
+from app.services.authorization import ProjectAuthorizer
+from app.services.principals import Principal, principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> Principal:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[ALGORITHM]
@@ -30,25 +29,33 @@ def get_current_user(
             detail="Could not validate credentials",
         )
         
-    user = crud.user.get_by_id(db, user_id=token_data.sub)
+    # Usually served from the principal cache without touching the database
+    user = await principal_cache.get(db, user_id=token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
-def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+async def get_current_active_user(
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not crud.user.is_active(current_user):
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
-def get_current_active_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+async def get_current_active_superuser(
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not crud.user.is_superuser(current_user):
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+
+async def get_project_authorizer(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user),
+) -> ProjectAuthorizer:
+    return ProjectAuthorizer(db, current_user)
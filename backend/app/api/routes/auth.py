@@ -3,26 +3,26 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api import crud
+from app.api import async_crud, crud
 from app.api.schemas.user import User, UserCreate
 from app.api.schemas.token import Token
 from app.core.config import settings
 from app.core.security import create_access_token
-from app.db.base import get_db
+from app.db.base import get_async_db
 
 router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
 async def login_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+    db: AsyncSession = Depends(get_async_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.user.authenticate(
+    user = await async_crud.user.authenticate(
         db, email=form_data.username, password=form_data.password
     )
     if not user:
@@ -47,25 +47,25 @@ async def login_access_token(
 @router.post("/register", response_model=User)
 async def register_new_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Create new user
     """
-    user = crud.user.get_by_email(db, email=user_in.email)
+    user = await async_crud.user.get_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
         
-    user = crud.user.get_by_username(db, username=user_in.username)
+    user = await async_crud.user.get_by_username(db, username=user_in.username)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered",
         )
         
-    user = crud.user.create(db, obj_in=user_in)
+    user = await async_crud.user.create(db, obj_in=user_in)
     return user 
\ No newline at end of file
@@ -1,46 +1,207 @@
-from typing import Any, List
+import json
+import uuid
+import asyncio
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.api import crud
-from app.api.deps import get_current_active_user
-from app.api.schemas.deployment import Deployment, DeploymentCreate, DeploymentUpdate
-from app.db.base import get_db
-from app.db.models import User
-from app.workers.tasks import deploy_project
+from app.api import async_crud
+from app.api.deps import get_current_active_user, get_project_authorizer
+from app.api.schemas.deployment import (
+    DEPLOYMENT_SUMMARY_FIELDS,
+    Deployment,
+    DeploymentCreate,
+    DeploymentLogs,
+    DeploymentSummary,
+)
+from app.core.config import settings
+from app.core.pagination import decode_cursor
+from app.db.base import get_async_db, get_async_read_db
+from app.services.build_logs import build_log_store
+from app.services.log_archive import build_log_archive
+from app.services.deployment import deployment_service
+from app.services.deployment_coordinator import deployment_coordinator
+from app.services.deployment_archive import deployment_archive
+from app.services.authorization import ProjectAuthorizer
+from app.services.principals import Principal
 
 router = APIRouter()
 
+# How often a following client polls the live log for new lines
+LOG_FOLLOW_POLL_SECONDS = 0.5
+# Keep idle SSE connections alive through proxies
+LOG_FOLLOW_HEARTBEAT_SECONDS = 15
 
-@router.get("/", response_model=List[Deployment])
-def read_deployments(
-    db: Session = Depends(get_db),
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Resolve a comma-separated `fields=` projection, always including the id"""
+    if not fields:
+        return list(DEPLOYMENT_SUMMARY_FIELDS)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(DEPLOYMENT_SUMMARY_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+
+
+def parse_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: int, capped: bool):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["X-Total-Estimate"] = f"{total}+" if capped else str(total)
+
+
+def read_stored_logs(
+    deployment, offset: int, limit: int, tail: Optional[int] = None
+) -> Tuple[List[str], int, int]:
+    """
+    Read a finished log from the log archive, or from the legacy build_logs
+    column. Returns (lines, offset of the first line, total lines).
+    """
+    if deployment.build_log_archived:
+        index = build_log_archive.index(deployment.id)
+        if index:
+            if tail:
+                lines, offset = build_log_archive.tail(deployment.id, index, tail)
+            else:
+                lines = build_log_archive.read_lines(deployment.id, index, offset, limit)
+            return lines, offset, index["lines"]
+    
+    all_lines = (deployment.build_logs or "").splitlines(keepends=True)
+    if tail:
+        offset = max(len(all_lines) - tail, 0)
+        limit = tail
+    return all_lines[offset:offset + limit], offset, len(all_lines)
+
+
+def parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=` range into inclusive (start, end) offsets"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec or size == 0:
+        return None
+    start, _, end = spec.strip().partition("-")
+    try:
+        if not start:
+            length = int(end)
+            return (max(size - length, 0), size - 1) if length > 0 else None
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        return None
+    return (start, end) if start <= end else None
+
+
+def log_event(offset: int, line: str) -> str:
+    return f"id: {offset}\nevent: log\ndata: {json.dumps(line)}\n\n"
+
+
+def end_event(offset: int, event: str = "end") -> str:
+    return f"event: {event}\ndata: {json.dumps({'offset': offset})}\n\n"
+
+
+async def replay_stored_logs(deployment, offset: int) -> AsyncIterator[str]:
+    """Send an already completed log as server-sent events"""
+    while True:
+        lines, _, total = await run_in_threadpool(
+            read_stored_logs, deployment, offset, settings.BUILD_LOG_BATCH_LINES
+        )
+        for line in lines:
+            offset += 1
+            yield log_event(offset, line)
+        if not lines or offset >= total:
+            break
+    yield end_event(offset)
+
+
+async def follow_build_logs(deployment_id: str, offset: int) -> AsyncIterator[str]:
+    """Stream new log lines as server-sent events until the log is complete"""
+    loop = asyncio.get_running_loop()
+    last_activity = last_heartbeat = loop.time()
+    
+    while True:
+        lines, total, done = await run_in_threadpool(
+            build_log_store.read, deployment_id, offset, settings.BUILD_LOG_BATCH_LINES
+        )
+        
+        for line in lines:
+            offset += 1
+            yield log_event(offset, line)
+            
+        now = loop.time()
+        if lines:
+            last_activity = last_heartbeat = now
+            if offset < total:
+                continue
+                
+        if done and offset >= total:
+            yield end_event(offset)
+            return
+            
+        if now - last_activity >= settings.BUILD_LOG_FOLLOW_IDLE_TIMEOUT:
+            yield end_event(offset, event="timeout")
+            return
+            
+        if now - last_heartbeat >= LOG_FOLLOW_HEARTBEAT_SECONDS:
+            last_heartbeat = now
+            yield ": heartbeat\n\n"
+            
+        await asyncio.sleep(LOG_FOLLOW_POLL_SECONDS)
+
+
+@router.get("/", response_model=List[DeploymentSummary], response_model_exclude_unset=True)
+async def read_deployments(
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
+    limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Comma-separated summary fields to return"),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
-    Retrieve deployments.
+    Retrieve deployments, newest first. Follow X-Next-Cursor for the next
+    page; X-Total-Estimate is exact up to a cap, then suffixed with "+".
     """
-    deployments = crud.deployment.get_by_user(
-        db=db, user_id=current_user.id, skip=skip, limit=limit
+    deployments, next_cursor = await async_crud.deployment.get_summaries(
+        db=db,
+        fields=parse_fields(fields),
+        user_id=current_user.id,
+        cursor=parse_cursor(cursor),
+        skip=skip,
+        limit=limit,
     )
+    total, capped = await async_crud.deployment.estimate_count(db=db, user_id=current_user.id)
+    set_page_headers(response, next_cursor, total, capped)
     return deployments
 
 
 @router.post("/", response_model=Deployment)
-def create_deployment(
+async def create_deployment(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     deployment_in: DeploymentCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
+    authorizer: ProjectAuthorizer = Depends(get_project_authorizer),
 ) -> Any:
     """
     Create new deployment.
     """
     # Check if project exists
-    project = crud.project.get_by_id(db=db, project_id=deployment_in.project_id)
+    project = await async_crud.project.get_by_id(db=db, project_id=deployment_in.project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,34 +209,31 @@ def create_deployment(
         )
     
     # Check if user has access to this project
-    if project.owner_id != current_user.id and current_user not in project.team_members:
+    if not await authorizer.can_act_on_project(project.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    # Create deployment
-    deployment = crud.deployment.create(
-        db=db, obj_in=deployment_in, user_id=current_user.id
+    # Create deployment, superseding older ones of the same branch, and queue it
+    deployment = await deployment_coordinator.submit_async(
+        db=db, project=project, obj_in=deployment_in, user_id=current_user.id
     )
     
-    # Trigger deployment task
-    deploy_project.delay(deployment_id=deployment.id)
-    
     return deployment
 
 
 @router.get("/{deployment_id}", response_model=Deployment)
-def read_deployment(
+async def read_deployment(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     deployment_id: str,
-    current_user: User = Depends(get_current_active_user),
+    authorizer: ProjectAuthorizer = Depends(get_project_authorizer),
 ) -> Any:
     """
     Get deployment by ID.
     """
-    deployment = crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
+    deployment = await async_crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
     if not deployment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -83,8 +241,7 @@ def read_deployment(
         )
     
     # Check if user has access to this deployment's project
-    project = deployment.project
-    if project.owner_id != current_user.id and current_user not in project.team_members:
+    if not await authorizer.can_act_on_project(deployment.project_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -94,48 +251,106 @@ def read_deployment(
 
 
 @router.delete("/{deployment_id}", response_model=Deployment)
-def delete_deployment(
+async def delete_deployment(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     deployment_id: str,
-    current_user: User = Depends(get_current_active_user),
+    authorizer: ProjectAuthorizer = Depends(get_project_authorizer),
 ) -> Any:
     """
     Delete a deployment.
     """
-    deployment = crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
+    deployment = await async_crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
     if not deployment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Deployment not found",
         )
     
+    # Only the project owner may delete deployments
+    if not await authorizer.can_act_on_project(deployment.project_id, owner_only=True):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    deployment = await async_crud.deployment.remove(db=db, deployment=deployment)
+    await run_in_threadpool(build_log_archive.delete, deployment_id)
+    if deployment.artifact_path:
+        await run_in_threadpool(deployment_service.remove_static_artifact, deployment_id)
+    return deployment
+
+
+@router.post("/{deployment_id}/restore", response_model=Deployment)
+async def restore_deployment(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    deployment_id: str,
+    authorizer: ProjectAuthorizer = Depends(get_project_authorizer),
+) -> Any:
+    """
+    Bring an archived deployment and its build log back into the history.
+    The deployment itself is not served again.
+    """
+    # The id names archive files, so only accept ids we could have generated
+    try:
+        uuid.UUID(deployment_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archived deployment not found",
+        )
+    
+    record = await run_in_threadpool(deployment_archive.load, deployment_id)
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archived deployment not found",
+        )
+    
+    if not await async_crud.project.get_by_id(db, record["project_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found",
+        )
+    
     # Check if user has access to this deployment's project
-    project = deployment.project
-    if project.owner_id != current_user.id:
+    if not await authorizer.can_act_on_project(record["project_id"]):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    deployment = crud.deployment.remove(db=db, deployment_id=deployment_id)
+    project_id = await run_in_threadpool(deployment_archive.restore, deployment_id)
+    deployment = None
+    if project_id:
+        deployment = await async_crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
+    if not deployment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Archived deployment not found",
+        )
     return deployment
 
 
-@router.get("/project/{project_id}", response_model=List[Deployment])
-def read_project_deployments(
+@router.get("/project/{project_id}", response_model=List[DeploymentSummary], response_model_exclude_unset=True)
+async def read_project_deployments(
     *,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
     project_id: str,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_active_user),
+    limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Comma-separated summary fields to return"),
+    authorizer: ProjectAuthorizer = Depends(get_project_authorizer),
 ) -> Any:
     """
-    Get all deployments for a project.
+    Get all deployments for a project, newest first. Paginated like
+    read_deployments.
     """
     # Check if project exists
-    project = crud.project.get_by_id(db=db, project_id=project_id)
+    project = await async_crud.project.get_by_id(db=db, project_id=project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -143,13 +358,168 @@ def read_project_deployments(
         )
     
     # Check if user has access to this project
-    if project.owner_id != current_user.id and current_user not in project.team_members:
+    if not await authorizer.can_act_on_project(project.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    deployments, next_cursor = await async_crud.deployment.get_summaries(
+        db=db,
+        fields=parse_fields(fields),
+        project_id=project_id,
+        cursor=parse_cursor(cursor),
+        skip=skip,
+        limit=limit,
+    )
+    total, capped = await async_crud.deployment.estimate_count(db=db, project_id=project_id)
+    set_page_headers(response, next_cursor, total, capped)
+    return deployments 
+
+
+@router.get("/{deployment_id}/logs", response_model=DeploymentLogs)
+async def read_deployment_logs(
+    *,
+    db: AsyncSession = Depends(get_async_read_db),
+    deployment_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    tail: Optional[int] = Query(None, ge=1, le=10000),
+    follow: bool = False,
+    last_event_id: Optional[int] = Header(None),
+    authorizer: ProjectAuthorizer = Depends(get_project_authorizer),
+) -> Any:
+    """
+    Read build logs by line offset, or the last `tail` lines.
+    With `follow=true` the log is streamed as server-sent events while
+    the build runs; reconnecting clients resume from Last-Event-ID.
+    """
+    deployment = await async_crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
+    if not deployment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found",
+        )
+    
+    # Check if user has access to this deployment's project
+    if not await authorizer.can_act_on_project(deployment.project_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    deployments = crud.deployment.get_by_project(
-        db=db, project_id=project_id, skip=skip, limit=limit
+    live = not deployment.build_log_archived and (
+        deployment.status in ("queued", "building")
+        or await run_in_threadpool(build_log_store.exists, deployment_id)
+    )
+    
+    if follow:
+        if last_event_id is not None:
+            offset = last_event_id
+        elif tail:
+            offset = (
+                (await run_in_threadpool(build_log_store.tail, deployment_id, tail))[1] if live
+                else (await run_in_threadpool(read_stored_logs, deployment, 0, 0, tail))[1]
+            )
+        events = (
+            follow_build_logs(deployment_id, offset) if live
+            else replay_stored_logs(deployment, offset)
+        )
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    
+    if live:
+        if tail:
+            lines, offset, done = await run_in_threadpool(build_log_store.tail, deployment_id, tail)
+            total = offset + len(lines)
+        else:
+            lines, total, done = await run_in_threadpool(build_log_store.read, deployment_id, offset, limit)
+    else:
+        lines, offset, total = await run_in_threadpool(read_stored_logs, deployment, offset, limit, tail)
+        done = True
+    
+    return DeploymentLogs(
+        deployment_id=deployment_id,
+        offset=offset,
+        next_offset=offset + len(lines),
+        total=total,
+        lines=lines,
+        done=done,
+    )
+
+
+@router.get("/{deployment_id}/logs/raw")
+async def read_deployment_logs_raw(
+    *,
+    db: AsyncSession = Depends(get_async_read_db),
+    deployment_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    authorizer: ProjectAuthorizer = Depends(get_project_authorizer),
+) -> Any:
+    """
+    Download the build log as plain text. Single byte ranges are served
+    from the archived segments, or live log batches, that overlap them.
+    """
+    deployment = await async_crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
+    if not deployment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found",
+        )
+    
+    # Check if user has access to this deployment's project
+    if not await authorizer.can_act_on_project(deployment.project_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions",
+        )
+    
+    index = (
+        await run_in_threadpool(build_log_archive.index, deployment_id)
+        if deployment.build_log_archived else None
+    )
+    live = not index and await run_in_threadpool(build_log_store.exists, deployment_id)
+    live_index = await run_in_threadpool(build_log_store.index, deployment_id) if live else None
+    
+    if index:
+        size = index["bytes"]
+        read = lambda start, end: build_log_archive.read_bytes(deployment_id, index, start, end)
+    elif live_index:
+        size = live_index["bytes"]
+        read = lambda start, end: build_log_store.read_bytes(deployment_id, live_index, start, end)
+    else:
+        if live:
+            # Empty so far, or written before live logs were indexed
+            lines = (await run_in_threadpool(build_log_store.read, deployment_id))[0]
+            content = "".join(lines).encode()
+        else:
+            content = (deployment.build_logs or "").encode()
+        size = len(content)
+        read = lambda start, end: content[start:end + 1]
+    
+    headers = {"Accept-Ranges": "bytes"}
+    byte_range = parse_byte_range(range_header, size) if range_header else None
+    if range_header and not byte_range:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{size}"},
+        )
+    
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(
+            content=await run_in_threadpool(read, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type="text/plain; charset=utf-8",
+            headers=headers,
+        )
+    
+    return Response(
+        content=await run_in_threadpool(read, 0, size - 1) if size else b"",
+        media_type="text/plain; charset=utf-8",
+        headers=headers,
     )
-    return deployments 
\ No newline at end of file
@@ -1,88 +1,96 @@
 from typing import Any, List
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.api.crud import domain, project
+from app.api.async_crud import domain, project
 from app.api.schemas.domain import Domain, DomainCreate, DomainUpdate
-from app.models.user import User
+from app.db.base import get_async_db, get_async_read_db
+from app.services.principals import Principal
+from app.services.routing import is_platform_host
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Domain])
-def get_domains_by_project(
+async def get_domains_by_project(
     project_id: str,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(deps.get_current_user),
 ):
     """
     Get all domains for a project.
     """
     # Check if project exists and user has access
-    project_obj = project.get_project(db, project_id)
+    project_obj = await project.get_by_id(db, project_id)
     if not project_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
     
-    if project_obj.user_id != current_user.id:
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    return domain.get_domains_by_project(db, project_id)
+    return await domain.get_domains_by_project(db, project_id)
 
 
 @router.post("/", response_model=Domain)
-def create_domain_for_project(
+async def create_domain_for_project(
     *,
     project_id: str,
     domain_in: DomainCreate,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Create a new domain for a project.
     """
     # Check if project exists and user has access
-    project_obj = project.get_project(db, project_id)
+    project_obj = await project.get_by_id(db, project_id)
     if not project_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
     
-    if project_obj.user_id != current_user.id:
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
+    if is_platform_host(domain_in.name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Domains under the platform domain are reserved",
+        )
+    
     # Check if domain already exists
-    existing_domain = domain.get_domain_by_name(db, domain_in.name)
+    existing_domain = await domain.get_domain_by_name(db, domain_in.name)
     if existing_domain:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Domain already exists",
         )
     
-    return domain.create_domain(db, domain_in, project_id)
+    return await domain.create_domain(db, domain_in, project_id)
 
 
 @router.get("/{domain_id}", response_model=Domain)
-def get_domain(
+async def get_domain(
     domain_id: str,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get a domain by ID.
     """
-    domain_obj = domain.get_domain(db, domain_id)
+    domain_obj = await domain.get_domain(db, domain_id)
     if not domain_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -90,8 +98,8 @@ def get_domain(
         )
     
     # Check if user has access to the project
-    project_obj = project.get_project(db, domain_obj.project_id)
-    if project_obj.user_id != current_user.id:
+    project_obj = await project.get_by_id(db, domain_obj.project_id)
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -101,17 +109,17 @@ def get_domain(
 
 
 @router.put("/{domain_id}", response_model=Domain)
-def update_domain_by_id(
+async def update_domain_by_id(
     *,
     domain_id: str,
     domain_in: DomainUpdate,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Update a domain.
     """
-    domain_obj = domain.get_domain(db, domain_id)
+    domain_obj = await domain.get_domain(db, domain_id)
     if not domain_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -119,26 +127,32 @@ def update_domain_by_id(
         )
     
     # Check if user has access to the project
-    project_obj = project.get_project(db, domain_obj.project_id)
-    if project_obj.user_id != current_user.id:
+    project_obj = await project.get_by_id(db, domain_obj.project_id)
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    return domain.update_domain(db, domain_id, domain_in)
+    if domain_in.name and is_platform_host(domain_in.name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Domains under the platform domain are reserved",
+        )
+    
+    return await domain.update_domain(db, domain_obj, domain_in)
 
 
 @router.post("/{domain_id}/verify", response_model=Domain)
-def verify_domain_by_id(
+async def verify_domain_by_id(
     domain_id: str,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Verify a domain.
     """
-    domain_obj = domain.get_domain(db, domain_id)
+    domain_obj = await domain.get_domain(db, domain_id)
     if not domain_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -146,8 +160,8 @@ def verify_domain_by_id(
         )
     
     # Check if user has access to the project
-    project_obj = project.get_project(db, domain_obj.project_id)
-    if project_obj.user_id != current_user.id:
+    project_obj = await project.get_by_id(db, domain_obj.project_id)
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -155,19 +169,19 @@ def verify_domain_by_id(
     
     # In a real implementation, we would check if the domain has the verification record
     # For now, we'll just mark it as verified
-    return domain.verify_domain(db, domain_id)
+    return await domain.verify_domain(db, domain_obj)
 
 
 @router.delete("/{domain_id}", response_model=bool)
-def delete_domain_by_id(
+async def delete_domain_by_id(
     domain_id: str,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Delete a domain.
     """
-    domain_obj = domain.get_domain(db, domain_id)
+    domain_obj = await domain.get_domain(db, domain_id)
     if not domain_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -175,11 +189,11 @@ def delete_domain_by_id(
         )
     
     # Check if user has access to the project
-    project_obj = project.get_project(db, domain_obj.project_id)
-    if project_obj.user_id != current_user.id:
+    project_obj = await project.get_by_id(db, domain_obj.project_id)
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
     
-    return domain.delete_domain(db, domain_id) 
\ No newline at end of file
+    return await domain.delete_domain(db, domain_obj) 
\ No newline at end of file
@@ -1,63 +1,88 @@
-from typing import Any, List, Dict
+import datetime
+from typing import Any, List, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api import deps
-from app.api.crud import project
+from app.api.async_crud import project
+from app.api.crud.project import PROJECT_SORTS
+from app.core.pagination import decode_cursor
 from app.api.schemas.project import Project, ProjectCreate, ProjectUpdate
-from app.models.user import User
+from app.db.base import get_async_db, get_async_read_db
+from app.services.principals import Principal
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Project])
-def read_projects(
-    db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(deps.get_current_user),
+async def read_projects(
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    sort: str = Query("created", description=f"One of: {', '.join(PROJECT_SORTS)}"),
+    deployed_after: Optional[datetime.datetime] = None,
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
-    Retrieve projects.
+    Retrieve projects the user owns or is a team member of, newest first by
+    creation or last deployment. Follow X-Next-Cursor for the next page.
     """
-    projects = project.get_user_projects(
-        db=db, user_id=current_user.id, skip=skip, limit=limit
+    if sort not in PROJECT_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort must be one of: {', '.join(PROJECT_SORTS)}",
+        )
+    try:
+        page_cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    projects, next_cursor = await project.get_user_projects(
+        db=db,
+        user_id=current_user.id,
+        sort=sort,
+        cursor=page_cursor,
+        deployed_after=deployed_after,
+        limit=limit,
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return projects
 
 
 @router.post("/", response_model=Project)
-def create_project(
+async def create_project(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_db),
     project_in: ProjectCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Create new project.
     """
-    project_obj = project.create_project(db=db, project_create=project_in, user_id=current_user.id)
+    project_obj = await project.create(db=db, obj_in=project_in, owner_id=current_user.id)
     return project_obj
 
 
 @router.get("/{project_id}", response_model=Project)
-def read_project(
+async def read_project(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     project_id: str,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get project by ID.
     """
-    project_obj = project.get_project(db=db, project_id=project_id)
+    project_obj = await project.get_by_id(db=db, project_id=project_id)
     if not project_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
-    if project_obj.user_id != current_user.id:
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
@@ -66,102 +91,103 @@ def read_project(
 
 
 @router.put("/{project_id}", response_model=Project)
-def update_project_by_id(
+async def update_project_by_id(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_db),
     project_id: str,
     project_in: ProjectUpdate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Update a project.
     """
-    project_obj = project.get_project(db=db, project_id=project_id)
+    project_obj = await project.get_by_id(db=db, project_id=project_id)
     if not project_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
-    if project_obj.user_id != current_user.id:
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-    project_obj = project.update_project(db=db, project_id=project_id, project_update=project_in)
+    project_obj = await project.update(db=db, db_obj=project_obj, obj_in=project_in)
     return project_obj
 
 
 @router.patch("/{project_id}", response_model=Project)
-def patch_project(
+async def patch_project(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_db),
     project_id: str,
     project_in: ProjectUpdate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Partially update a project.
     """
-    project_obj = project.get_project(db=db, project_id=project_id)
+    project_obj = await project.get_by_id(db=db, project_id=project_id)
     if not project_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
-    if project_obj.user_id != current_user.id:
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-    project_obj = project.update_project(db=db, project_id=project_id, project_update=project_in)
+    project_obj = await project.update(db=db, db_obj=project_obj, obj_in=project_in)
     return project_obj
 
 
 @router.delete("/{project_id}", response_model=bool)
-def delete_project(
+async def delete_project(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_db),
     project_id: str,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Delete a project.
     """
-    project_obj = project.get_project(db=db, project_id=project_id)
+    project_obj = await project.get_by_id(db=db, project_id=project_id)
     if not project_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
-    if project_obj.user_id != current_user.id:
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-    return project.delete_project(db=db, project_id=project_id)
+    await project.remove(db=db, project_id=project_id)
+    return True
 
 
 @router.put("/{project_id}/env-vars", response_model=Project)
-def update_project_environment_variables(
+async def update_project_environment_variables(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(get_async_db),
     project_id: str,
     env_vars: Dict[str, str],
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Principal = Depends(deps.get_current_user),
 ) -> Any:
     """
     Update a project's environment variables.
     """
-    project_obj = project.get_project(db=db, project_id=project_id)
+    project_obj = await project.get_by_id(db=db, project_id=project_id)
     if not project_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found",
         )
-    if project_obj.user_id != current_user.id:
+    if project_obj.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions",
         )
-    project_obj = project.update_project_env_vars(db=db, project_id=project_id, env_vars=env_vars)
+    project_obj = await project.update_project_env_vars(db=db, db_obj=project_obj, env_vars=env_vars)
     return project_obj 
\ No newline at end of file
@@ -2,54 +2,56 @@ from typing import Any, List
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api import crud
+from app.api import async_crud, crud
 from app.api.deps import get_current_active_user, get_current_active_superuser
 from app.api.schemas.user import User, UserCreate, UserUpdate
-from app.db.base import get_db
-from app.db.models import User as UserModel
+from app.db.base import get_async_db, get_async_read_db
+from app.services.principals import Principal
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[User])
-def read_users(
-    db: Session = Depends(get_db),
+async def read_users(
+    db: AsyncSession = Depends(get_async_read_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: UserModel = Depends(get_current_active_superuser),
+    current_user: Principal = Depends(get_current_active_superuser),
 ) -> Any:
     """
     Retrieve users. Only for superusers.
     """
-    users = crud.user.get_multi(db, skip=skip, limit=limit)
+    users = await async_crud.user.get_multi(db, skip=skip, limit=limit)
     return users
 
 
 @router.get("/me", response_model=User)
-def read_user_me(
-    current_user: UserModel = Depends(get_current_active_user),
+async def read_user_me(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Get current user.
     """
-    return current_user
+    return await async_crud.user.get_by_id(db, user_id=current_user.id)
 
 
 @router.put("/me", response_model=User)
-def update_user_me(
+async def update_user_me(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     password: str = Body(None),
     full_name: str = Body(None),
     email: str = Body(None),
-    current_user: UserModel = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     Update own user.
     """
-    current_user_data = jsonable_encoder(current_user)
+    user = await async_crud.user.get_by_id(db, user_id=current_user.id)
+    current_user_data = jsonable_encoder(user)
     user_in = UserUpdate(**current_user_data)
     
     if password is not None:
@@ -59,20 +61,20 @@ def update_user_me(
     if email is not None:
         user_in.email = email
         
-    user = crud.user.update(db, db_obj=current_user, obj_in=user_in)
+    user = await async_crud.user.update(db, db_obj=user, obj_in=user_in)
     return user
 
 
 @router.get("/{user_id}", response_model=User)
-def read_user_by_id(
+async def read_user_by_id(
     user_id: str,
-    current_user: UserModel = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_read_db),
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = crud.user.get_by_id(db, user_id=user_id)
+    user = await async_crud.user.get_by_id(db, user_id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -27,9 +27,16 @@ class DeploymentInDBBase(DeploymentBase):
     created_at: datetime
     updated_at: datetime
     status: str
+    stage: Optional[str] = None
     deployment_url: Optional[str] = None
     build_logs: Optional[str] = None
     error_message: Optional[str] = None
+    build_log_archived: Optional[bool] = False
+    build_log_lines: Optional[int] = None
+    build_log_bytes: Optional[int] = None
+    build_fingerprint: Optional[str] = None
+    build_cache_hit: Optional[bool] = False
+    cached_from_deployment_id: Optional[str] = None
     project_id: str
     user_id: str
 
@@ -43,4 +50,35 @@ class Deployment(DeploymentInDBBase):
 
 
 class DeploymentInDB(DeploymentInDBBase):
-    pass 
\ No newline at end of file
+    pass 
+
+
+class DeploymentSummary(BaseModel):
+    """Deployment list item, without the nested project, user or logs"""
+    id: str
+    project_id: Optional[str] = None
+    project_name: Optional[str] = None
+    user_id: Optional[str] = None
+    commit_hash: Optional[str] = None
+    commit_message: Optional[str] = None
+    branch: Optional[str] = None
+    status: Optional[str] = None
+    stage: Optional[str] = None
+    deployment_url: Optional[str] = None
+    error_message: Optional[str] = None
+    build_cache_hit: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# Fields a list request can project with `fields=`
+DEPLOYMENT_SUMMARY_FIELDS = tuple(DeploymentSummary.__fields__)
+
+
+class DeploymentLogs(BaseModel):
+    deployment_id: str
+    offset: int
+    next_offset: int
+    total: int
+    lines: List[str]
+    done: bool
@@ -1,8 +1,23 @@
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from datetime import datetime
 
 from app.api.schemas.user import User
+from app.core.repository import FETCH_STRATEGIES
+
+DEPLOYMENT_MODES = ("container", "static")
+
+
+def check_fetch_strategy(value: Optional[str]) -> Optional[str]:
+    if value is not None and value not in FETCH_STRATEGIES:
+        raise ValueError(f"fetch_strategy must be one of: {', '.join(FETCH_STRATEGIES)}")
+    return value
+
+
+def check_deployment_mode(value: Optional[str]) -> Optional[str]:
+    if value is not None and value not in DEPLOYMENT_MODES:
+        raise ValueError(f"deployment_mode must be one of: {', '.join(DEPLOYMENT_MODES)}")
+    return value
 
 
 class ProjectBase(BaseModel):
@@ -13,6 +28,12 @@ class ProjectBase(BaseModel):
     build_command: Optional[str] = None
     output_directory: Optional[str] = "build"
     environment_variables: Optional[Dict[str, str]] = {}
+    fetch_strategy: Optional[str] = "full"
+    sparse_paths: Optional[List[str]] = []
+    deployment_mode: Optional[str] = "container"
+
+    _check_fetch_strategy = validator("fetch_strategy", allow_reuse=True)(check_fetch_strategy)
+    _check_deployment_mode = validator("deployment_mode", allow_reuse=True)(check_deployment_mode)
 
 
 class ProjectCreate(ProjectBase):
@@ -28,13 +49,20 @@ class ProjectUpdate(BaseModel):
     output_directory: Optional[str] = None
     environment_variables: Optional[Dict[str, str]] = None
     webhook_secret: Optional[str] = None
+    fetch_strategy: Optional[str] = None
+    sparse_paths: Optional[List[str]] = None
+    deployment_mode: Optional[str] = None
+
+    _check_fetch_strategy = validator("fetch_strategy", allow_reuse=True)(check_fetch_strategy)
+    _check_deployment_mode = validator("deployment_mode", allow_reuse=True)(check_deployment_mode)
 
 
 class ProjectInDBBase(ProjectBase):
     id: str
     webhook_secret: Optional[str] = None
     created_at: datetime
-    user_id: str
+    last_deployment_at: Optional[datetime] = None
+    owner_id: str
 
     class Config:
         orm_mode = True
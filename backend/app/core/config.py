@@ -10,6 +10,14 @@ class Settings(BaseSettings):
     # Authentication
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev_secret_key_change_in_production")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))  # 0: min(4, cores)
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+    PRINCIPAL_LOCAL_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_LOCAL_TTL_SECONDS", "30"))
+    PRINCIPAL_LOCAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_LOCAL_CACHE_SIZE", "10000"))
+    AUTHORIZATION_CACHE_TTL_SECONDS: int = int(os.getenv("AUTHORIZATION_CACHE_TTL_SECONDS", "5"))
+    AUTHORIZATION_CACHE_SIZE: int = int(os.getenv("AUTHORIZATION_CACHE_SIZE", "10000"))
     
     # Database
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
@@ -19,11 +27,29 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "host_engine")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None
+    # Comma-separated read replicas; GET endpoints read from them when set
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    SQLALCHEMY_ASYNC_REPLICA_URIS: List[str] = []
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Deployment history totals are counted up to this many rows
+    DEPLOYMENT_COUNT_ESTIMATE_CAP: int = int(os.getenv("DEPLOYMENT_COUNT_ESTIMATE_CAP", "10000"))
+    # Deployments are archived to storage after this many days (0 keeps them forever)
+    DEPLOYMENT_RETENTION_DAYS: int = int(os.getenv("DEPLOYMENT_RETENTION_DAYS", "90"))
+    DEPLOYMENT_PARTITION_PREMAKE_MONTHS: int = int(os.getenv("DEPLOYMENT_PARTITION_PREMAKE_MONTHS", "3"))
+    DEPLOYMENT_ARCHIVE_BATCH: int = int(os.getenv("DEPLOYMENT_ARCHIVE_BATCH", "500"))
 
     # Celery
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
     
+    # Redis (shared state between API processes and workers)
+    REDIS_URL: str = os.getenv("REDIS_URL", os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"))
+    
     # Github OAuth
     GITHUB_CLIENT_ID: Optional[str] = os.getenv("GITHUB_CLIENT_ID")
     GITHUB_CLIENT_SECRET: Optional[str] = os.getenv("GITHUB_CLIENT_SECRET")
@@ -31,6 +57,14 @@ class Settings(BaseSettings):
     # Docker
     DOCKER_REGISTRY: str = os.getenv("DOCKER_REGISTRY", "localhost:5000")
     
+    # Deployments are reachable at <scheme>://<deployment id>.<domain>
+    DEPLOYMENTS_DOMAIN: str = os.getenv("DEPLOYMENTS_DOMAIN", "localhost")
+    DEPLOYMENTS_URL_SCHEME: str = os.getenv("DEPLOYMENTS_URL_SCHEME", "http")
+    # Host on which the proxy answers /metrics; unset keeps metrics off the proxy
+    PROXY_ADMIN_HOST: Optional[str] = os.getenv("PROXY_ADMIN_HOST")
+    # Host on which the API answers /metrics; unset keeps metrics off the API
+    API_ADMIN_HOST: Optional[str] = os.getenv("API_ADMIN_HOST")
+    
     # Storage
     STORAGE_TYPE: str = os.getenv("STORAGE_TYPE", "local")  # local, s3
     STORAGE_PATH: str = os.getenv("STORAGE_PATH", "/tmp/host-engine")
@@ -38,6 +72,53 @@ class Settings(BaseSettings):
     S3_ACCESS_KEY: Optional[str] = os.getenv("S3_ACCESS_KEY")
     S3_SECRET_KEY: Optional[str] = os.getenv("S3_SECRET_KEY")
     S3_BUCKET: Optional[str] = os.getenv("S3_BUCKET")
+    STATIC_ROOT: Optional[str] = os.getenv("STATIC_ROOT")  # defaults to STORAGE_PATH/artifacts
+    
+    # Git mirror cache
+    GIT_CACHE_MAX_SIZE_MB: int = int(os.getenv("GIT_CACHE_MAX_SIZE_MB", "10240"))
+    
+    # Build cache
+    BUILD_CACHE_MAX_AGE_DAYS: int = int(os.getenv("BUILD_CACHE_MAX_AGE_DAYS", "30"))
+    BUILD_CACHE_MAX_ENTRIES_PER_PROJECT: int = int(os.getenv("BUILD_CACHE_MAX_ENTRIES_PER_PROJECT", "50"))
+    DEPENDENCY_CACHE_MAX_SIZE_MB: int = int(os.getenv("DEPENDENCY_CACHE_MAX_SIZE_MB", "20480"))
+    
+    # Build logs
+    BUILD_LOG_BATCH_LINES: int = int(os.getenv("BUILD_LOG_BATCH_LINES", "200"))
+    BUILD_LOG_FLUSH_SECONDS: float = float(os.getenv("BUILD_LOG_FLUSH_SECONDS", "0.5"))
+    BUILD_LOG_LIVE_TTL_SECONDS: int = int(os.getenv("BUILD_LOG_LIVE_TTL_SECONDS", str(60 * 60 * 24)))
+    BUILD_LOG_FOLLOW_IDLE_TIMEOUT: int = int(os.getenv("BUILD_LOG_FOLLOW_IDLE_TIMEOUT", "600"))
+    BUILD_LOG_ARCHIVED_TTL_SECONDS: int = int(os.getenv("BUILD_LOG_ARCHIVED_TTL_SECONDS", "300"))
+    BUILD_LOG_SEGMENT_BYTES: int = int(os.getenv("BUILD_LOG_SEGMENT_BYTES", str(1024 * 1024)))
+    BUILD_LOG_HEAD_BYTES: int = int(os.getenv("BUILD_LOG_HEAD_BYTES", str(10 * 1024 * 1024)))
+    BUILD_LOG_TAIL_BYTES: int = int(os.getenv("BUILD_LOG_TAIL_BYTES", str(10 * 1024 * 1024)))
+    
+    # Webhooks (optional shared secrets checked on ingestion, per-project
+    # secrets are checked by the consumer)
+    GITHUB_WEBHOOK_SECRET: Optional[str] = os.getenv("GITHUB_WEBHOOK_SECRET")
+    GITLAB_WEBHOOK_TOKEN: Optional[str] = os.getenv("GITLAB_WEBHOOK_TOKEN")
+    WEBHOOK_STREAM_MAXLEN: int = int(os.getenv("WEBHOOK_STREAM_MAXLEN", "100000"))
+    WEBHOOK_CONSUMER_BATCH: int = int(os.getenv("WEBHOOK_CONSUMER_BATCH", "100"))
+    WEBHOOK_CONSUMER_BLOCK_MS: int = int(os.getenv("WEBHOOK_CONSUMER_BLOCK_MS", "5000"))
+    WEBHOOK_CLAIM_IDLE_MS: int = int(os.getenv("WEBHOOK_CLAIM_IDLE_MS", "60000"))
+    WEBHOOK_MAX_DELIVERIES: int = int(os.getenv("WEBHOOK_MAX_DELIVERIES", "5"))
+    WEBHOOK_DEDUPE_TTL_SECONDS: int = int(os.getenv("WEBHOOK_DEDUPE_TTL_SECONDS", "86400"))
+    REPO_PROJECTS_CACHE_TTL_SECONDS: int = int(os.getenv("REPO_PROJECTS_CACHE_TTL_SECONDS", "300"))
+    
+    # Deployment coordination
+    SUPERSEDE_CANCEL_CLONING: bool = os.getenv("SUPERSEDE_CANCEL_CLONING", "true").lower() == "true"
+    BUILD_LOCK_TIMEOUT: int = int(os.getenv("BUILD_LOCK_TIMEOUT", "3600"))
+    BUILD_LOCK_RETRY_SECONDS: int = int(os.getenv("BUILD_LOCK_RETRY_SECONDS", "15"))
+    
+    # Scale to zero (SCALE_TO_ZERO_IDLE_SECONDS=0 keeps containers running)
+    SCALE_TO_ZERO_IDLE_SECONDS: int = int(os.getenv("SCALE_TO_ZERO_IDLE_SECONDS", "900"))
+    SCALE_TO_ZERO_WAKE_TIMEOUT: int = int(os.getenv("SCALE_TO_ZERO_WAKE_TIMEOUT", "30"))
+    DEPLOYMENT_ACTIVITY_FLUSH_SECONDS: int = int(os.getenv("DEPLOYMENT_ACTIVITY_FLUSH_SECONDS", "10"))
+    
+    # Asset pipeline
+    ASSET_PIPELINE_WORKERS: int = int(os.getenv("ASSET_PIPELINE_WORKERS", "0"))  # 0 uses every core
+    ASSET_MINIFY: bool = os.getenv("ASSET_MINIFY", "false").lower() == "true"
+    ASSET_BROTLI_QUALITY: int = int(os.getenv("ASSET_BROTLI_QUALITY", "11"))
+    ASSET_CACHE_MAX_SIZE_MB: int = int(os.getenv("ASSET_CACHE_MAX_SIZE_MB", "5120"))
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
@@ -52,6 +133,25 @@ class Settings(BaseSettings):
             self.SQLALCHEMY_DATABASE_URI = self.DATABASE_URL
         else:
             self.SQLALCHEMY_DATABASE_URI = f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        # Same databases through the asyncpg driver for the API's async sessions
+        if not self.SQLALCHEMY_ASYNC_DATABASE_URI:
+            self.SQLALCHEMY_ASYNC_DATABASE_URI = async_database_uri(self.SQLALCHEMY_DATABASE_URI)
+        if not self.SQLALCHEMY_ASYNC_REPLICA_URIS:
+            self.SQLALCHEMY_ASYNC_REPLICA_URIS = [
+                async_database_uri(url.strip())
+                for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()
+            ]
+        # Static deployment artifacts
+        if not self.STATIC_ROOT:
+            self.STATIC_ROOT = os.path.join(self.STORAGE_PATH, "artifacts")
+
+
+def async_database_uri(uri: str) -> str:
+    """Switch a PostgreSQL URI to the asyncpg driver"""
+    scheme, _, rest = uri.partition("://")
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        scheme = "postgresql+asyncpg"
+    return f"{scheme}://{rest}"
 
 
 settings = Settings() 
\ No newline at end of file
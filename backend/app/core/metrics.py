@@ -0,0 +1,43 @@
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Scale to zero
+COLD_START_SECONDS = Histogram(
+    "deployment_cold_start_seconds",
+    "Time from a request reaching a stopped deployment until its container is ready",
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 10, 20, 30, 60),
+)
+DEPLOYMENT_WAKES = Counter(
+    "deployment_wakes_total",
+    "Stopped deployment containers started on request",
+    ["result"],
+)
+
+# Database connection pools, labelled by engine (primary, replica-0, ...)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    ["engine"],
+)
+DB_POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Checked out connections over the pool's size plus overflow",
+    ["engine"],
+)
+DB_QUERIES = Counter(
+    "db_queries_total",
+    "Statements executed",
+    ["engine"],
+)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Return the metrics of this process in the Prometheus text format"""
+    return generate_latest(), CONTENT_TYPE_LATEST
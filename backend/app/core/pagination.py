@@ -0,0 +1,22 @@
+import json
+import base64
+import datetime
+from typing import Tuple
+
+Cursor = Tuple[datetime.datetime, str]
+
+
+def encode_cursor(created_at: datetime.datetime, item_id: str) -> str:
+    """Opaque keyset cursor for the item a page ended on"""
+    raw = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Inverse of encode_cursor; raises ValueError for anything else"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, item_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(created_at), str(item_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
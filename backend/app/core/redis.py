@@ -0,0 +1,23 @@
+import redis
+import redis.asyncio
+
+from app.core.config import settings
+
+_client = None
+_async_client = None
+
+
+def get_redis() -> redis.Redis:
+    """Return the process-wide Redis client, connecting on first use"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Return the process-wide asyncio Redis client for request handlers"""
+    global _async_client
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _async_client
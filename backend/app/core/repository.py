@@ -0,0 +1,55 @@
+import re
+import hashlib
+from urllib.parse import urlsplit
+
+# git@github.com:owner/repo.git
+SCP_LIKE_URL = re.compile(r"^(?:[^@/]+@)?(?P<host>[^:/]+):(?P<path>[^/].*)$")
+
+DEFAULT_PORTS = {"http": 80, "https": 443, "ssh": 22, "git": 9418}
+
+# How much of a repository the clone step transfers:
+#   full    - complete history through the shared mirror cache
+#   shallow - tip commit only (depth 1)
+#   partial - full history without file contents (filter=blob:none)
+#   sparse  - tip commit, blobs fetched only for the project's sparse paths
+FETCH_STRATEGIES = ("full", "shallow", "partial", "sparse")
+
+
+def normalize_repository_url(repository_url: str) -> str:
+    """
+    Reduce a repository URL to a canonical `host/owner/repo` key.
+
+    https, ssh and scp-like URLs for the same repository, with or without
+    credentials, a trailing `.git` or a trailing slash, map to the same key.
+    Hosts and paths are compared case-insensitively.
+    """
+    url = repository_url.strip()
+
+    if "://" in url:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme.lower()):
+            host = f"{host}:{parts.port}"
+        path = parts.path
+    else:
+        match = SCP_LIKE_URL.match(url)
+        if match:
+            host = match.group("host").lower()
+            path = match.group("path")
+        else:
+            # Plain local path
+            host = ""
+            path = url
+
+    path = path.strip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    path = path.rstrip("/").lower()
+
+    return f"{host}/{path}" if host else path
+
+
+def repository_cache_key(repository_url: str) -> str:
+    """Return a filesystem-safe key for a repository URL"""
+    normalized = normalize_repository_url(repository_url)
+    return hashlib.sha256(normalized.encode()).hexdigest()[:32]
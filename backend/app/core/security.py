@@ -1,12 +1,23 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Union, Optional, Tuple
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with any other cost are flagged by needs_update and
+# replaced on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 ALGORITHM = "HS256"
 
@@ -30,4 +41,52 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password, returning a new hash too if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashes are already queued"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop on its own thread pool, so logins cannot
+    starve the default threadpool. bcrypt releases the GIL, so the workers
+    hash in parallel. Once PASSWORD_HASH_MAX_PENDING calls are running or
+    queued, further calls fail fast with PasswordHasherBusy.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordHasherBusy()
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify_and_update(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await self.run(verify_and_update_password, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1),
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,157 @@
+import os
+import fcntl
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def storage_dir(*parts: str) -> str:
+    """Return a directory under STORAGE_PATH, creating it if needed"""
+    path = os.path.join(settings.STORAGE_PATH, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def path_size(path: str) -> int:
+    """Return the on-disk size of a file or directory tree in bytes"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def touch(path: str):
+    """Mark a cache entry as recently used"""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold an flock on `path` for the duration of the block.
+
+    Yields False instead of waiting when `blocking` is off and the lock is
+    already held elsewhere. Lock files may be deleted by their exclusive
+    holder (see evict_lru), so a lock taken on a file that has since been
+    unlinked is dropped and taken again on the current one.
+    """
+    flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    if not blocking:
+        flags |= fcntl.LOCK_NB
+
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, flags)
+            except BlockingIOError:
+                yield False
+                return
+
+            try:
+                current = os.stat(path).st_ino == os.fstat(fd).st_ino
+            except FileNotFoundError:
+                current = False
+            if not current:
+                continue
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            return
+        finally:
+            os.close(fd)
+
+
+def remove_lock_file(path: str):
+    """Delete a lock file; only call while holding it exclusively"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_stale_locks(directory: str, suffix: str = ".lock"):
+    """Delete lock files in `directory` whose entry no longer exists and that nobody holds"""
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        lock_path = os.path.join(directory, name)
+        with file_lock(lock_path, blocking=False) as acquired:
+            if acquired and not os.path.exists(lock_path[:-len(suffix)]):
+                remove_lock_file(lock_path)
+
+
+def link_or_copy(src: str, dst: str):
+    """Hardlink a file, falling back to a copy across filesystems"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def remove_path(path: str):
+    """Remove a cache entry whether it is a file or a directory"""
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def evict_lru(
+    entries: List[str],
+    max_bytes: int,
+    keep: Optional[List[str]] = None,
+) -> List[str]:
+    """
+    Remove the least recently used entries until their total size fits in
+    `max_bytes`. Entries are ranked by mtime, so callers should `touch` an
+    entry whenever it is used. An entry is only removed while its
+    `<entry>.lock` file can be taken exclusively, so entries in use by
+    another worker are skipped, and the lock file goes with it. Returns the
+    removed paths.
+    """
+    keep = set(keep or [])
+    sized = []
+    for entry in entries:
+        try:
+            sized.append((os.path.getmtime(entry), path_size(entry), entry))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in sized)
+    removed = []
+
+    for _, size, entry in sorted(sized):
+        if total <= max_bytes:
+            break
+        if entry in keep:
+            continue
+
+        with file_lock(f"{entry}.lock", blocking=False) as acquired:
+            if not acquired:
+                continue
+            remove_path(entry)
+            remove_lock_file(f"{entry}.lock")
+
+        total -= size
+        removed.append(entry)
+        logger.info(f"Evicted cache entry: {entry}")
+
+    return removed
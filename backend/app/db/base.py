@@ -1,18 +1,86 @@
+import itertools
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db.instrumentation import instrument_engine, instrumented_pool_class
+
+POOL_CAPACITY = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+
+
+def pool_options(label: str, asyncio: bool = False):
+    return dict(
+        poolclass=instrumented_pool_class(label, asyncio=asyncio),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI)
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **pool_options("primary"))
+instrument_engine(engine, "primary", POOL_CAPACITY)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def async_engine_args(uri: str):
+    """asyncpg takes `ssl` instead of libpq's `sslmode` query parameter"""
+    url = make_url(uri)
+    connect_args = {}
+    sslmode = url.query.get("sslmode")
+    if url.drivername == "postgresql+asyncpg" and sslmode:
+        url = url.difference_update_query(["sslmode"])
+        connect_args["ssl"] = sslmode
+    return url, connect_args
+
+
+def create_instrumented_async_engine(uri: str, label: str):
+    url, connect_args = async_engine_args(uri)
+    async_engine = create_async_engine(
+        url, connect_args=connect_args, **pool_options(label, asyncio=True)
+    )
+    instrument_engine(async_engine, label, POOL_CAPACITY)
+    return async_engine
+
+
+# Request handlers use async sessions so concurrency is bounded by the
+# database pool rather than the threadpool; Celery workers stay on SessionLocal
+async_engine = create_instrumented_async_engine(settings.SQLALCHEMY_ASYNC_DATABASE_URI, "primary-async")
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Read-only requests are spread over the replicas, or use the primary without any
+replica_engines = [
+    create_instrumented_async_engine(uri, f"replica-{i}")
+    for i, uri in enumerate(settings.SQLALCHEMY_ASYNC_REPLICA_URIS)
+]
+_read_engines = itertools.cycle(replica_engines or [async_engine])
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """
+    Session on the next read replica, for GET endpoints. Replicas may lag
+    the primary slightly, so anything read to make a write belongs on
+    get_async_db.
+    """
+    async with AsyncSession(bind=next(_read_engines), expire_on_commit=False) as db:
+        yield db
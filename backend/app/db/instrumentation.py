@@ -0,0 +1,53 @@
+"""
+Connection pool and query metrics for SQLAlchemy engines.
+
+Checkout wait is timed around the pool's own `_do_get`, which is where a
+caller blocks when every connection is in use; pool events only fire once a
+connection has been handed out.
+"""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_SATURATION,
+    DB_QUERIES,
+)
+
+
+def instrumented_pool_class(label: str, asyncio: bool = False) -> type:
+    """Return a queue pool class that records checkout wait time as `label`"""
+    base = AsyncAdaptedQueuePool if asyncio else QueuePool
+    checkout_seconds = DB_POOL_CHECKOUT_SECONDS.labels(engine=label)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return base._do_get(self)
+        finally:
+            checkout_seconds.observe(time.perf_counter() - start)
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def instrument_engine(engine, label: str, capacity: int):
+    """Track pool usage and statement counts of an engine (sync or async)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    checked_out = DB_POOL_CHECKED_OUT.labels(engine=label)
+    saturation = DB_POOL_SATURATION.labels(engine=label)
+    queries = DB_QUERIES.labels(engine=label)
+
+    def update_usage(*args):
+        in_use = sync_engine.pool.checkedout()
+        checked_out.set(in_use)
+        saturation.set(in_use / capacity if capacity else 0)
+
+    event.listen(sync_engine.pool, "checkout", update_usage)
+    event.listen(sync_engine.pool, "checkin", update_usage)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def count_query(*args):
+        queries.inc()
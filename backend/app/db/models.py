@@ -1,5 +1,5 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, JSON, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, DateTime, Text, JSON, Table
+from sqlalchemy.orm import deferred, relationship
 import datetime
 import uuid
 
@@ -14,6 +14,9 @@ project_team_members = Table(
     Base.metadata,
     Column("project_id", String, ForeignKey("projects.id")),
     Column("user_id", String, ForeignKey("users.id")),
+    # Membership checks look up (project, user); a user's projects by user
+    Index("ix_project_team_members_project_user", "project_id", "user_id"),
+    Index("ix_project_team_members_user", "user_id"),
 )
 
 class User(Base):
@@ -46,6 +49,7 @@ class Project(Base):
     name = Column(String, index=True)
     description = Column(Text, nullable=True)
     repository_url = Column(String)
+    repo_key = Column(String, nullable=True)  # normalized repository_url, see app.core.repository
     branch = Column(String, default="main")
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
@@ -57,8 +61,19 @@ class Project(Base):
     build_command = Column(String, nullable=True)
     output_directory = Column(String, default="build")
     
+    # Shared secret for push webhooks (GitHub HMAC secret or GitLab token)
+    webhook_secret = Column(String, nullable=True)
+    
+    # Serving: "container" runs an nginx image per deployment, "static"
+    # publishes the build output for the shared static server
+    deployment_mode = Column(String, default="container")
+    
+    # Clone settings
+    fetch_strategy = Column(String, default="full")  # full, shallow, partial, sparse
+    sparse_paths = Column(JSON, default=list)
+    
     # Owner
-    owner_id = Column(String, ForeignKey("users.id"))
+    owner_id = Column(String, ForeignKey("users.id"), index=True)
     owner = relationship("User", back_populates="owned_projects")
     
     # Team members
@@ -66,9 +81,15 @@ class Project(Base):
     
     # Deployments
     deployments = relationship("Deployment", back_populates="project")
+    last_deployment_at = Column(DateTime, nullable=True)  # created_at of the newest deployment
     
     # Domains
     domains = relationship("Domain", back_populates="project")
+    
+    __table_args__ = (
+        # Webhook deliveries look projects up by repository and branch
+        Index("ix_projects_repo_key_branch", "repo_key", "branch"),
+    )
 
 
 class Deployment(Base):
@@ -77,19 +98,52 @@ class Deployment(Base):
     id = Column(String, primary_key=True, default=generate_uuid)
     commit_hash = Column(String)
     commit_message = Column(Text, nullable=True)
+    branch = Column(String, nullable=True)
     status = Column(String, default="queued")  # queued, building, ready, failed, canceled
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    stage = Column(String, nullable=True)  # clone, build, deploy while building
+    # Partition key, so part of the table's primary key (see app.db.partitions)
+    created_at = Column(DateTime, primary_key=True, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     deployment_url = Column(String, nullable=True)
-    build_logs = Column(Text, nullable=True)
+    # Legacy, new logs are archived out of row; only loaded when read
+    build_logs = deferred(Column(Text, nullable=True))
     error_message = Column(Text, nullable=True)
     
+    # Archived build log
+    build_log_archived = Column(Boolean, default=False)
+    build_log_lines = Column(Integer, nullable=True)
+    build_log_bytes = Column(Integer, nullable=True)
+    
+    # Static deployment output, when deployed in static mode
+    artifact_path = Column(String, nullable=True)
+    
+    # Internal address of the deployment's container, proxied to from deployment_url
+    upstream_url = Column(String, nullable=True)
+    scaled_to_zero = Column(Boolean, default=False)  # container stopped while idle
+    
+    # Build cache
+    build_fingerprint = Column(String, nullable=True, index=True)
+    build_cache_hit = Column(Boolean, default=False)
+    cached_from_deployment_id = Column(String, nullable=True)
+    
     # Relationships
     project_id = Column(String, ForeignKey("projects.id"))
     project = relationship("Project", back_populates="deployments")
     
     user_id = Column(String, ForeignKey("users.id"))
     user = relationship("User", back_populates="deployments")
+    
+    # Set when brought back from the deployment archive
+    restored_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+    # Rows are still identified by id alone
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# Deployment history pages, newest first, keyset paginated on (created_at, id)
+Index("ix_deployments_project_history", Deployment.project_id, Deployment.created_at.desc(), Deployment.id.desc())
+Index("ix_deployments_user_history", Deployment.user_id, Deployment.created_at.desc(), Deployment.id.desc())
 
 
 class Domain(Base):
@@ -98,9 +152,26 @@ class Domain(Base):
     id = Column(String, primary_key=True, default=generate_uuid)
     name = Column(String, unique=True, index=True)
     verified = Column(Boolean, default=False)
+    verification_code = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
     # Relationships
     project_id = Column(String, ForeignKey("projects.id"))
-    project = relationship("Project", back_populates="domains") 
\ No newline at end of file
+    project = relationship("Project", back_populates="domains") 
+
+
+class BuildFingerprint(Base):
+    __tablename__ = "build_fingerprints"
+
+    # sha256 over the commit tree hash and every build setting that can change the output
+    fingerprint = Column(String, primary_key=True)
+    image_tag = Column(String, nullable=True)
+    artifact_path = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
+    
+    # Where the cached build came from
+    project_id = Column(String, ForeignKey("projects.id"), index=True)
+    deployment_id = Column(String)
@@ -0,0 +1,136 @@
+"""
+Monthly range partitions of the deployments table.
+
+Partitions are named `deployments_pYYYY_MM` and cover [first of month, first
+of next month) of created_at. A default partition catches rows outside every
+monthly one, so inserts never fail if partition maintenance falls behind;
+those rows move into their monthly partition when it is created.
+Everything here is a no-op on databases other than PostgreSQL.
+"""
+import logging
+import datetime
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEPLOYMENTS_TABLE = "deployments"
+PARTITION_PREFIX = f"{DEPLOYMENTS_TABLE}_p"
+DEFAULT_PARTITION = f"{DEPLOYMENTS_TABLE}_default"
+
+
+def month_start(value: datetime.datetime) -> datetime.date:
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month: datetime.date, count: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+
+def partition_month(name: str) -> datetime.date:
+    """Inverse of partition_name; raises ValueError for other tables"""
+    if not name.startswith(PARTITION_PREFIX):
+        raise ValueError(name)
+    year, month = name[len(PARTITION_PREFIX):].split("_")
+    return datetime.date(int(year), int(month), 1)
+
+
+def retention_cutoff() -> Optional[datetime.datetime]:
+    """Deployments created before this are archived, see DEPLOYMENT_RETENTION_DAYS"""
+    if settings.DEPLOYMENT_RETENTION_DAYS <= 0:
+        return None
+    return datetime.datetime.utcnow() - datetime.timedelta(days=settings.DEPLOYMENT_RETENTION_DAYS)
+
+
+def is_partitioned(connection: Connection, table: str = DEPLOYMENTS_TABLE) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :table AND relkind IN ('r', 'p')"),
+        {"table": table},
+    ).scalar()
+    return relkind == "p"
+
+
+def create_partition(connection: Connection, month: datetime.date, table: str = DEPLOYMENTS_TABLE):
+    """
+    Create one monthly partition. PostgreSQL refuses while the default
+    partition holds rows of that month, so those are moved over with the
+    default partition detached.
+    """
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    in_range = "created_at >= :start AND created_at < :end"
+    create = (
+        f"CREATE TABLE {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    )
+
+    stranded = connection.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"), bounds
+    ).scalar()
+    if not stranded:
+        connection.execute(text(create))
+        return
+
+    connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {DEFAULT_PARTITION}"))
+    connection.execute(text(create))
+    connection.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"), bounds)
+    connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+def ensure_partitions(
+    connection: Connection,
+    first_month: datetime.date,
+    last_month: datetime.date,
+    table: str = DEPLOYMENTS_TABLE,
+) -> List[str]:
+    """
+    Create any missing monthly partitions from first_month to last_month,
+    inclusive. A month that cannot be created is logged and skipped, so
+    the rest are still made.
+    """
+    if not is_partitioned(connection, table):
+        return []
+
+    created = []
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {table} DEFAULT"))
+    month = first_month
+    while month <= last_month:
+        name = partition_name(month)
+        exists = connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if not exists:
+            try:
+                with connection.begin_nested():
+                    create_partition(connection, month, table)
+                created.append(name)
+            except Exception as e:
+                logger.error(f"Error creating partition {name}: {e}")
+        month = add_months(month, 1)
+    return created
+
+
+def list_partitions(connection: Connection, table: str = DEPLOYMENTS_TABLE) -> List[str]:
+    """Names of the monthly partitions attached to the table, oldest first"""
+    if not is_partitioned(connection, table):
+        return []
+    names = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    ).scalars()
+    return sorted(name for name in names if name.startswith(PARTITION_PREFIX))
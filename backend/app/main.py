@@ -1,9 +1,14 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from app.api.api import api_router
 from app.core.config import settings
+from app.core.metrics import render_metrics
+from app.core.security import PasswordHasherBusy
+from app.services.principals import principal_cache
+from app.services.routing import normalize_host
 
 app = FastAPI(
     title="Host Engine API",
@@ -18,11 +23,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate"],
 )
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many authentication requests, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.on_event("startup")
+async def startup():
+    # Evict cached principals changed by other processes
+    principal_cache.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    principal_cache.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to Host Engine API"}
@@ -31,5 +54,14 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    # Internal metrics are only answered on API_ADMIN_HOST
+    host = request.headers.get("host", "")
+    if not settings.API_ADMIN_HOST or normalize_host(host) != normalize_host(settings.API_ADMIN_HOST):
+        raise HTTPException(status_code=404, detail="Not Found")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Front door for hosted deployments.
+
+Maps the Host header to the deployment serving it through the in-memory
+routing table, then either serves a static artifact directly or forwards
+the request to the deployment's container. Run it with:
+
+    uvicorn app.proxy:app --host 0.0.0.0 --port 80
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import render_metrics
+from app.services.routing import Route, RoutingTable, normalize_host, routing_table
+from app.services.scale_to_zero import scale_to_zero
+from app.static_server import StaticServer
+
+logger = logging.getLogger(__name__)
+
+HOP_BY_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade",
+}
+
+
+class DeploymentProxy:
+    """ASGI application routing requests to static artifacts or containers"""
+
+    def __init__(self, table: RoutingTable = routing_table):
+        self.table = table
+        self.static = StaticServer()
+        self.client: Optional[httpx.AsyncClient] = None
+        self.waking: Dict[str, asyncio.Future] = {}
+        self.activity_flusher: Optional[asyncio.Task] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+
+        if scope["type"] != "http":
+            # WebSocket upgrades are not proxied yet
+            await send({"type": "websocket.close", "code": 1011})
+            return
+
+        host = ""
+        for name, value in scope["headers"]:
+            if name == b"host":
+                host = value.decode("latin-1")
+                break
+
+        if self.is_admin_host(host):
+            if scope["path"] == "/metrics":
+                body, content_type = render_metrics()
+                await send({
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode())],
+                })
+                await send({"type": "http.response.body", "body": body})
+            else:
+                await self.static.send_status(send, 404, b"Not found")
+            return
+
+        route = self.table.resolve(host)
+        if route is None:
+            await self.static.send_status(send, 404, b"Deployment not found")
+            return
+
+        scale_to_zero.record_activity(route.deployment_id)
+        if route.artifact_path:
+            await self.static.serve(scope, send, route.artifact_path)
+        else:
+            await self.proxy_to_container(scope, receive, send, route)
+
+    def is_admin_host(self, host: str) -> bool:
+        """Internal endpoints are only answered on PROXY_ADMIN_HOST"""
+        return bool(settings.PROXY_ADMIN_HOST) and normalize_host(host) == normalize_host(settings.PROXY_ADMIN_HOST)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.table.start()
+                self.client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(60.0, connect=5.0),
+                    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=200),
+                    follow_redirects=False,
+                )
+                self.activity_flusher = asyncio.create_task(self.flush_activity())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.table.stop()
+                if self.activity_flusher:
+                    self.activity_flusher.cancel()
+                await anyio.to_thread.run_sync(scale_to_zero.flush_activity)
+                if self.client:
+                    await self.client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def flush_activity(self):
+        while True:
+            await asyncio.sleep(settings.DEPLOYMENT_ACTIVITY_FLUSH_SECONDS)
+            await anyio.to_thread.run_sync(scale_to_zero.flush_activity)
+
+    async def wake(self, deployment_id: str, stale_upstream: Optional[str] = None) -> Optional[str]:
+        """Start a stopped deployment, sharing one start between concurrent requests"""
+        future = self.waking.get(deployment_id)
+        if future is None:
+            future = asyncio.ensure_future(
+                anyio.to_thread.run_sync(scale_to_zero.wake, deployment_id, stale_upstream)
+            )
+            self.waking[deployment_id] = future
+            future.add_done_callback(lambda _: self.waking.pop(deployment_id, None))
+
+        try:
+            return await asyncio.shield(future)
+        except Exception as e:
+            logger.error(f"Error waking deployment {deployment_id}: {e}")
+            return None
+
+    async def proxy_to_container(self, scope, receive, send, route: Route):
+        upstream_url = route.upstream_url
+        if route.sleeping:
+            # Hold the request until the container is back
+            upstream_url = await self.wake(route.deployment_id)
+            if not upstream_url:
+                await self.static.send_status(send, 503, b"Deployment unavailable", [(b"retry-after", b"5")])
+                return
+
+        try:
+            await self.forward(scope, receive, send, upstream_url, raise_connect_errors=True)
+        except httpx.ConnectError:
+            # Stopped since the route was loaded, or its port changed on another proxy
+            upstream_url = await self.wake(route.deployment_id, stale_upstream=upstream_url)
+            if not upstream_url:
+                await self.static.send_status(send, 503, b"Deployment unavailable", [(b"retry-after", b"5")])
+                return
+            await self.forward(scope, receive, send, upstream_url)
+
+    def forwarded_headers(self, scope) -> List[Tuple[bytes, bytes]]:
+        headers = [(name, value) for name, value in scope["headers"] if name not in HOP_BY_HOP_HEADERS]
+        client = scope.get("client")
+        if client:
+            headers.append((b"x-forwarded-for", client[0].encode()))
+        headers.append((b"x-forwarded-proto", scope.get("scheme", "http").encode()))
+        return headers
+
+    async def forward(self, scope, receive, send, upstream_url: str, raise_connect_errors: bool = False):
+        """
+        Stream the request to the upstream and its response back to the
+        client. Connection failures are re-raised when `raise_connect_errors`
+        is set, since nothing has been sent or consumed yet.
+        """
+        async def request_body():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                yield message.get("body", b"")
+                if not message.get("more_body", False):
+                    return
+
+        path = scope.get("raw_path") or scope["path"].encode()
+        url = upstream_url.encode() + path
+        if scope.get("query_string"):
+            url += b"?" + scope["query_string"]
+
+        request = self.client.build_request(
+            scope["method"],
+            url.decode("latin-1"),
+            headers=self.forwarded_headers(scope),
+            content=request_body(),
+        )
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.ConnectError:
+            if raise_connect_errors:
+                raise
+            logger.error(f"Error connecting to {upstream_url}")
+            await self.static.send_status(send, 502, b"Bad gateway")
+            return
+        except httpx.HTTPError as e:
+            logger.error(f"Error forwarding to {upstream_url}: {e}")
+            await self.static.send_status(send, 502, b"Bad gateway")
+            return
+
+        try:
+            headers = [(name, value) for name, value in response.headers.raw if name.lower() not in HOP_BY_HOP_HEADERS]
+            await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+            async for chunk in response.aiter_raw():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            await response.aclose()
+
+
+app = DeploymentProxy()
@@ -0,0 +1,265 @@
+import os
+import gzip
+import shutil
+import hashlib
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import brotli
+# Celery's own pool; unlike multiprocessing it can start from a prefork worker's daemonic children
+from billiard.pool import Pool
+import minify_html
+import rcssmin
+import rjsmin
+
+from app.core.config import settings
+from app.core.storage import storage_dir, file_lock, link_or_copy, touch, evict_lru, remove_stale_locks
+from app.services.build_logs import BuildLogWriter
+
+logger = logging.getLogger(__name__)
+
+# Bump when the output of the pipeline changes so old cache entries are ignored
+PIPELINE_VERSION = "1"
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".html", ".htm", ".css", ".js", ".mjs", ".cjs", ".json", ".map", ".svg",
+    ".xml", ".txt", ".csv", ".md", ".wasm", ".ico", ".webmanifest", ".ttf", ".otf",
+}
+MINIFIABLE_EXTENSIONS = {".html", ".htm", ".css", ".js", ".mjs", ".cjs"}
+SUBRESOURCE_EXTENSIONS = {".css", ".js", ".mjs", ".cjs"}
+
+# Bundler output averages far longer lines than hand-written source
+MINIFIED_LINE_LENGTH = 500
+
+# Smaller files gain nothing from compression once headers are counted
+MIN_COMPRESS_BYTES = 1024
+
+# A variant is only kept when it saves at least this fraction of the body
+MIN_SAVING = 0.05
+
+
+def minify(data: bytes, extension: str) -> bytes:
+    """Minify HTML, CSS or JS, returning the input unchanged if it cannot be parsed"""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data
+
+    try:
+        if extension in (".html", ".htm"):
+            text = minify_html.minify(
+                text,
+                do_not_minify_doctype=True,
+                ensure_spec_compliant_unquoted_attribute_values=True,
+                keep_closing_tags=True,
+                keep_html_and_head_opening_tags=True,
+                minify_css=True,
+                minify_js=True,
+            )
+        elif extension == ".css":
+            text = rcssmin.cssmin(text)
+        else:
+            text = rjsmin.jsmin(text)
+    except Exception:
+        return data
+
+    minified = text.encode("utf-8")
+    return minified if len(minified) < len(data) else data
+
+
+def keep_verbatim(path: str, data: bytes) -> bool:
+    """
+    Whether a file must not be rewritten: it is already minified, a
+    sourcemap points into it, or it carries Subresource Integrity hashes.
+    """
+    if b"sourceMappingURL=" in data or os.path.exists(f"{path}.map"):
+        return True
+    if b"integrity=" in data:
+        return True
+    return len(data) / (data.count(b"\n") + 1) > MINIFIED_LINE_LENGTH
+
+
+def uses_integrity(paths: List[str]) -> bool:
+    """Whether any HTML file pins its scripts or stylesheets with integrity hashes"""
+    for path in paths:
+        if os.path.splitext(path)[1].lower() not in (".html", ".htm"):
+            continue
+        with open(path, "rb") as f:
+            if b"integrity=" in f.read():
+                return True
+    return False
+
+
+def place(src: str, dst: str):
+    """Atomically replace `dst` with a hardlink to `src`, never writing through an existing link"""
+    temp_path = f"{dst}.asset-tmp"
+    if os.path.lexists(temp_path):
+        os.remove(temp_path)
+    link_or_copy(src, temp_path)
+    os.replace(temp_path, dst)
+
+
+def process_file(
+    path: str, cache_root: str, minify_assets: bool, brotli_quality: int
+) -> Tuple[bool, int, int]:
+    """
+    Minify and precompress one file. Results are stored in the asset cache
+    under a hash of the input, so an unchanged file from an earlier
+    deployment is only linked into place.
+
+    Returns (cache hit, input bytes, bytes of the minified body).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    name = os.path.basename(path).lower()
+    extension = os.path.splitext(name)[1]
+    do_minify = (
+        minify_assets
+        and extension in MINIFIABLE_EXTENSIONS
+        and ".min." not in name
+        and not keep_verbatim(path, data)
+    )
+
+    digest = hashlib.sha256(data)
+    digest.update(f"{PIPELINE_VERSION}:{do_minify}:{brotli_quality}".encode())
+    key = digest.hexdigest()
+    entry = os.path.join(cache_root, key)
+
+    # Eviction only removes entries whose lock it can take exclusively
+    with file_lock(f"{entry}.lock", shared=True):
+        hit = os.path.isdir(entry)
+        if not hit:
+            body = minify(data, extension) if do_minify else data
+            temp_entry = tempfile.mkdtemp(dir=cache_root, prefix=".tmp-")
+            try:
+                if body is not data:
+                    with open(os.path.join(temp_entry, "body"), "wb") as f:
+                        f.write(body)
+                if len(body) >= MIN_COMPRESS_BYTES:
+                    limit = len(body) * (1 - MIN_SAVING)
+                    variants = {
+                        "br": brotli.compress(body, quality=brotli_quality),
+                        "gz": gzip.compress(body, compresslevel=9, mtime=0),
+                    }
+                    for suffix, compressed in variants.items():
+                        if len(compressed) < limit:
+                            with open(os.path.join(temp_entry, suffix), "wb") as f:
+                                f.write(compressed)
+                # Publish the entry atomically; another worker may have won the race
+                os.rename(temp_entry, entry)
+            except OSError:
+                shutil.rmtree(temp_entry, ignore_errors=True)
+                if not os.path.isdir(entry):
+                    raise
+        else:
+            touch(entry)
+
+        body_path = os.path.join(entry, "body")
+        if os.path.exists(body_path):
+            place(body_path, path)
+        for suffix in ("br", "gz"):
+            variant = os.path.join(entry, suffix)
+            if os.path.exists(variant):
+                place(variant, f"{path}.{suffix}")
+
+    return hit, len(data), os.path.getsize(path)
+
+
+class AssetPipeline:
+    """
+    Post-build stage that writes .br and .gz variants of compressible
+    assets next to the originals, so they can be served without compressing
+    at request time. With ASSET_MINIFY it also minifies HTML/CSS/JS that is
+    not already minified, sourcemapped or pinned by integrity hashes.
+
+    Files are spread over a process pool sized to the worker's cores.
+    Results are cached under STORAGE_PATH/asset-cache by content hash and
+    hardlinked into place, so files unchanged since an earlier deployment
+    cost a hash and a link. The cache is kept under ASSET_CACHE_MAX_SIZE_MB
+    by least-recently-used eviction.
+    """
+
+    def __init__(self):
+        self.max_bytes = settings.ASSET_CACHE_MAX_SIZE_MB * 1024 * 1024
+
+    @property
+    def cache_root(self) -> str:
+        return storage_dir("asset-cache")
+
+    def collect(self, output_path: str) -> List[str]:
+        """List the compressible regular files of a build output"""
+        files = []
+        for root, _, names in os.walk(output_path):
+            for name in names:
+                path = os.path.join(root, name)
+                if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and not os.path.islink(path):
+                    files.append(path)
+        return files
+
+    def _arguments(self, files: List[str]) -> List[Tuple[str, str, bool, int]]:
+        cache_root = self.cache_root
+        minify_assets = settings.ASSET_MINIFY
+        # Rewriting a script or stylesheet would break any integrity hash that pins it
+        pinned = minify_assets and uses_integrity(files)
+        return [
+            (
+                path,
+                cache_root,
+                minify_assets and not (pinned and os.path.splitext(path)[1].lower() in SUBRESOURCE_EXTENSIONS),
+                settings.ASSET_BROTLI_QUALITY,
+            )
+            for path in files
+        ]
+
+    def _run_processes(self, workers: int, files: List[str]) -> List[Tuple[bool, int, int]]:
+        chunksize = max(1, len(files) // (workers * 4))
+        with Pool(processes=workers) as pool:
+            return pool.starmap(process_file, self._arguments(files), chunksize=chunksize)
+
+    def _run_threads(self, workers: int, files: List[str]) -> List[Tuple[bool, int, int]]:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda args: process_file(*args), self._arguments(files)))
+
+    def process(self, output_path: str, log_writer: Optional[BuildLogWriter] = None) -> Dict[str, int]:
+        """Precompress (and optionally minify) the build output in place and return a summary"""
+        files = self.collect(output_path)
+        if not files:
+            return {"files": 0, "cached": 0, "bytes_in": 0, "bytes_out": 0}
+
+        workers = min(settings.ASSET_PIPELINE_WORKERS or os.cpu_count() or 1, len(files))
+        try:
+            results = self._run_processes(workers, files)
+        except OSError as e:
+            logger.info(f"Process pool unavailable ({e}), compressing assets in threads")
+            results = self._run_threads(workers, files)
+
+        summary = {
+            "files": len(results),
+            "cached": sum(1 for hit, _, _ in results if hit),
+            "bytes_in": sum(size for _, size, _ in results),
+            "bytes_out": sum(size for _, _, size in results),
+        }
+        if log_writer:
+            log_writer.write(
+                f"Optimized {summary['files']} assets ({summary['cached']} from cache), "
+                f"{summary['bytes_in']} -> {summary['bytes_out']} bytes before compression\n"
+            )
+
+        self.evict()
+        return summary
+
+    def evict(self):
+        """Drop least recently used cache entries until the cache fits its size budget"""
+        entries = [
+            os.path.join(self.cache_root, name)
+            for name in os.listdir(self.cache_root)
+            if not name.startswith(".") and not name.endswith(".lock")
+        ]
+        evict_lru(entries, self.max_bytes)
+        remove_stale_locks(self.cache_root)
+
+
+asset_pipeline = AssetPipeline()
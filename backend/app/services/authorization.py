@@ -0,0 +1,92 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import exists, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Project, project_team_members
+from app.services.principals import Principal
+
+
+class ProjectAuthorization:
+    """
+    Answers "can user U act on project P" without loading the project's team.
+
+    A principal's cached project ids settle most member checks. Anything else
+    (owner-only actions, projects joined after the principal was cached) is
+    one indexed EXISTS query over projects.owner_id and project_team_members,
+    and its result is kept for AUTHORIZATION_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self.decisions: "OrderedDict[Tuple[str, str, bool], Tuple[float, bool]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _cached(self, key: Tuple[str, str, bool]) -> Optional[bool]:
+        with self.lock:
+            entry = self.decisions.get(key)
+            if not entry:
+                return None
+            expires_at, allowed = entry
+            if expires_at < time.monotonic():
+                del self.decisions[key]
+                return None
+            self.decisions.move_to_end(key)
+            return allowed
+
+    def _remember(self, key: Tuple[str, str, bool], allowed: bool):
+        with self.lock:
+            self.decisions[key] = (time.monotonic() + settings.AUTHORIZATION_CACHE_TTL_SECONDS, allowed)
+            self.decisions.move_to_end(key)
+            while len(self.decisions) > settings.AUTHORIZATION_CACHE_SIZE:
+                self.decisions.popitem(last=False)
+
+    async def query(self, db: AsyncSession, user_id: str, project_id: str, owner_only: bool) -> bool:
+        condition = Project.owner_id == user_id
+        if not owner_only:
+            condition = or_(
+                condition,
+                exists().where(
+                    project_team_members.c.project_id == Project.id,
+                    project_team_members.c.user_id == user_id,
+                ),
+            )
+        return bool(await db.scalar(
+            select(exists().where(Project.id == project_id, condition))
+        ))
+
+    async def can_act_on_project(
+        self, db: AsyncSession, principal: Principal, project_id: str, owner_only: bool = False
+    ) -> bool:
+        if not owner_only and project_id in principal.project_ids:
+            return True
+
+        key = (principal.id, project_id, owner_only)
+        allowed = self._cached(key)
+        if allowed is None:
+            allowed = await self.query(db, principal.id, project_id, owner_only)
+            self._remember(key, allowed)
+        return allowed
+
+
+project_authorization = ProjectAuthorization()
+
+
+class ProjectAuthorizer:
+    """project_authorization bound to one request, memoizing its answers"""
+
+    def __init__(self, db: AsyncSession, principal: Principal):
+        self.db = db
+        self.principal = principal
+        self.memo: Dict[Tuple[str, bool], bool] = {}
+
+    async def can_act_on_project(self, project_id: str, owner_only: bool = False) -> bool:
+        key = (project_id, owner_only)
+        if key not in self.memo:
+            self.memo[key] = await project_authorization.can_act_on_project(
+                self.db, self.principal, project_id, owner_only=owner_only
+            )
+        return self.memo[key]
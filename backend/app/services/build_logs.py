@@ -0,0 +1,198 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def split_log_text(text: str) -> List[str]:
+    """
+    Split written text into newline-terminated lines, ending an unterminated
+    last line, so each list element is one line of the archived log too
+    """
+    parts = text.split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1] + "\n")
+    return lines
+
+
+class BuildLogWriter:
+    """
+    Buffers build output and appends it to the log store in bounded batches,
+    flushing once BUILD_LOG_BATCH_LINES lines are pending or
+    BUILD_LOG_FLUSH_SECONDS have passed since the last flush. A timer flushes
+    lines left pending after that interval, so they still reach followers
+    while the build is silent.
+    """
+
+    def __init__(self, store: "BuildLogStore", deployment_id: str):
+        self.store = store
+        self.deployment_id = deployment_id
+        self.pending: List[str] = []
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.timer: Optional[threading.Timer] = None
+
+    def write(self, text: str):
+        lines = split_log_text(text)
+        if not lines:
+            return
+        with self.lock:
+            self.pending.extend(lines)
+            due = (
+                len(self.pending) >= settings.BUILD_LOG_BATCH_LINES
+                or time.monotonic() - self.last_flush >= settings.BUILD_LOG_FLUSH_SECONDS
+            )
+            if not due and self.timer is None:
+                self.timer = threading.Timer(settings.BUILD_LOG_FLUSH_SECONDS, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.pending:
+                try:
+                    self.store.append(self.deployment_id, self.pending)
+                except Exception as e:
+                    # Losing log lines must never fail the build itself
+                    logger.error(f"Error writing build logs for {self.deployment_id}: {e}")
+                self.pending = []
+            self.last_flush = time.monotonic()
+
+    def __enter__(self) -> "BuildLogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+class BuildLogStore:
+    """
+    Live build logs kept in Redis as one list element per line, so readers
+    can fetch any line range or the tail while the build is still running.
+    A separate flag marks the log as complete. Each appended batch is also
+    recorded as "<lines>:<bytes>" in an index list, so byte ranges can be
+    served from just the batches that overlap them.
+    """
+
+    def _key(self, deployment_id: str) -> str:
+        return f"build-logs:{deployment_id}"
+
+    def _done_key(self, deployment_id: str) -> str:
+        return f"build-logs:{deployment_id}:done"
+
+    def _index_key(self, deployment_id: str) -> str:
+        return f"build-logs:{deployment_id}:index"
+
+    def writer(self, deployment_id: str) -> BuildLogWriter:
+        return BuildLogWriter(self, deployment_id)
+
+    def append(self, deployment_id: str, lines: List[str]):
+        key = self._key(deployment_id)
+        index_key = self._index_key(deployment_id)
+        size = sum(len(line.encode()) for line in lines)
+        pipe = get_redis().pipeline()
+        pipe.rpush(key, *lines)
+        pipe.rpush(index_key, f"{len(lines)}:{size}")
+        pipe.expire(key, settings.BUILD_LOG_LIVE_TTL_SECONDS)
+        pipe.expire(index_key, settings.BUILD_LOG_LIVE_TTL_SECONDS)
+        pipe.execute()
+
+    def finish(self, deployment_id: str):
+        """Mark the log as complete so followers stop waiting for more lines"""
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(self._done_key(deployment_id), 1, ex=settings.BUILD_LOG_LIVE_TTL_SECONDS)
+        pipe.expire(self._key(deployment_id), settings.BUILD_LOG_LIVE_TTL_SECONDS)
+        pipe.expire(self._index_key(deployment_id), settings.BUILD_LOG_LIVE_TTL_SECONDS)
+        pipe.execute()
+
+    def exists(self, deployment_id: str) -> bool:
+        return bool(get_redis().exists(self._key(deployment_id), self._done_key(deployment_id)))
+
+    def read(
+        self, deployment_id: str, offset: int = 0, limit: Optional[int] = None
+    ) -> Tuple[List[str], int, bool]:
+        """Return (lines starting at `offset`, total line count, done)"""
+        key = self._key(deployment_id)
+        end = -1 if limit is None else offset + limit - 1
+
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.lrange(key, offset, end)
+        pipe.llen(key)
+        pipe.exists(self._done_key(deployment_id))
+        lines, total, done = pipe.execute()
+        return lines, total, bool(done)
+
+    def index(self, deployment_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Line and byte layout of the appended batches, shaped like a log
+        archive index, or None for a log with no batches indexed
+        """
+        entries = get_redis().lrange(self._index_key(deployment_id), 0, -1)
+        if not entries:
+            return None
+        segments = []
+        first_line = byte_offset = 0
+        for entry in entries:
+            line_count, byte_length = (int(value) for value in entry.split(":"))
+            segments.append({
+                "first_line": first_line,
+                "line_count": line_count,
+                "byte_offset": byte_offset,
+                "byte_length": byte_length,
+            })
+            first_line += line_count
+            byte_offset += byte_length
+        return {"lines": first_line, "bytes": byte_offset, "segments": segments}
+
+    def read_bytes(self, deployment_id: str, index: Dict[str, Any], start: int, end: int) -> bytes:
+        """Return bytes [start, end] of the log, both inclusive, reading only the overlapping batches"""
+        overlapping = [
+            segment for segment in index["segments"]
+            if segment["byte_offset"] <= end
+            and segment["byte_offset"] + segment["byte_length"] - 1 >= start
+        ]
+        pipe = get_redis().pipeline(transaction=False)
+        for segment in overlapping:
+            first = segment["first_line"]
+            pipe.lrange(self._key(deployment_id), first, first + segment["line_count"] - 1)
+
+        chunks = []
+        for segment, lines in zip(overlapping, pipe.execute()):
+            data = "".join(lines).encode()
+            first = segment["byte_offset"]
+            chunks.append(data[max(start - first, 0):end - first + 1])
+        return b"".join(chunks)
+
+    def tail(self, deployment_id: str, count: int) -> Tuple[List[str], int, bool]:
+        """Return (last `count` lines, offset of the first returned line, done)"""
+        total = get_redis().llen(self._key(deployment_id))
+        offset = max(total - count, 0)
+        lines, _, done = self.read(deployment_id, offset=offset, limit=count)
+        return lines, offset, done
+
+    def expire(self, deployment_id: str, seconds: int):
+        """Shorten the lifetime of a log that has been archived elsewhere"""
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.expire(self._key(deployment_id), seconds)
+        pipe.expire(self._done_key(deployment_id), seconds)
+        pipe.expire(self._index_key(deployment_id), seconds)
+        pipe.execute()
+
+    def delete(self, deployment_id: str):
+        get_redis().delete(
+            self._key(deployment_id), self._done_key(deployment_id), self._index_key(deployment_id)
+        )
+
+
+build_log_store = BuildLogStore()
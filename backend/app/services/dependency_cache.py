@@ -0,0 +1,168 @@
+import os
+import glob
+import hashlib
+import tempfile
+import subprocess
+import logging
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.storage import storage_dir, file_lock, touch, evict_lru, remove_stale_locks
+
+logger = logging.getLogger(__name__)
+
+# Lockfiles at the repository root that pin the installed dependencies
+LOCKFILES = [
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "bun.lockb",
+    "requirements.txt",
+    "Pipfile.lock",
+    "poetry.lock",
+    "uv.lock",
+    "Gemfile.lock",
+    "composer.lock",
+    "go.sum",
+]
+
+# Directories restored before and saved after each build, relative to the
+# repository root. Dependency directories only change with the lockfiles, so
+# an exact key hit is never re-saved; framework caches change on every build
+# and are always saved.
+CACHE_GROUPS = {
+    "dependencies": [
+        "node_modules",
+        ".npm",
+        ".yarn/cache",
+        ".pnpm-store",
+        ".cache/pip",
+        ".venv",
+    ],
+    "framework": [
+        ".next/cache",
+        ".nuxt",
+        ".parcel-cache",
+        ".angular/cache",
+        ".svelte-kit",
+        ".cache/gatsby",
+    ],
+}
+
+
+class DependencyCache:
+    """
+    Lockfile-keyed tar archives of dependency and framework cache directories.
+
+    Archives live under STORAGE_PATH/dependency-cache/<group>/<key>.tar. The
+    key is the project plus a hash of its lockfiles; when there is no exact
+    match the project's most recently used archive is restored instead, so a
+    lockfile change still starts from a warm cache. The cache is kept under
+    DEPENDENCY_CACHE_MAX_SIZE_MB by least-recently-used eviction.
+    """
+
+    def __init__(self):
+        self.max_bytes = settings.DEPENDENCY_CACHE_MAX_SIZE_MB * 1024 * 1024
+
+    def group_path(self, group: str) -> str:
+        return storage_dir("dependency-cache", group)
+
+    def lockfile_hash(self, repo_path: str) -> str:
+        digest = hashlib.sha256()
+        for name in LOCKFILES:
+            path = os.path.join(repo_path, name)
+            if os.path.isfile(path):
+                digest.update(name.encode())
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+        return digest.hexdigest()[:32]
+
+    def cache_keys(self, project_id: str, repo_path: str) -> List[str]:
+        """Return the exact key followed by its fallback prefixes"""
+        return [f"{project_id}-{self.lockfile_hash(repo_path)}", f"{project_id}-"]
+
+    def build_env(self, repo_path: str) -> Dict[str, str]:
+        """Point package manager caches at directories inside the checkout"""
+        return {
+            "npm_config_cache": os.path.join(repo_path, ".npm"),
+            "npm_config_store_dir": os.path.join(repo_path, ".pnpm-store"),
+            "YARN_CACHE_FOLDER": os.path.join(repo_path, ".yarn/cache"),
+            "PIP_CACHE_DIR": os.path.join(repo_path, ".cache/pip"),
+        }
+
+    def _find_archive(self, group: str, keys: List[str]) -> Optional[str]:
+        exact = os.path.join(self.group_path(group), f"{keys[0]}.tar")
+        if os.path.exists(exact):
+            return exact
+
+        for prefix in keys[1:]:
+            candidates = glob.glob(os.path.join(self.group_path(group), f"{glob.escape(prefix)}*.tar"))
+            if candidates:
+                return max(candidates, key=os.path.getmtime)
+        return None
+
+    def restore(self, keys: List[str], repo_path: str) -> Dict[str, str]:
+        """Unpack the best matching archive of each group into the checkout"""
+        restored = {}
+
+        for group in CACHE_GROUPS:
+            archive = self._find_archive(group, keys)
+            if not archive:
+                continue
+
+            try:
+                with file_lock(f"{archive}.lock", shared=True):
+                    subprocess.run(["tar", "-xf", archive, "-C", repo_path], check=True)
+                touch(archive)
+                restored[group] = os.path.basename(archive)[:-len(".tar")]
+            except Exception as e:
+                logger.error(f"Error restoring {group} cache from {archive}: {e}")
+
+        return restored
+
+    def save(self, keys: List[str], repo_path: str, restored: Optional[Dict[str, str]] = None):
+        """
+        Archive the cache directories of each group after a successful build.
+        `keys` should be computed before the build, since installs may rewrite
+        the lockfiles.
+        """
+        restored = restored or {}
+        saved = []
+
+        for group, directories in CACHE_GROUPS.items():
+            if group == "dependencies" and restored.get(group) == keys[0]:
+                continue
+
+            present = [d for d in directories if os.path.isdir(os.path.join(repo_path, d))]
+            if not present:
+                continue
+
+            archive = os.path.join(self.group_path(group), f"{keys[0]}.tar")
+            fd, temp_path = tempfile.mkstemp(dir=self.group_path(group), suffix=".tmp")
+            os.close(fd)
+            try:
+                subprocess.run(["tar", "-cf", temp_path, "-C", repo_path, *present], check=True)
+                with file_lock(f"{archive}.lock"):
+                    os.replace(temp_path, archive)
+                saved.append(archive)
+            except Exception as e:
+                logger.error(f"Error saving {group} cache under {keys[0]}: {e}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+        if saved:
+            self.evict(keep=saved)
+
+    def evict(self, keep: Optional[List[str]] = None):
+        """Drop least recently used archives until the cache fits its size budget"""
+        archives = []
+        for group in CACHE_GROUPS:
+            archives.extend(glob.glob(os.path.join(self.group_path(group), "*.tar")))
+        evict_lru(archives, self.max_bytes, keep=keep)
+        for group in CACHE_GROUPS:
+            remove_stale_locks(self.group_path(group))
+
+
+dependency_cache = DependencyCache()
@@ -1,5 +1,7 @@
 import os
+import json
 import uuid
+import hashlib
 import tempfile
 import shutil
 import subprocess
@@ -9,6 +11,9 @@ import git
 import logging
 
 from app.core.config import settings
+from app.core.storage import storage_dir, link_or_copy
+from app.services.build_logs import BuildLogWriter
+from app.services.git_cache import git_mirror_cache
 
 logger = logging.getLogger(__name__)
 
@@ -25,11 +30,43 @@ class DeploymentService:
             logger.error(f"Error initializing Docker client: {str(e)}")
             self.docker_client = None
         
-    def clone_repository(self, repo_url: str, branch: str = "main") -> Tuple[str, str]:
+    def clone_repository(
+        self,
+        repo_url: str,
+        branch: str = "main",
+        fetch_strategy: str = "full",
+        sparse_paths: Optional[List[str]] = None
+    ) -> Tuple[str, str]:
         """Clone a git repository and return the path and commit hash"""
-        temp_dir = tempfile.mkdtemp()
+        # Keep checkouts on the same filesystem as the mirror cache so the
+        # object store can be hardlinked instead of copied
+        temp_dir = tempfile.mkdtemp(dir=storage_dir("workspaces"))
         try:
-            repo = git.Repo.clone_from(repo_url, temp_dir, branch=branch)
+            if fetch_strategy == "shallow":
+                repo = git.Repo.clone_from(
+                    repo_url, temp_dir, branch=branch, depth=1, single_branch=True
+                )
+            elif fetch_strategy == "partial":
+                repo = git.Repo.clone_from(
+                    repo_url, temp_dir, branch=branch, filter="blob:none", single_branch=True
+                )
+            elif fetch_strategy == "sparse":
+                # Cone mode always includes files at the repository root; blobs
+                # under the sparse paths are fetched on demand by sparse-checkout
+                repo = git.Repo.clone_from(
+                    repo_url,
+                    temp_dir,
+                    branch=branch,
+                    depth=1,
+                    filter="blob:none",
+                    single_branch=True,
+                    sparse=True
+                )
+                if sparse_paths:
+                    repo.git.sparse_checkout("set", "--cone", *sparse_paths)
+            else:
+                repo = git_mirror_cache.checkout(repo_url, branch, temp_dir)
+                
             commit_hash = repo.head.commit.hexsha
             commit_message = repo.head.commit.message
             return temp_dir, commit_hash, commit_message
@@ -38,14 +75,58 @@ class DeploymentService:
             logger.error(f"Error cloning repository: {e}")
             raise
             
+    def build_fingerprint(self, repo_path: str, build_settings: Dict[str, Any]) -> str:
+        """
+        Fingerprint the build inputs: the commit tree plus every setting that
+        can change the output. Environment variables are folded in as a hash.
+        """
+        tree_hash = git.Repo(repo_path).head.commit.tree.hexsha
+        
+        build_settings = dict(build_settings)
+        env_vars = build_settings.pop("environment_variables", None) or {}
+        env_hash = hashlib.sha256(
+            json.dumps(env_vars, sort_keys=True).encode()
+        ).hexdigest()
+        
+        payload = json.dumps(
+            {"tree": tree_hash, "env": env_hash, "settings": build_settings},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+        
+    def image_exists(self, image_tag: str) -> bool:
+        """Check that a previously built image is still available"""
+        try:
+            self.docker_client.images.get(image_tag)
+            return True
+        except docker.errors.ImageNotFound:
+            pass
+        except Exception as e:
+            logger.error(f"Error looking up image {image_tag}: {e}")
+            return False
+            
+        # Fall back to the registry if the image was pruned locally
+        if settings.DOCKER_REGISTRY != "localhost:5000":
+            try:
+                self.docker_client.images.pull(image_tag)
+                return True
+            except Exception:
+                pass
+        return False
+            
     def build_project(
         self, 
         repo_path: str, 
         build_command: Optional[str], 
         output_dir: str,
-        env_vars: Dict[str, str] = None
+        env_vars: Dict[str, str] = None,
+        log_writer: Optional[BuildLogWriter] = None
     ) -> str:
-        """Build the project and return the build output"""
+        """
+        Build the project and return the build output. When `log_writer` is
+        given, output is streamed to it line by line instead of being
+        collected in memory.
+        """
         if not env_vars:
             env_vars = {}
             
@@ -53,7 +134,7 @@ class DeploymentService:
         build_env.update(env_vars)
         
         try:
-            output = ""
+            output = []
             
             if build_command:
                 # Execute build command
@@ -68,7 +149,10 @@ class DeploymentService:
                 )
                 
                 for line in process.stdout:
-                    output += line
+                    if log_writer:
+                        log_writer.write(line)
+                    else:
+                        output.append(line)
                     
                 process.wait()
                 
@@ -80,7 +164,7 @@ class DeploymentService:
             if not os.path.exists(build_output_path):
                 os.makedirs(build_output_path)
                 
-            return output
+            return "".join(output)
             
         except Exception as e:
             logger.error(f"Error building project: {e}")
@@ -98,6 +182,7 @@ class DeploymentService:
             # Create a simple Dockerfile for the static files
             dockerfile_content = """
 FROM nginx:alpine
+RUN echo "gzip_static on;" > /etc/nginx/conf.d/gzip_static.conf
 COPY . /usr/share/nginx/html
 EXPOSE 80
 CMD ["nginx", "-g", "daemon off;"]
@@ -126,32 +211,103 @@ CMD ["nginx", "-g", "daemon off;"]
             logger.error(f"Error creating deployment image: {e}")
             raise
             
-    def deploy_image(self, image_tag: str, deployment_id: str) -> str:
-        """Deploy the image and return the deployment URL"""
+    def publish_static_artifact(self, source_path: str, deployment_id: str) -> str:
+        """
+        Publish build output into a versioned artifact directory for the shared
+        static server and return its path. Files are hardlinked where possible,
+        so publishing a build or reusing a cached one is cheap.
+        """
+        artifact_path = os.path.join(settings.STATIC_ROOT, deployment_id)
+        temp_path = os.path.join(settings.STATIC_ROOT, f".tmp-{deployment_id}")
+        
         try:
-            # Create a unique name for the container
-            container_name = f"host-engine-{deployment_id[:8]}"
+            os.makedirs(settings.STATIC_ROOT, exist_ok=True)
+            if os.path.exists(temp_path):
+                shutil.rmtree(temp_path)
+                
+            shutil.copytree(source_path, temp_path, symlinks=True, copy_function=link_or_copy)
+            
+            # Appear atomically so the server never sees a half-copied artifact
+            os.rename(temp_path, artifact_path)
+            return artifact_path
+            
+        except Exception as e:
+            logger.error(f"Error publishing static artifact: {e}")
+            if os.path.exists(temp_path):
+                shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+            
+    def remove_static_artifact(self, deployment_id: str):
+        """Remove a static deployment's artifact directory"""
+        self.cleanup(os.path.join(settings.STATIC_ROOT, deployment_id))
+        
+    def public_deployment_url(self, deployment_id: str) -> str:
+        """Public URL of a deployment, served through the front door proxy"""
+        return f"{settings.DEPLOYMENTS_URL_SCHEME}://{deployment_id}.{settings.DEPLOYMENTS_DOMAIN}"
             
-            # Run the container
+    def container_name(self, deployment_id: str) -> str:
+        return f"host-engine-{deployment_id[:8]}"
+        
+    def upstream_url(self, container) -> str:
+        """Address the proxy forwards to for a running container"""
+        container.reload()
+        host_port = list(container.ports.get("80/tcp", []))[0]["HostPort"]
+        return f"http://{settings.POSTGRES_SERVER}:{host_port}"
+            
+    def deploy_image(self, image_tag: str, deployment_id: str) -> str:
+        """Deploy the image and return the container's upstream URL"""
+        try:
+            # Run the container; "unless-stopped" keeps containers scaled to
+            # zero by the idle reaper stopped across daemon restarts
             container = self.docker_client.containers.run(
                 image_tag,
-                name=container_name,
+                name=self.container_name(deployment_id),
                 detach=True,
                 ports={"80/tcp": None},  # Auto-assign a port
-                restart_policy={"Name": "always"}
+                restart_policy={"Name": "unless-stopped"}
             )
             
-            # Get the assigned port
-            container.reload()
-            host_port = list(container.ports.get("80/tcp", []))[0]["HostPort"]
+            return self.upstream_url(container)
             
-            # Construct the deployment URL
-            deployment_url = f"http://{settings.POSTGRES_SERVER}:{host_port}"
+        except Exception as e:
+            logger.error(f"Error deploying image: {e}")
+            raise
             
-            return deployment_url
+    def start_container(self, deployment_id: str) -> str:
+        """Start a stopped deployment container and return its new upstream URL"""
+        try:
+            container = self.docker_client.containers.get(self.container_name(deployment_id))
+            if container.status != "running":
+                container.start()
+            # Docker assigns a new host port on every start
+            return self.upstream_url(container)
             
         except Exception as e:
-            logger.error(f"Error deploying image: {e}")
+            logger.error(f"Error starting container for {deployment_id}: {e}")
+            raise
+            
+    def stop_container(self, deployment_id: str, timeout: int = 10):
+        """Stop a deployment container, keeping it around to be started again"""
+        try:
+            container = self.docker_client.containers.get(self.container_name(deployment_id))
+            container.stop(timeout=timeout)
+            
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            logger.error(f"Error stopping container for {deployment_id}: {e}")
+            raise
+            
+    def remove_container(self, deployment_id: str):
+        """Remove a deployment container for good"""
+        try:
+            container = self.docker_client.containers.get(self.container_name(deployment_id))
+            container.remove(force=True)
+            
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            logger.error(f"Error removing container for {deployment_id}: {e}")
             raise
             
     def cleanup(self, repo_path: str):
@@ -0,0 +1,209 @@
+import gzip
+import json
+import logging
+import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import DateTime, and_, exists, or_, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.db.base import SessionLocal, engine
+from app.db.models import Deployment, Project
+from app.db.partitions import (
+    add_months,
+    ensure_partitions,
+    list_partitions,
+    month_start,
+    partition_month,
+    retention_cutoff,
+)
+from app.services.deployment import deployment_service
+from app.services.log_archive import build_log_archive
+from app.services.routing import publish_route_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Stored next to the deployment's build log segments
+RECORD_NAME = "deployment.json.gz"
+
+# Fields describing where a deployment was served; cleared on restore, since
+# the container and static artifact are gone once a deployment is archived
+SERVING_FIELDS = {"deployment_url": None, "artifact_path": None, "upstream_url": None, "scaled_to_zero": False}
+
+
+def dump_record(deployment: Deployment) -> bytes:
+    record = {}
+    for column in Deployment.__table__.columns:
+        value = getattr(deployment, column.key)
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        record[column.key] = value
+    return gzip.compress(json.dumps(record).encode())
+
+
+def load_record(data: bytes) -> Dict[str, Any]:
+    record = json.loads(gzip.decompress(data))
+    for column in Deployment.__table__.columns:
+        if isinstance(column.type, DateTime) and record.get(column.key):
+            record[column.key] = datetime.datetime.fromisoformat(record[column.key])
+    return record
+
+
+class DeploymentArchive:
+    """
+    Keeps the deployments table to DEPLOYMENT_RETENTION_DAYS of history.
+
+    The table is range partitioned by month of created_at. Finished
+    deployments older than the retention window are written to the log
+    archive's storage (local or S3) beside their build log, then deleted, and
+    monthly partitions left empty are dropped. Production deployments (the
+    newest ready one of each project) are never archived.
+    """
+
+    def ensure_partitions(self) -> List[str]:
+        """Create the current month's partition and the next few ahead of time"""
+        current = month_start(datetime.datetime.utcnow())
+        with engine.begin() as connection:
+            created = ensure_partitions(
+                connection, current, add_months(current, settings.DEPLOYMENT_PARTITION_PREMAKE_MONTHS)
+            )
+        if created:
+            logger.info(f"Created deployment partitions: {', '.join(created)}")
+        return created
+
+    def expired(self, db, cutoff: datetime.datetime, limit: int) -> List[Deployment]:
+        newer = aliased(Deployment)
+        production = and_(
+            Deployment.status == "ready",
+            ~exists().where(
+                newer.project_id == Deployment.project_id,
+                newer.status == "ready",
+                newer.created_at > Deployment.created_at,
+            ),
+        )
+        return (
+            db.query(Deployment)
+            .filter(Deployment.created_at < cutoff)
+            .filter(Deployment.status.notin_(["queued", "building"]))
+            .filter(or_(Deployment.restored_at.is_(None), Deployment.restored_at < cutoff))
+            .filter(~production)
+            .order_by(Deployment.created_at)
+            .limit(limit)
+            .all()
+        )
+
+    def archive(self, db, deployment: Deployment):
+        """Move one deployment out of the database"""
+        # Legacy logs join the archived ones so the row can be dropped whole
+        if deployment.build_logs is not None:
+            index = build_log_archive.archive_text(deployment.id, deployment.build_logs)
+            deployment.build_logs = None
+            deployment.build_log_archived = True
+            deployment.build_log_lines = index["lines"]
+            deployment.build_log_bytes = index["bytes"]
+
+        build_log_archive.backend.write(f"{deployment.id}/{RECORD_NAME}", dump_record(deployment))
+        db.delete(deployment)
+        db.commit()
+
+        # Anything still serving the old deployment goes with it
+        if deployment.artifact_path:
+            deployment_service.remove_static_artifact(deployment.id)
+        if deployment.upstream_url:
+            try:
+                deployment_service.remove_container(deployment.id)
+            except Exception:
+                pass  # logged by remove_container; the record is archived either way
+        publish_route_invalidation(deployment.project_id)
+
+    def archive_expired(self) -> int:
+        """Archive expired deployments in batches of DEPLOYMENT_ARCHIVE_BATCH"""
+        cutoff = retention_cutoff()
+        if not cutoff:
+            return 0
+
+        archived = 0
+        db = SessionLocal()
+        try:
+            while True:
+                deployments = self.expired(db, cutoff, settings.DEPLOYMENT_ARCHIVE_BATCH)
+                for deployment in deployments:
+                    try:
+                        self.archive(db, deployment)
+                        archived += 1
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Error archiving deployment {deployment.id}: {e}")
+                        return archived
+                if len(deployments) < settings.DEPLOYMENT_ARCHIVE_BATCH:
+                    return archived
+        finally:
+            db.close()
+
+    def drop_expired_partitions(self) -> List[str]:
+        """Drop monthly partitions wholly before the retention window once they are empty"""
+        cutoff = retention_cutoff()
+        if not cutoff:
+            return []
+
+        dropped = []
+        with engine.begin() as connection:
+            for name in list_partitions(connection):
+                if add_months(partition_month(name), 1) > cutoff.date():
+                    continue
+                # Production deployments keep their partition around
+                if connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+                    continue
+                connection.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+        if dropped:
+            logger.info(f"Dropped deployment partitions: {', '.join(dropped)}")
+        return dropped
+
+    def load(self, deployment_id: str) -> Optional[Dict[str, Any]]:
+        """The archived record of a deployment, if it has one"""
+        data = build_log_archive.backend.read(f"{deployment_id}/{RECORD_NAME}")
+        return load_record(data) if data else None
+
+    def restore(self, deployment_id: str) -> Optional[str]:
+        """
+        Put an archived deployment back in the deployments table, with its
+        build log, for DEPLOYMENT_RETENTION_DAYS. It is not redeployed, so
+        routes are unchanged. Returns the project id, or None if there was
+        nothing to restore or its project no longer exists.
+        """
+        record = self.load(deployment_id)
+        if not record:
+            return None
+
+        created_month = month_start(record["created_at"])
+        with engine.begin() as connection:
+            ensure_partitions(connection, created_month, created_month)
+
+        db = SessionLocal()
+        try:
+            if not db.get(Deployment, deployment_id):
+                if not db.get(Project, record["project_id"]):
+                    return None
+                db.add(Deployment(**{
+                    **record,
+                    **SERVING_FIELDS,
+                    "restored_at": datetime.datetime.utcnow(),
+                }))
+                try:
+                    db.commit()
+                except IntegrityError as e:
+                    # The project was deleted after the check above
+                    db.rollback()
+                    logger.warning(f"Could not restore deployment {deployment_id}: {e}")
+                    return None
+        finally:
+            db.close()
+
+        build_log_archive.backend.delete_prefix(f"{deployment_id}/{RECORD_NAME}")
+        return record["project_id"]
+
+
+deployment_archive = DeploymentArchive()
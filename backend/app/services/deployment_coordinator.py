@@ -0,0 +1,80 @@
+import logging
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.models import Deployment, Project
+from app.api import async_crud, crud
+from app.api.schemas.deployment import DeploymentCreate
+from app.workers.tasks import BUILD_WAITING_STAGE, deploy_project
+
+logger = logging.getLogger(__name__)
+
+
+class DeploymentCoordinator:
+    """
+    Single entry point for queuing deployments.
+
+    Only the newest commit of a project and branch is worth building: when a
+    deployment is submitted, older ones that have not started building are
+    canceled. With SUPERSEDE_CANCEL_CLONING, one that is still cloning is
+    canceled too and stops at its next stage boundary. Builds of the same
+    project are serialized by a Redis lock.
+    """
+
+    def superseded_stages(self) -> List[str]:
+        """Building stages in which an older deployment may still be canceled"""
+        stages = [BUILD_WAITING_STAGE]
+        if settings.SUPERSEDE_CANCEL_CLONING:
+            stages.append("clone")
+        return stages
+
+    def submit(
+        self, db: Session, *, project: Project, obj_in: DeploymentCreate, user_id: str
+    ) -> Deployment:
+        deployment = crud.deployment.create(
+            db=db, obj_in=obj_in, user_id=user_id, branch=project.branch
+        )
+
+        superseded = crud.deployment.cancel_superseded(
+            db=db,
+            project_id=project.id,
+            branch=project.branch,
+            created_before=deployment.created_at,
+            superseded_by=deployment.id,
+            stages=self.superseded_stages(),
+        )
+        if superseded:
+            logger.info(f"Deployment {deployment.id} superseded {', '.join(superseded)}")
+
+        deploy_project.delay(deployment_id=deployment.id)
+        return deployment
+
+    async def submit_async(
+        self, db: AsyncSession, *, project: Project, obj_in: DeploymentCreate, user_id: str
+    ) -> Deployment:
+        """submit() for request handlers on an async session"""
+        deployment = await async_crud.deployment.create(
+            db=db, obj_in=obj_in, user_id=user_id, branch=project.branch
+        )
+
+        superseded = await async_crud.deployment.cancel_superseded(
+            db=db,
+            project_id=project.id,
+            branch=project.branch,
+            created_before=deployment.created_at,
+            superseded_by=deployment.id,
+            stages=self.superseded_stages(),
+        )
+        if superseded:
+            logger.info(f"Deployment {deployment.id} superseded {', '.join(superseded)}")
+
+        # Publishing to the broker is blocking
+        await run_in_threadpool(deploy_project.delay, deployment_id=deployment.id)
+        return deployment
+
+
+deployment_coordinator = DeploymentCoordinator()
@@ -0,0 +1,79 @@
+import os
+import logging
+from typing import Tuple
+
+import git
+
+from app.core.config import settings
+from app.core.repository import repository_cache_key
+from app.core.storage import storage_dir, file_lock, touch, evict_lru, remove_stale_locks
+
+logger = logging.getLogger(__name__)
+
+
+class GitMirrorCache:
+    """
+    Per-repository bare mirrors under STORAGE_PATH.
+
+    Each checkout fetches only the new objects for the requested branch
+    into the mirror, then makes a local clone whose object store is
+    hardlinked to the mirror. Mirrors are shared between Celery workers
+    through flock and evicted least-recently-used once the cache grows
+    past GIT_CACHE_MAX_SIZE_MB.
+    """
+
+    def __init__(self):
+        self.max_bytes = settings.GIT_CACHE_MAX_SIZE_MB * 1024 * 1024
+
+    @property
+    def mirrors_path(self) -> str:
+        return storage_dir("git-mirrors")
+
+    def mirror_path(self, repo_url: str) -> str:
+        return os.path.join(self.mirrors_path, f"{repository_cache_key(repo_url)}.git")
+
+    def fetch(self, repo_url: str, branch: str) -> Tuple[str, str]:
+        """Bring the mirror up to date for `branch` and return (mirror path, tip commit)"""
+        mirror_path = self.mirror_path(repo_url)
+        refspec = f"+refs/heads/{branch}:refs/heads/{branch}"
+
+        with file_lock(f"{mirror_path}.lock"):
+            if os.path.isdir(mirror_path):
+                mirror = git.Repo(mirror_path)
+            else:
+                mirror = git.Repo.init(mirror_path, bare=True)
+
+            # Fetch by URL rather than a configured remote so credentials
+            # embedded in the URL are never persisted in the mirror config
+            mirror.git.fetch("--prune", "--no-tags", repo_url, refspec)
+            commit_hash = mirror.commit(f"refs/heads/{branch}").hexsha
+            touch(mirror_path)
+
+        return mirror_path, commit_hash
+
+    def checkout(self, repo_url: str, branch: str, dest: str) -> git.Repo:
+        """Fetch into the mirror and check out the branch tip into `dest`"""
+        mirror_path, commit_hash = self.fetch(repo_url, branch)
+
+        with file_lock(f"{mirror_path}.lock", shared=True):
+            repo = git.Repo.clone_from(mirror_path, dest, branch=branch, local=True)
+
+        # Another worker may have moved the branch between our fetch and clone
+        if repo.head.commit.hexsha != commit_hash:
+            repo.git.reset("--hard", commit_hash)
+
+        self.evict(keep=mirror_path)
+        return repo
+
+    def evict(self, keep: str = None):
+        """Drop least recently used mirrors until the cache fits its size budget"""
+        mirrors = [
+            os.path.join(self.mirrors_path, name)
+            for name in os.listdir(self.mirrors_path)
+            if name.endswith(".git")
+        ]
+        evict_lru(mirrors, self.max_bytes, keep=[keep] if keep else None)
+        remove_stale_locks(self.mirrors_path)
+
+
+git_mirror_cache = GitMirrorCache()
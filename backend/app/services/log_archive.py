@@ -0,0 +1,270 @@
+import os
+import gzip
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import boto3
+
+from app.core.config import settings
+from app.core.storage import storage_dir, remove_path
+from app.services.build_logs import build_log_store
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.json"
+
+
+def split_lines(data: bytes) -> List[str]:
+    """Split on newlines only, keeping them, so line numbers match the index"""
+    parts = data.decode("utf-8", errors="replace").split("\n")
+    lines = [part + "\n" for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    return lines
+
+
+class LocalLogBackend:
+    """Segment files under STORAGE_PATH/build-logs"""
+
+    def _path(self, name: str) -> str:
+        # Names are built from deployment ids; never let one leave the log directory
+        if os.path.isabs(name) or ".." in name.split("/") or "\\" in name:
+            raise ValueError(f"Invalid build log name: {name!r}")
+        return os.path.join(storage_dir("build-logs"), name)
+
+    def write(self, name: str, data: bytes):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def read(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete_prefix(self, prefix: str):
+        remove_path(self._path(prefix))
+
+
+class S3LogBackend:
+    """Segment objects in the configured S3 bucket"""
+
+    def __init__(self):
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT,
+            aws_access_key_id=settings.S3_ACCESS_KEY,
+            aws_secret_access_key=settings.S3_SECRET_KEY,
+        )
+
+    def _key(self, name: str) -> str:
+        return f"build-logs/{name}"
+
+    def write(self, name: str, data: bytes):
+        self.client.put_object(Bucket=settings.S3_BUCKET, Key=self._key(name), Body=data)
+
+    def read(self, name: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=settings.S3_BUCKET, Key=self._key(name))
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def delete_prefix(self, prefix: str):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=settings.S3_BUCKET, Prefix=self._key(prefix)):
+            objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(Bucket=settings.S3_BUCKET, Delete={"Objects": objects})
+
+
+class LogArchiveWriter:
+    """
+    Writes a build log as independently gzipped segments of about
+    BUILD_LOG_SEGMENT_BYTES each, plus an index of where every segment
+    starts in lines and bytes.
+
+    Logs larger than BUILD_LOG_HEAD_BYTES + BUILD_LOG_TAIL_BYTES keep only
+    their head and tail, joined by a marker line saying what was omitted.
+    """
+
+    def __init__(self, backend, deployment_id: str):
+        self.backend = backend
+        self.deployment_id = deployment_id
+        self.segments: List[Dict[str, Any]] = []
+        self.buffer: List[bytes] = []
+        self.buffer_bytes = 0
+        self.stored_lines = 0
+        self.stored_bytes = 0
+        self.original_lines = 0
+        self.original_bytes = 0
+        self.tail: Deque[bytes] = deque()
+        self.tail_bytes = 0
+        self.omitted_lines = 0
+        self.omitted_bytes = 0
+
+    def write(self, lines: List[str]):
+        for line in lines:
+            if not line.endswith("\n"):
+                line += "\n"
+            data = line.encode("utf-8", errors="replace")
+            self.original_lines += 1
+            self.original_bytes += len(data)
+
+            if self.stored_bytes + self.buffer_bytes < settings.BUILD_LOG_HEAD_BYTES:
+                self._store(data)
+                continue
+
+            # Past the head budget: keep a rolling window of the most recent lines
+            self.tail.append(data)
+            self.tail_bytes += len(data)
+            while self.tail_bytes > settings.BUILD_LOG_TAIL_BYTES and len(self.tail) > 1:
+                dropped = self.tail.popleft()
+                self.tail_bytes -= len(dropped)
+                self.omitted_lines += 1
+                self.omitted_bytes += len(dropped)
+
+    def _store(self, data: bytes):
+        self.buffer.append(data)
+        self.buffer_bytes += len(data)
+        if self.buffer_bytes >= settings.BUILD_LOG_SEGMENT_BYTES:
+            self._flush_segment()
+
+    def _flush_segment(self):
+        if not self.buffer:
+            return
+
+        name = f"{len(self.segments):05d}.log.gz"
+        compressed = gzip.compress(b"".join(self.buffer), compresslevel=6, mtime=0)
+        self.backend.write(f"{self.deployment_id}/{name}", compressed)
+
+        self.segments.append({
+            "name": name,
+            "first_line": self.stored_lines,
+            "line_count": len(self.buffer),
+            "byte_offset": self.stored_bytes,
+            "byte_length": self.buffer_bytes,
+            "compressed_length": len(compressed),
+        })
+        self.stored_lines += len(self.buffer)
+        self.stored_bytes += self.buffer_bytes
+        self.buffer = []
+        self.buffer_bytes = 0
+
+    def close(self) -> Dict[str, Any]:
+        """Write the remaining lines and the index, and return the index"""
+        if self.omitted_lines:
+            marker = (
+                f"... {self.omitted_lines} lines ({self.omitted_bytes} bytes) "
+                f"omitted from the middle of this log ...\n"
+            )
+            self._store(marker.encode())
+        while self.tail:
+            self._store(self.tail.popleft())
+        self._flush_segment()
+
+        index = {
+            "lines": self.stored_lines,
+            "bytes": self.stored_bytes,
+            "original_lines": self.original_lines,
+            "original_bytes": self.original_bytes,
+            "omitted_lines": self.omitted_lines,
+            "omitted_bytes": self.omitted_bytes,
+            "segments": self.segments,
+        }
+        self.backend.write(f"{self.deployment_id}/{INDEX_NAME}", json.dumps(index).encode())
+        return index
+
+
+class BuildLogArchive:
+    """
+    Completed build logs stored out of the database as compressed segments.
+    Line and byte ranges are served by decompressing only the segments that
+    overlap the requested range.
+    """
+
+    def __init__(self):
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = S3LogBackend() if settings.STORAGE_TYPE == "s3" else LocalLogBackend()
+        return self._backend
+
+    def writer(self, deployment_id: str) -> LogArchiveWriter:
+        return LogArchiveWriter(self.backend, deployment_id)
+
+    def archive_from_store(self, deployment_id: str) -> Dict[str, Any]:
+        """Copy a finished live log into the archive in bounded batches"""
+        writer = self.writer(deployment_id)
+        offset = 0
+        while True:
+            lines, total, _ = build_log_store.read(
+                deployment_id, offset, settings.BUILD_LOG_BATCH_LINES * 10
+            )
+            if not lines:
+                break
+            writer.write(lines)
+            offset += len(lines)
+            if offset >= total:
+                break
+        return writer.close()
+
+    def archive_text(self, deployment_id: str, text: str) -> Dict[str, Any]:
+        """Archive a log that is already held in memory, such as a legacy build_logs value"""
+        writer = self.writer(deployment_id)
+        writer.write(split_lines(text.encode()))
+        return writer.close()
+
+    def index(self, deployment_id: str) -> Optional[Dict[str, Any]]:
+        data = self.backend.read(f"{deployment_id}/{INDEX_NAME}")
+        return json.loads(data) if data else None
+
+    def _segment(self, deployment_id: str, segment: Dict[str, Any]) -> bytes:
+        data = self.backend.read(f"{deployment_id}/{segment['name']}")
+        return gzip.decompress(data) if data else b""
+
+    def read_lines(
+        self, deployment_id: str, index: Dict[str, Any], offset: int, limit: int
+    ) -> List[str]:
+        end = offset + limit
+        lines: List[str] = []
+        for segment in index["segments"]:
+            first = segment["first_line"]
+            last = first + segment["line_count"]
+            if last <= offset or first >= end:
+                continue
+            segment_lines = split_lines(self._segment(deployment_id, segment))
+            lines.extend(segment_lines[max(offset - first, 0):end - first])
+        return lines
+
+    def tail(self, deployment_id: str, index: Dict[str, Any], count: int) -> Tuple[List[str], int]:
+        """Return the last `count` lines and the offset of the first one"""
+        offset = max(index["lines"] - count, 0)
+        return self.read_lines(deployment_id, index, offset, count), offset
+
+    def read_bytes(self, deployment_id: str, index: Dict[str, Any], start: int, end: int) -> bytes:
+        """Return bytes [start, end] of the stored log, both inclusive"""
+        chunks = []
+        for segment in index["segments"]:
+            first = segment["byte_offset"]
+            last = first + segment["byte_length"] - 1
+            if last < start or first > end:
+                continue
+            data = self._segment(deployment_id, segment)
+            chunks.append(data[max(start - first, 0):end - first + 1])
+        return b"".join(chunks)
+
+    def delete(self, deployment_id: str):
+        self.backend.delete_prefix(deployment_id)
+
+
+build_log_archive = BuildLogArchive()
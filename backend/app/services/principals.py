@@ -0,0 +1,239 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import FrozenSet, Iterable, NamedTuple, Optional
+
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis
+from app.db.models import Project, User, project_team_members
+
+logger = logging.getLogger(__name__)
+
+# Published with user ids whenever a cached principal changes
+PRINCIPAL_CHANNEL = "principals:invalidate"
+
+
+class Principal(NamedTuple):
+    """The authenticated user as seen by access checks"""
+    id: str
+    is_active: bool
+    is_superuser: bool
+    project_ids: FrozenSet[str]  # owned and team projects
+
+
+def principal_cache_key(user_id: str) -> str:
+    return f"principal:{user_id}"
+
+
+def principal_version_key(user_id: str) -> str:
+    return f"principal-version:{user_id}"
+
+
+# Cache a loaded principal only if no invalidation bumped the user's version
+# since the load started, so a stale load can't outlive an invalidation
+SET_IF_VERSION_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def dump_principal(principal: Principal) -> str:
+    return json.dumps({
+        "id": principal.id,
+        "is_active": principal.is_active,
+        "is_superuser": principal.is_superuser,
+        "project_ids": sorted(principal.project_ids),
+    })
+
+
+def load_principal(data: str) -> Principal:
+    fields = json.loads(data)
+    return Principal(
+        id=fields["id"],
+        is_active=fields["is_active"],
+        is_superuser=fields["is_superuser"],
+        project_ids=frozenset(fields["project_ids"]),
+    )
+
+
+def publish_principal_invalidation(user_ids: Iterable[Optional[str]]):
+    """
+    Drop cached principals of users whose account or project memberships
+    changed, in Redis and in every API process. Failures are logged, the
+    caches expire on their own.
+    """
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    if not user_ids:
+        return
+    try:
+        pipe = get_redis().pipeline()
+        for user_id in user_ids:
+            pipe.incr(principal_version_key(user_id))
+        pipe.delete(*[principal_cache_key(user_id) for user_id in user_ids])
+        pipe.publish(PRINCIPAL_CHANNEL, json.dumps({"user_ids": user_ids}))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Error invalidating principals {user_ids}: {e}")
+
+
+async def publish_principal_invalidation_async(user_ids: Iterable[Optional[str]]):
+    """publish_principal_invalidation for request handlers"""
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    if not user_ids:
+        return
+    try:
+        pipe = get_async_redis().pipeline()
+        for user_id in user_ids:
+            pipe.incr(principal_version_key(user_id))
+        pipe.delete(*[principal_cache_key(user_id) for user_id in user_ids])
+        pipe.publish(PRINCIPAL_CHANNEL, json.dumps({"user_ids": user_ids}))
+        await pipe.execute()
+    except Exception as e:
+        logger.error(f"Error invalidating principals {user_ids}: {e}")
+
+
+class PrincipalCache:
+    """
+    Resolves token subjects to principals without a database round trip.
+
+    Principals are shared between API processes through Redis for
+    PRINCIPAL_CACHE_TTL_SECONDS, and each process keeps a bounded LRU of
+    recent ones for PRINCIPAL_LOCAL_TTL_SECONDS. Invalidations are published
+    so every process evicts its local copy; when the listener reconnects the
+    local cache is cleared, since messages may have been missed.
+    Invalidation also bumps a per-user version, and a principal loaded from
+    the database is only cached if the version it started from still holds.
+    """
+
+    def __init__(self):
+        self.local: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.listener: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    def get_local(self, user_id: str) -> Optional[Principal]:
+        with self.lock:
+            entry = self.local.get(user_id)
+            if not entry:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self.local[user_id]
+                return None
+            self.local.move_to_end(user_id)
+            return principal
+
+    def set_local(self, principal: Principal):
+        with self.lock:
+            self.local[principal.id] = (time.monotonic() + settings.PRINCIPAL_LOCAL_TTL_SECONDS, principal)
+            self.local.move_to_end(principal.id)
+            while len(self.local) > settings.PRINCIPAL_LOCAL_CACHE_SIZE:
+                self.local.popitem(last=False)
+
+    def evict_local(self, user_ids: Optional[Iterable[str]] = None):
+        with self.lock:
+            if user_ids is None:
+                self.local.clear()
+                return
+            for user_id in user_ids:
+                self.local.pop(user_id, None)
+
+    async def load(self, db: AsyncSession, user_id: str) -> Optional[Principal]:
+        user = await db.get(User, user_id)
+        if not user:
+            return None
+        project_ids = await db.scalars(union(
+            select(Project.id).where(Project.owner_id == user_id),
+            select(project_team_members.c.project_id).where(project_team_members.c.user_id == user_id),
+        ))
+        return Principal(
+            id=user.id,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            project_ids=frozenset(project_ids),
+        )
+
+    async def get(self, db: AsyncSession, user_id: str) -> Optional[Principal]:
+        principal = self.get_local(user_id)
+        if principal:
+            return principal
+
+        redis = get_async_redis()
+        try:
+            cached, version = await redis.mget(principal_cache_key(user_id), principal_version_key(user_id))
+        except Exception as e:
+            logger.error(f"Error reading principal cache: {e}")
+            cached = version = None
+
+        if cached:
+            principal = load_principal(cached)
+        else:
+            principal = await self.load(db, user_id)
+            if not principal:
+                return None
+            try:
+                stored = await redis.eval(
+                    SET_IF_VERSION_SCRIPT,
+                    2,
+                    principal_cache_key(user_id),
+                    principal_version_key(user_id),
+                    version or "0",
+                    dump_principal(principal),
+                    settings.PRINCIPAL_CACHE_TTL_SECONDS,
+                )
+            except Exception as e:
+                logger.error(f"Error writing principal cache: {e}")
+                stored = False
+            if not stored:
+                # Invalidated while loading (or Redis is down); serve it, don't keep it
+                return principal
+
+        self.set_local(principal)
+        return principal
+
+    def _listen(self):
+        while not self.stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(PRINCIPAL_CHANNEL)
+                self.evict_local()
+
+                while not self.stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message:
+                        continue
+                    self.evict_local(json.loads(message["data"]).get("user_ids") or [])
+            except Exception as e:
+                logger.error(f"Principal listener error, reconnecting: {e}")
+                time.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        """Follow invalidations in a background thread"""
+        if self.listener and self.listener.is_alive():
+            return
+        self.stopped.clear()
+        self.listener = threading.Thread(target=self._listen, name="principal-listener", daemon=True)
+        self.listener.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.listener:
+            self.listener.join(timeout=5)
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,319 @@
+import json
+import time
+import logging
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis
+from app.db.base import SessionLocal
+from app.db.models import Deployment, Domain
+
+logger = logging.getLogger(__name__)
+
+ROUTING_CHANNEL = "routing:invalidate"
+
+
+class Route(NamedTuple):
+    """Where requests for a host go"""
+    deployment_id: str
+    project_id: str
+    upstream_url: Optional[str]  # container deployments
+    artifact_path: Optional[str]  # static deployments
+    sleeping: bool = False  # container stopped until the next request
+
+
+def normalize_host(host: str) -> str:
+    """Lowercase a Host header and strip its port and trailing dot"""
+    host = host.strip().lower()
+    if host.startswith("["):
+        return host.split("]")[0] + "]"
+    return host.split(":")[0].rstrip(".")
+
+
+def is_platform_host(name: str) -> bool:
+    """
+    Whether a domain name falls under DEPLOYMENTS_DOMAIN, where every host
+    belongs to a deployment or project subdomain. A wildcard above the
+    platform domain counts too, since it would catch its unmatched hosts.
+    """
+    host = normalize_host(name)
+    platform = normalize_host(settings.DEPLOYMENTS_DOMAIN)
+    if host.startswith("*."):
+        host = host[2:]
+        if platform.endswith(f".{host}"):
+            return True
+    return host == platform or host.endswith(f".{platform}")
+
+
+def publish_route_invalidation(project_id: Optional[str]):
+    """
+    Tell every routing table to reload a project's routes. Failures are
+    logged and swallowed, since routes are also rebuilt in full whenever a
+    listener reconnects.
+    """
+    if not project_id:
+        return
+    try:
+        get_redis().publish(ROUTING_CHANNEL, json.dumps({"project_id": project_id}))
+    except Exception as e:
+        logger.error(f"Error publishing route invalidation for {project_id}: {e}")
+
+
+async def publish_route_invalidation_async(project_id: Optional[str]):
+    """publish_route_invalidation for request handlers"""
+    if not project_id:
+        return
+    try:
+        await get_async_redis().publish(ROUTING_CHANNEL, json.dumps({"project_id": project_id}))
+    except Exception as e:
+        logger.error(f"Error publishing route invalidation for {project_id}: {e}")
+
+
+class SuffixTrie:
+    """Wildcard domains (*.example.com) keyed by their labels in reverse order"""
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def _labels(self, suffix: str) -> List[str]:
+        return list(reversed(suffix.split(".")))
+
+    def insert(self, suffix: str, route: Route):
+        node = self.root
+        for label in self._labels(suffix):
+            node = node.setdefault(label, {})
+        node[None] = route
+
+    def get(self, suffix: str) -> Optional[Route]:
+        node = self.root
+        for label in self._labels(suffix):
+            node = node.get(label)
+            if node is None:
+                return None
+        return node.get(None)
+
+    def remove(self, suffix: str, project_id: Optional[str] = None):
+        """Drop a wildcard, only if `project_id` still owns it when given"""
+        labels = self._labels(suffix)
+        nodes = [self.root]
+        for label in labels:
+            node = nodes[-1].get(label)
+            if node is None:
+                return
+            nodes.append(node)
+        route = nodes[-1].get(None)
+        if route is None or (project_id and route.project_id != project_id):
+            return
+        del nodes[-1][None]
+
+        # Prune branches left without routes
+        for depth in range(len(labels), 0, -1):
+            if nodes[depth]:
+                break
+            del nodes[depth - 1][labels[depth - 1]]
+
+    def match(self, host: str) -> Optional[Route]:
+        """Return the route of the longest wildcard suffix strictly below `host`"""
+        labels = self._labels(host)
+        node = self.root
+        best = None
+        # The last label must be matched by the wildcard itself
+        for label in labels[:-1]:
+            node = node.get(label)
+            if node is None:
+                break
+            best = node.get(None, best)
+        return best
+
+
+def project_routes(deployments: Iterable[Deployment], domains: Iterable[Domain]) -> Dict[str, Route]:
+    """
+    Build a project's host map from its ready deployments, newest first, and
+    its verified domains. Every deployment keeps its own subdomain; the
+    newest one also answers on the production alias and custom domains.
+    Custom domains under DEPLOYMENTS_DOMAIN are never routed.
+    """
+    routes: Dict[str, Route] = {}
+    production = None
+    for deployment in deployments:
+        route = Route(
+            deployment_id=deployment.id,
+            project_id=deployment.project_id,
+            upstream_url=deployment.upstream_url,
+            artifact_path=deployment.artifact_path,
+            sleeping=bool(deployment.scaled_to_zero),
+        )
+        if not route.upstream_url and not route.artifact_path:
+            continue
+        routes[f"{deployment.id}.{settings.DEPLOYMENTS_DOMAIN}"] = route
+        if production is None:
+            production = route
+
+    if production:
+        routes[f"{production.project_id}.{settings.DEPLOYMENTS_DOMAIN}"] = production
+        for domain in domains:
+            if not domain.verified:
+                continue
+            if is_platform_host(domain.name):
+                logger.warning(f"Ignoring domain {domain.name} of project {production.project_id} under the platform domain")
+                continue
+            routes[normalize_host(domain.name)] = production
+    return routes
+
+
+class RoutingTable:
+    """
+    In-process map from Host header to the deployment serving it.
+
+    Exact hosts are a dict lookup and wildcard domains a suffix trie walk, so
+    resolving a request never touches the database. The table is loaded in
+    full on start and then reloaded one project at a time when an
+    invalidation arrives over Redis pub/sub.
+    """
+
+    def __init__(self):
+        self.exact: Dict[str, Route] = {}
+        self.wildcards = SuffixTrie()
+        self.hosts_by_project: Dict[str, Set[str]] = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.listener: Optional[threading.Thread] = None
+
+    def resolve(self, host: str) -> Optional[Route]:
+        host = normalize_host(host)
+        route = self.exact.get(host)
+        if route is None:
+            route = self.wildcards.match(host)
+        return route
+
+    def _remove_hosts(self, project_id: str, hosts: Iterable[str]):
+        # Another project may have claimed a host since this one was loaded
+        for host in hosts:
+            if host.startswith("*."):
+                self.wildcards.remove(host[2:], project_id)
+            else:
+                route = self.exact.get(host)
+                if route is not None and route.project_id == project_id:
+                    del self.exact[host]
+
+    @staticmethod
+    def _add_hosts(
+        exact: Dict[str, Route], wildcards: SuffixTrie, project_id: str, routes: Dict[str, Route]
+    ) -> Set[str]:
+        """
+        Add a project's routes and return the hosts it now owns. Platform
+        hosts always win; a custom domain never takes a host another
+        project already routes.
+        """
+        claimed = set()
+        for host, route in routes.items():
+            wildcard = host.startswith("*.")
+            current = wildcards.get(host[2:]) if wildcard else exact.get(host)
+            if current is not None and current.project_id != project_id and not is_platform_host(host):
+                logger.warning(f"Host {host} of project {project_id} is already routed to project {current.project_id}")
+                continue
+            if wildcard:
+                wildcards.insert(host[2:], route)
+            else:
+                exact[host] = route
+            claimed.add(host)
+        return claimed
+
+    def set_project(self, project_id: str, routes: Dict[str, Route]):
+        with self.lock:
+            self._remove_hosts(project_id, self.hosts_by_project.pop(project_id, ()))
+            claimed = self._add_hosts(self.exact, self.wildcards, project_id, routes)
+            if claimed:
+                self.hosts_by_project[project_id] = claimed
+
+    def load_project(self, db: Session, project_id: str):
+        deployments = (
+            db.query(Deployment)
+            .filter(Deployment.project_id == project_id, Deployment.status == "ready")
+            .order_by(Deployment.created_at.desc())
+            .all()
+        )
+        domains = db.query(Domain).filter(Domain.project_id == project_id).all()
+        self.set_project(project_id, project_routes(deployments, domains))
+
+    def load_all(self, db: Session):
+        deployments: Dict[str, List[Deployment]] = {}
+        for deployment in (
+            db.query(Deployment)
+            .filter(Deployment.status == "ready")
+            .order_by(Deployment.created_at.desc())
+            .yield_per(1000)
+        ):
+            deployments.setdefault(deployment.project_id, []).append(deployment)
+
+        domains: Dict[str, List[Domain]] = {}
+        for domain in db.query(Domain).filter(Domain.verified.is_(True)):
+            domains.setdefault(domain.project_id, []).append(domain)
+
+        exact: Dict[str, Route] = {}
+        wildcards = SuffixTrie()
+        hosts_by_project: Dict[str, Set[str]] = {}
+        for project_id, project_deployments in deployments.items():
+            routes = project_routes(project_deployments, domains.get(project_id, []))
+            claimed = self._add_hosts(exact, wildcards, project_id, routes)
+            if claimed:
+                hosts_by_project[project_id] = claimed
+
+        with self.lock:
+            self.exact, self.wildcards, self.hosts_by_project = exact, wildcards, hosts_by_project
+        logger.info(f"Loaded {len(exact)} routes for {len(hosts_by_project)} projects")
+
+    def _reload(self, project_id: Optional[str] = None):
+        db = SessionLocal()
+        try:
+            if project_id:
+                self.load_project(db, project_id)
+            else:
+                self.load_all(db)
+        finally:
+            db.close()
+
+    def _listen(self):
+        while not self.stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(ROUTING_CHANNEL)
+                # Anything published while we were not subscribed is covered by a full load
+                self._reload()
+
+                while not self.stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message:
+                        continue
+                    project_id = json.loads(message["data"]).get("project_id")
+                    if project_id:
+                        self._reload(project_id)
+            except Exception as e:
+                logger.error(f"Routing listener error, reconnecting: {e}")
+                time.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def start(self):
+        """Load the table and keep it current in a background thread"""
+        if self.listener and self.listener.is_alive():
+            return
+        self.stopped.clear()
+        self.listener = threading.Thread(target=self._listen, name="routing-listener", daemon=True)
+        self.listener.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.listener:
+            self.listener.join(timeout=5)
+
+
+routing_table = RoutingTable()
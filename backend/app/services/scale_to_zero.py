@@ -0,0 +1,170 @@
+import time
+import calendar
+import logging
+from typing import Dict, Optional
+
+import httpx
+from redis.exceptions import LockError
+
+from app.core.config import settings
+from app.core.metrics import COLD_START_SECONDS, DEPLOYMENT_WAKES
+from app.core.redis import get_redis
+from app.db.base import SessionLocal
+from app.services.deployment import deployment_service
+from app.api import crud
+
+logger = logging.getLogger(__name__)
+
+# Sorted set of deployment id -> unix time of its last proxied request
+ACTIVITY_KEY = "deployments:last-active"
+
+# Activity older than this is dropped, its deployments fall back to updated_at
+ACTIVITY_RETENTION_SECONDS = 60 * 60 * 24 * 30
+
+
+class ScaleToZero:
+    """
+    Stops deployment containers that have served no traffic for
+    SCALE_TO_ZERO_IDLE_SECONDS and starts them again on the next request.
+
+    The proxy records activity in memory and flushes it to Redis every
+    DEPLOYMENT_ACTIVITY_FLUSH_SECONDS, so the reaper allows that much extra
+    idle time. Waking and reaping a deployment take the same Redis lock, and
+    the reaper re-reads activity under it, so a container is never stopped
+    while a request is starting it and concurrent proxies start it only once.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, float] = {}
+
+    def record_activity(self, deployment_id: str):
+        self.pending[deployment_id] = time.time()
+
+    def flush_activity(self):
+        pending, self.pending = self.pending, {}
+        if pending:
+            try:
+                get_redis().zadd(ACTIVITY_KEY, pending)
+            except Exception as e:
+                logger.error(f"Error recording deployment activity: {e}")
+
+    def mark_active(self, deployment_id: str):
+        """Record activity in Redis right away, bypassing the proxy's buffer"""
+        get_redis().zadd(ACTIVITY_KEY, {deployment_id: time.time()})
+
+    def last_active(self, deployment, score: Optional[float]) -> float:
+        if score is None:
+            return calendar.timegm(deployment.updated_at.utctimetuple())
+        return score
+
+    def _lock(self, deployment_id: str):
+        return get_redis().lock(
+            f"deployment-wake:{deployment_id}",
+            timeout=settings.SCALE_TO_ZERO_WAKE_TIMEOUT + 30,
+        )
+
+    def wait_until_ready(self, upstream_url: str, deadline: float) -> bool:
+        """Poll the container until it answers HTTP at all"""
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(upstream_url, timeout=1.0)
+                return True
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        return False
+
+    def wake(self, deployment_id: str, stale_upstream: Optional[str] = None) -> str:
+        """
+        Start a deployment's container and return its upstream URL once it
+        answers. `stale_upstream` is the address the caller failed to reach;
+        if another proxy has already moved the deployment elsewhere, that
+        address is returned without starting anything.
+        """
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            with self._lock(deployment_id):
+                deployment = crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
+                if not deployment or deployment.status != "ready" or not deployment.upstream_url:
+                    raise LookupError(f"Deployment {deployment_id} has no container to start")
+
+                if not deployment.scaled_to_zero and deployment.upstream_url != stale_upstream:
+                    return deployment.upstream_url
+
+                upstream_url = deployment_service.start_container(deployment_id)
+                if not self.wait_until_ready(upstream_url, started + settings.SCALE_TO_ZERO_WAKE_TIMEOUT):
+                    raise TimeoutError(f"Deployment {deployment_id} did not become ready")
+
+                crud.deployment.update(
+                    db=db,
+                    db_obj=deployment,
+                    obj_in={"upstream_url": upstream_url, "scaled_to_zero": False}
+                )
+                # Before releasing the lock, so the reaper can't see it idle
+                self.mark_active(deployment_id)
+
+            cold_start = time.monotonic() - started
+            COLD_START_SECONDS.observe(cold_start)
+            DEPLOYMENT_WAKES.labels(result="started").inc()
+            logger.info(f"Woke deployment {deployment_id} in {cold_start:.2f}s")
+            return upstream_url
+
+        except Exception:
+            DEPLOYMENT_WAKES.labels(result="failed").inc()
+            raise
+        finally:
+            db.close()
+
+    def reap_idle(self) -> int:
+        """Stop containers idle for longer than SCALE_TO_ZERO_IDLE_SECONDS and return how many"""
+        if settings.SCALE_TO_ZERO_IDLE_SECONDS <= 0:
+            return 0
+
+        now = time.time()
+        # Proxies may still hold activity that has not been flushed
+        cutoff = now - settings.SCALE_TO_ZERO_IDLE_SECONDS - settings.DEPLOYMENT_ACTIVITY_FLUSH_SECONDS
+        redis = get_redis()
+        redis.zremrangebyscore(ACTIVITY_KEY, "-inf", now - ACTIVITY_RETENTION_SECONDS)
+
+        db = SessionLocal()
+        stopped = 0
+        try:
+            deployments = crud.deployment.get_running_containers(db=db)
+            if not deployments:
+                return 0
+
+            pipe = redis.pipeline(transaction=False)
+            for deployment in deployments:
+                pipe.zscore(ACTIVITY_KEY, deployment.id)
+            scores = pipe.execute()
+
+            for deployment, score in zip(deployments, scores):
+                if self.last_active(deployment, score) > cutoff:
+                    continue
+
+                lock = self._lock(deployment.id)
+                if not lock.acquire(blocking=False):
+                    # Being woken right now
+                    continue
+                try:
+                    # Traffic may have arrived since the scores were read
+                    score = redis.zscore(ACTIVITY_KEY, deployment.id)
+                    if self.last_active(deployment, score) > cutoff:
+                        continue
+                    deployment_service.stop_container(deployment.id)
+                    crud.deployment.update(db=db, db_obj=deployment, obj_in={"scaled_to_zero": True})
+                    stopped += 1
+                except Exception as e:
+                    logger.error(f"Error scaling {deployment.id} to zero: {e}")
+                finally:
+                    try:
+                        lock.release()
+                    except LockError:
+                        logger.warning(f"Wake lock of {deployment.id} expired while scaling it to zero")
+        finally:
+            db.close()
+
+        return stopped
+
+
+scale_to_zero = ScaleToZero()
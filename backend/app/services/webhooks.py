@@ -0,0 +1,123 @@
+import hmac
+import json
+import hashlib
+from typing import Dict, NamedTuple, Optional
+
+# Redis stream holding raw webhook deliveries until the consumer handles them
+WEBHOOK_STREAM = "webhooks:events"
+WEBHOOK_CONSUMER_GROUP = "webhook-consumers"
+# Deliveries that failed WEBHOOK_MAX_DELIVERIES times, kept for inspection
+WEBHOOK_DEAD_LETTER_STREAM = "webhooks:dead"
+
+# Headers carrying the provider's unique id of a delivery, kept across redeliveries
+DELIVERY_ID_HEADERS = {
+    "github": "x-github-delivery",
+    "gitlab": "x-gitlab-event-uuid",
+}
+
+
+class PushEvent(NamedTuple):
+    provider: str
+    repository_url: str
+    branch: str
+    commit_hash: str
+    commit_message: Optional[str]
+
+
+def delivery_dedupe_key(provider: str, delivery_id: str) -> str:
+    return f"webhook-delivery:{provider}:{delivery_id}"
+
+
+def commit_dedupe_key(project_id: str, commit_hash: str) -> str:
+    return f"webhook-commit:{project_id}:{commit_hash}"
+
+
+def verify_github_signature(headers: Dict[str, str], payload: bytes, secret: str) -> bool:
+    """Verify that the webhook request is from GitHub, preferring the sha256 signature."""
+    signature = headers.get("x-hub-signature-256")
+    digestmod = hashlib.sha256
+    if not signature:
+        signature = headers.get("x-hub-signature")
+        digestmod = hashlib.sha1
+    if not signature:
+        return False
+
+    algorithm, _, signature_hash = signature.partition("=")
+    if algorithm != digestmod().name:
+        return False
+
+    # Compute the HMAC
+    expected_signature = hmac.new(secret.encode(), payload, digestmod).hexdigest()
+    return hmac.compare_digest(signature_hash, expected_signature)
+
+
+def verify_gitlab_token(headers: Dict[str, str], token: str) -> bool:
+    """Verify that the webhook request is from GitLab."""
+    return hmac.compare_digest(headers.get("x-gitlab-token", ""), token)
+
+
+def verify_signature(provider: str, headers: Dict[str, str], payload: bytes, secret: str) -> bool:
+    if provider == "github":
+        return verify_github_signature(headers, payload, secret)
+    return verify_gitlab_token(headers, secret)
+
+
+def _object(value, name: str) -> dict:
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError(f"{name} is not an object")
+    return value
+
+
+def _string(value, name: str) -> Optional[str]:
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"{name} is not a string")
+    return value
+
+
+def parse_push_event(provider: str, payload: bytes) -> Optional[PushEvent]:
+    """
+    Extract the pushed branch and its newest commit, or None if there is
+    nothing to deploy. Raises ValueError for payloads that are not push events.
+    """
+    event_data = json.loads(payload)
+    if not isinstance(event_data, dict):
+        raise ValueError("payload is not an object")
+
+    # Extract the branch name (e.g., from "refs/heads/main" to "main")
+    ref = _string(event_data.get("ref"), "ref") or ""
+    if not ref.startswith("refs/heads/"):
+        return None
+    branch = ref[len("refs/heads/"):]
+
+    # Get the repository information
+    if provider == "github":
+        repository = _object(event_data.get("repository"), "repository")
+        repository_url = _string(repository.get("clone_url"), "repository.clone_url")
+    else:
+        project = _object(event_data.get("project"), "project")
+        repository_url = _string(project.get("git_http_url"), "project.git_http_url")
+    if not repository_url:
+        return None
+
+    # The head commit is the newest; "commits" lists them oldest first
+    commit = _object(event_data.get("head_commit"), "head_commit")
+    if not commit:
+        commits = event_data.get("commits") or []
+        if not isinstance(commits, list):
+            raise ValueError("commits is not a list")
+        commits = [_object(c, "commit") for c in commits]
+        commit = next((c for c in commits if c.get("id") == event_data.get("after")), None)
+        if not commit and commits:
+            commit = commits[-1]
+    if not commit or not _string(commit.get("id"), "commit id"):
+        return None
+
+    return PushEvent(
+        provider=provider,
+        repository_url=repository_url,
+        branch=branch,
+        commit_hash=commit["id"],
+        commit_message=_string(commit.get("message"), "commit message"),
+    )
@@ -0,0 +1,381 @@
+"""
+Shared static file server for deployments in static mode.
+
+Every static deployment is a directory STATIC_ROOT/<deployment id>, reached at
+<deployment id>.<DEPLOYMENTS_DOMAIN>. Run it next to the API with:
+
+    uvicorn app.static_server:app --host 0.0.0.0 --port 8080
+"""
+import os
+import re
+import stat
+import hashlib
+import mimetypes
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import anyio
+
+from app.core.config import settings
+
+CHUNK_SIZE = 256 * 1024
+
+# Precompressed variants written next to the original file, in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Fingerprinted asset names such as app.3f2a9c1b.js or index-3F2A9C1B.css
+FINGERPRINTED_NAME = re.compile(r"[.-][0-9a-fA-F]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_PREFIXES = ("/_next/static/", "/_nuxt/", "/_app/immutable/")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+
+class FileCache:
+    """
+    Bounded LRU of per-file data keyed by path and stat identity, so a
+    replaced file is never served from a stale entry.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries: "OrderedDict[tuple, Tuple[object, int]]" = OrderedDict()
+
+    def get(self, key: tuple):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: tuple, value, size: int = 0):
+        if key in self.entries:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while len(self.entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+
+def stat_key(path: str, st: os.stat_result) -> tuple:
+    return (path, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def default_resolve_root(host: str) -> Optional[str]:
+    """Map <deployment id>.<DEPLOYMENTS_DOMAIN> to the deployment's artifact directory"""
+    suffix = f".{settings.DEPLOYMENTS_DOMAIN}"
+    if not host.endswith(suffix):
+        return None
+
+    label = host[:-len(suffix)]
+    if not label or "." in label or label.startswith("."):
+        return None
+
+    root = os.path.join(settings.STATIC_ROOT, label)
+    return root if os.path.isdir(root) else None
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range into inclusive (start, end) offsets.
+    Returns None for multiple ranges, which are answered with the full body,
+    and raises ValueError for an unsatisfiable range.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise ValueError("unsatisfiable range")
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except (TypeError, ValueError):
+        raise ValueError("unsatisfiable range")
+
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+class StaticServer:
+    """
+    ASGI application serving deployment artifacts.
+
+    - zero-copy responses through the ASGI `http.response.pathsend` or
+      `http.response.zerocopysend` extensions when the server offers them,
+      falling back to chunked reads in a worker thread
+    - strong content-hash ETags with If-None-Match / If-Modified-Since
+    - single byte ranges with If-Range
+    - precompressed .br / .gz variants chosen from Accept-Encoding
+    - immutable caching for fingerprinted assets
+    """
+
+    def __init__(
+        self,
+        resolve_root: Callable[[str], Optional[str]] = default_resolve_root,
+        small_file_bytes: int = 64 * 1024,
+        small_file_cache_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.resolve_root = resolve_root
+        self.small_file_bytes = small_file_bytes
+        self.etags = FileCache(max_entries=100_000)
+        self.contents = FileCache(max_entries=100_000, max_bytes=small_file_cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return
+
+        headers = self.request_headers(scope)
+        host = headers.get("host", "").split(":")[0].lower()
+        root = self.resolve_root(host)
+        if not root:
+            await self.send_status(send, 404, b"Deployment not found")
+            return
+
+        await self.serve(scope, send, root, headers)
+
+    def request_headers(self, scope) -> Dict[str, str]:
+        return {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+
+    async def send_status(self, send, status: int, body: bytes = b"", headers: List[Tuple[bytes, bytes]] = None):
+        response_headers = [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": response_headers + (headers or [])})
+        await send({"type": "http.response.body", "body": body})
+
+    def lookup(self, root: str, request_path: str) -> Tuple[Optional[str], int]:
+        """Resolve a request path to a file inside `root`, with index and clean URL fallbacks"""
+        # ASGI servers hand over the path already percent-decoded
+        path = request_path
+        if "\x00" in path:
+            return None, 400
+
+        relative = os.path.normpath(path.lstrip("/"))
+        if relative == ".":
+            relative = ""
+        if relative.startswith(".."):
+            return None, 404
+
+        candidate = os.path.join(root, relative)
+        candidates = [candidate]
+        if path.endswith("/") or relative == "":
+            candidates = [os.path.join(candidate, "index.html")]
+        elif not os.path.splitext(relative)[1]:
+            candidates += [f"{candidate}.html", os.path.join(candidate, "index.html")]
+
+        real_root = os.path.realpath(root)
+        for option in candidates:
+            real_path = os.path.realpath(option)
+            if real_path != real_root and not real_path.startswith(real_root + os.sep):
+                continue
+            if os.path.isfile(real_path):
+                return real_path, 200
+
+        not_found = os.path.join(real_root, "404.html")
+        if os.path.isfile(not_found):
+            return not_found, 404
+        return None, 404
+
+    def etag(self, path: str, st: os.stat_result) -> str:
+        key = stat_key(path, st)
+        value = self.etags.get(key)
+        if value is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(block)
+            value = f'"{digest.hexdigest()[:32]}"'
+            self.etags.put(key, value)
+        return value
+
+    def cache_control(self, request_path: str) -> str:
+        if request_path.startswith(IMMUTABLE_PREFIXES) or FINGERPRINTED_NAME.search(request_path):
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
+
+    def choose_variant(self, path: str, accept_encoding: str) -> Tuple[str, Optional[str]]:
+        """Pick the best precompressed variant of `path` the client accepts"""
+        if not accept_encoding:
+            return path, None
+
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding, extension in ENCODINGS:
+            quality = accepted.get(encoding, accepted.get("*", 0.0))
+            if quality > 0 and os.path.isfile(path + extension):
+                return path + extension, encoding
+        return path, None
+
+    async def serve(self, scope, send, root: str, headers: Optional[Dict[str, str]] = None):
+        """Serve the request path of `scope` from the artifact directory `root`"""
+        headers = headers if headers is not None else self.request_headers(scope)
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            await self.send_status(send, 405, b"Method not allowed", [(b"allow", b"GET, HEAD")])
+            return
+
+        request_path = scope["path"]
+        path, status = self.lookup(root, request_path)
+        if not path:
+            await self.send_status(send, status, b"Not found" if status == 404 else b"Bad request")
+            return
+
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+
+        file_path, encoding = self.choose_variant(path, headers.get("accept-encoding", ""))
+        st = os.stat(file_path)
+        if not stat.S_ISREG(st.st_mode):
+            await self.send_status(send, 404, b"Not found")
+            return
+
+        # Hashing a large file for the first time must not stall the event loop
+        if st.st_size > self.small_file_bytes:
+            etag = await anyio.to_thread.run_sync(self.etag, file_path, st)
+        else:
+            etag = self.etag(file_path, st)
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+
+        response_headers = [
+            (b"content-type", content_type.encode()),
+            (b"etag", etag.encode()),
+            (b"last-modified", last_modified.encode()),
+            (b"cache-control", (REVALIDATE_CACHE_CONTROL if status == 404 else self.cache_control(request_path)).encode()),
+            (b"vary", b"Accept-Encoding"),
+            (b"accept-ranges", b"bytes"),
+        ]
+        if encoding:
+            response_headers.append((b"content-encoding", encoding.encode()))
+
+        if status == 200 and self.not_modified(headers, etag, st.st_mtime):
+            not_modified_headers = [h for h in response_headers if h[0] not in (b"content-type", b"accept-ranges")]
+            await send({"type": "http.response.start", "status": 304, "headers": not_modified_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        start, end = 0, st.st_size - 1
+        range_header = headers.get("range")
+        if status == 200 and range_header and self.range_applies(headers, etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, st.st_size)
+            except ValueError:
+                await self.send_status(send, 416, b"", [(b"content-range", f"bytes */{st.st_size}".encode())])
+                return
+            if byte_range:
+                start, end = byte_range
+                status = 206
+                response_headers.append((b"content-range", f"bytes {start}-{end}/{st.st_size}".encode()))
+
+        length = end - start + 1 if st.st_size else 0
+        response_headers.append((b"content-length", str(length).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+
+        if method == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await self.send_file(scope, send, file_path, st, start, length)
+
+    def not_modified(self, headers: Dict[str, str], etag: str, mtime: float) -> bool:
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            # If-None-Match uses the weak comparison function
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in tags)
+
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def range_applies(self, headers: Dict[str, str], etag: str, last_modified: str) -> bool:
+        if_range = headers.get("if-range")
+        if if_range is None:
+            return True
+        # If-Range requires a strong match; a date must match exactly
+        return if_range.strip() in (etag, last_modified)
+
+    async def send_file(self, scope, send, path: str, st: os.stat_result, start: int, length: int):
+        extensions = scope.get("extensions") or {}
+        whole_file = start == 0 and length == st.st_size
+
+        if whole_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": path})
+            return
+
+        if "http.response.zerocopysend" in extensions:
+            with open(path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": start,
+                    "count": length,
+                })
+            return
+
+        if st.st_size <= self.small_file_bytes:
+            key = stat_key(path, st)
+            content = self.contents.get(key)
+            if content is None:
+                with open(path, "rb") as f:
+                    content = f.read()
+                self.contents.put(key, content, len(content))
+            await send({"type": "http.response.body", "body": content[start:start + length]})
+            return
+
+        async with await anyio.open_file(path, "rb") as f:
+            await f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+app = StaticServer()
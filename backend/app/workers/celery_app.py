@@ -7,8 +7,32 @@ celery_app = Celery(
     backend=settings.CELERY_RESULT_BACKEND,
 )
 
+# Each deployment pipeline stage has its own queue so clone, build and deploy
+# workers can be scaled independently, e.g.
+#   celery -A app.workers.celery_app worker -Q clone-queue -c 16
+#   celery -A app.workers.celery_app worker -Q build-queue -c 4
+#   celery -A app.workers.celery_app worker -Q deploy-queue -c 8
 celery_app.conf.task_routes = {
+    "app.workers.tasks.clone_stage": "clone-queue",
+    "app.workers.tasks.build_stage": "build-queue",
+    "app.workers.tasks.deploy_stage": "deploy-queue",
     "app.workers.tasks.*": "main-queue",
 }
 
-celery_app.conf.update(task_track_started=True) 
\ No newline at end of file
+# Stages are long running; don't let one worker reserve tasks others could start
+celery_app.conf.update(task_track_started=True, worker_prefetch_multiplier=1)
+
+celery_app.conf.beat_schedule = {
+    "evict-build-cache": {
+        "task": "app.workers.tasks.evict_build_cache",
+        "schedule": 60 * 60 * 6,
+    },
+    "reap-idle-deployments": {
+        "task": "app.workers.tasks.reap_idle_deployments",
+        "schedule": 60,
+    },
+    "maintain-deployment-partitions": {
+        "task": "app.workers.tasks.maintain_deployment_partitions",
+        "schedule": 60 * 60 * 24,
+    },
+} 
\ No newline at end of file
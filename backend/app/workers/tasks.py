@@ -1,40 +1,170 @@
-from typing import Dict, Any, Optional
-from celery import shared_task
+import os
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Tuple
+from celery import chain, shared_task
+from celery.exceptions import Ignore, Retry
+from redis.exceptions import LockError
 import logging
 
+from app.core.config import settings
+from app.core.redis import get_redis
 from app.db.base import SessionLocal
 from app.services.deployment import deployment_service
+from app.services.dependency_cache import dependency_cache
+from app.services.asset_pipeline import asset_pipeline
+from app.services.build_logs import build_log_store
+from app.services.log_archive import build_log_archive
+from app.services.scale_to_zero import scale_to_zero
+from app.services.deployment_archive import deployment_archive
+from app.services.webhooks import commit_dedupe_key
 from app.api import crud
 
 logger = logging.getLogger(__name__)
 
+# Stage a deployment waits in while another build of its project holds the build lock
+BUILD_WAITING_STAGE = "build-waiting"
 
-@shared_task
-def deploy_project(deployment_id: str):
+
+def cached_build_available(cached_build, static: bool) -> bool:
+    """Check that the output of a cached build can still be reused"""
+    if static:
+        return bool(cached_build.artifact_path) and os.path.isdir(cached_build.artifact_path)
+    return bool(cached_build.image_tag) and deployment_service.image_exists(cached_build.image_tag)
+
+
+def finalize_build_logs(db, deployment):
+    """Mark the live log complete and move it into the log archive"""
+    build_log_store.finish(deployment.id)
+    index = build_log_archive.archive_from_store(deployment.id)
+    crud.deployment.update(
+        db=db, 
+        db_obj=deployment, 
+        obj_in={
+            "build_log_archived": True,
+            "build_log_lines": index["lines"],
+            "build_log_bytes": index["bytes"]
+        }
+    )
+    # Followers still catching up keep reading the live copy for a while
+    build_log_store.expire(deployment.id, settings.BUILD_LOG_ARCHIVED_TTL_SECONDS)
+
+
+class DeploymentCanceled(Exception):
+    """Raised at a stage boundary when the deployment was canceled"""
+
+
+def release_commit_dedupe(deployment):
+    """Let a later push of the same commit deploy again once this deployment failed or was canceled"""
+    if not deployment.commit_hash:
+        return
+    try:
+        get_redis().delete(commit_dedupe_key(deployment.project_id, deployment.commit_hash))
+    except Exception as e:
+        logger.error(f"Error releasing webhook dedupe of {deployment.id}: {e}")
+
+
+def finish_pipeline(db, deployment, state: Dict[str, Any]):
+    """Archive the build log and remove the workspace once the pipeline ends"""
+    try:
+        finalize_build_logs(db, deployment)
+    except Exception as e:
+        logger.error(f"Error finalizing build logs for {deployment.id}: {e}")
+    if state.get("repo_path"):
+        deployment_service.cleanup(state["repo_path"])
+
+
+@contextmanager
+def pipeline_stage(state: Dict[str, Any], stage: str) -> Iterator[Tuple[Any, Any, Any]]:
     """
-    Task to handle the deployment process for a project
+    Run one stage of the deployment pipeline with its own session and log
+    writer. A failing stage marks the deployment failed, ends the pipeline
+    and raises Ignore so the rest of the chain never runs.
     """
-    logger.info(f"Starting deployment: {deployment_id}")
+    deployment_id = state["deployment_id"]
     db = SessionLocal()
+    log_writer = build_log_store.writer(deployment_id)
+    deployment = None
     
     try:
-        # Get deployment
         deployment = crud.deployment.get_by_id(db=db, deployment_id=deployment_id)
         if not deployment:
             logger.error(f"Deployment not found: {deployment_id}")
-            return
+            raise Ignore()
+            
+        # Superseded deployments stop at the next stage boundary
+        if not crud.deployment.start_stage(db=db, db_obj=deployment, stage=stage):
+            raise DeploymentCanceled()
             
-        # Update status to building
-        crud.deployment.update_status(db=db, deployment_id=deployment_id, status="building")
+        yield db, deployment, log_writer
+        
+        db.refresh(deployment)
+        if deployment.status == "canceled":
+            raise DeploymentCanceled()
+        
+    except (Ignore, Retry):
+        raise
+    except DeploymentCanceled:
+        logger.info(f"Deployment {deployment_id} canceled before {stage} stage finished")
+        log_writer.write(f"Deployment canceled: {deployment.error_message or 'superseded'}\n")
+        log_writer.flush()
+        release_commit_dedupe(deployment)
+        finish_pipeline(db, deployment, state)
+        raise Ignore()
+    except Exception as e:
+        logger.error(f"Deployment {deployment_id} failed in {stage} stage: {e}")
+        log_writer.write(f"Deployment failed: {e}\n")
+        log_writer.flush()
+        
+        # Update deployment with error
+        if deployment:
+            crud.deployment.update(
+                db=db, 
+                db_obj=deployment, 
+                obj_in={
+                    "status": "failed",
+                    "error_message": str(e)
+                }
+            )
+            release_commit_dedupe(deployment)
+            finish_pipeline(db, deployment, state)
+        raise Ignore()
         
-        # Get project
+    finally:
+        log_writer.flush()
+        db.close()
+
+
+@shared_task
+def deploy_project(deployment_id: str):
+    """
+    Task to start the deployment pipeline for a project. Clone, build and
+    deploy run as chained tasks on their own queues, passing a small state
+    record along; the workspace lives under the shared STORAGE_PATH.
+    """
+    logger.info(f"Starting deployment: {deployment_id}")
+    chain(
+        clone_stage.s({"deployment_id": deployment_id}),
+        build_stage.s(),
+        deploy_stage.s(),
+    ).apply_async()
+
+
+@shared_task
+def clone_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pipeline stage that checks out the repository and fingerprints the build
+    """
+    with pipeline_stage(state, "clone") as (db, deployment, log_writer):
         project = deployment.project
         
         # Clone repository
         repo_path, commit_hash, commit_message = deployment_service.clone_repository(
             repo_url=project.repository_url, 
-            branch=project.branch
+            branch=project.branch,
+            fetch_strategy=project.fetch_strategy or "full",
+            sparse_paths=project.sparse_paths
         )
+        state["repo_path"] = repo_path
         
         # Update deployment with commit info
         crud.deployment.update(
@@ -46,63 +176,242 @@ def deploy_project(deployment_id: str):
             }
         )
         
-        # Build project
-        build_logs = deployment_service.build_project(
+        state["fingerprint"] = deployment_service.build_fingerprint(
             repo_path=repo_path,
-            build_command=project.build_command,
-            output_dir=project.output_directory,
-            env_vars=project.environment_variables
+            build_settings={
+                "build_command": project.build_command,
+                "output_directory": project.output_directory,
+                "environment_variables": project.environment_variables,
+                "fetch_strategy": project.fetch_strategy,
+                "sparse_paths": project.sparse_paths,
+                "deployment_mode": project.deployment_mode,
+            }
         )
+        log_writer.write(f"Checked out {commit_hash}\n")
+        
+    return state
+
+
+@shared_task(bind=True, max_retries=None)
+def build_stage(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pipeline stage that builds the project, or reuses an earlier build of
+    identical inputs, and produces its image or static output. Builds of
+    the same project never run at once; a deployment whose project is
+    already building waits and retries.
+    """
+    with pipeline_stage(state, "build") as (db, deployment, log_writer):
+        lock = get_redis().lock(
+            f"build-lock:{deployment.project_id}", timeout=settings.BUILD_LOCK_TIMEOUT
+        )
+        if not lock.acquire(blocking=False):
+            crud.deployment.update(db=db, db_obj=deployment, obj_in={"stage": BUILD_WAITING_STAGE})
+            raise self.retry(countdown=settings.BUILD_LOCK_RETRY_SECONDS)
+            
+        try:
+            run_build(db, deployment, log_writer, state)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                logger.warning(f"Build lock of {deployment.project_id} expired during the build")
+            
+    return state
+
+
+def run_build(db, deployment, log_writer, state: Dict[str, Any]):
+    """Build a deployment, or reuse a cached build, recording the output in `state`"""
+    project = deployment.project
+    repo_path = state["repo_path"]
+    fingerprint = state["fingerprint"]
+    static = project.deployment_mode == "static"
+    
+    # Reuse an earlier build of identical inputs if its output is still around
+    cached_build = crud.build_cache.get_by_fingerprint(db=db, fingerprint=fingerprint)
+    if cached_build and not cached_build_available(cached_build, static):
+        crud.build_cache.remove(db=db, fingerprint=fingerprint)
+        cached_build = None
+    
+    state["cache_hit"] = bool(cached_build)
+    if cached_build:
+        logger.info(f"Build cache hit for {deployment.id}: {fingerprint}")
+        crud.build_cache.mark_used(db=db, db_obj=cached_build)
         
-        # Update with build logs
         crud.deployment.update(
             db=db, 
             db_obj=deployment, 
-            obj_in={"build_logs": build_logs}
+            obj_in={
+                "build_fingerprint": fingerprint,
+                "build_cache_hit": True,
+                "cached_from_deployment_id": cached_build.deployment_id
+            }
         )
+        log_writer.write(
+            f"Build cache hit: reusing build from deployment {cached_build.deployment_id}\n"
+        )
+        state["image_tag"] = cached_build.image_tag
+        state["source_path"] = cached_build.artifact_path
+        return
         
+    # Warm dependency and framework caches from earlier builds
+    cache_keys = dependency_cache.cache_keys(project_id=project.id, repo_path=repo_path)
+    restored_caches = dependency_cache.restore(keys=cache_keys, repo_path=repo_path)
+    
+    # Build project, streaming its output to the live log
+    deployment_service.build_project(
+        repo_path=repo_path,
+        build_command=project.build_command,
+        output_dir=project.output_directory,
+        env_vars={
+            **dependency_cache.build_env(repo_path),
+            **(project.environment_variables or {})
+        },
+        log_writer=log_writer
+    )
+    
+    # Minify and precompress the output so it is never compressed per request
+    output_path = os.path.join(repo_path, project.output_directory)
+    asset_pipeline.process(output_path=output_path, log_writer=log_writer)
+    
+    dependency_cache.save(
+        keys=cache_keys, repo_path=repo_path, restored=restored_caches
+    )
+    
+    crud.deployment.update(
+        db=db, 
+        db_obj=deployment, 
+        obj_in={"build_fingerprint": fingerprint}
+    )
+    
+    if static:
+        state["source_path"] = output_path
+    else:
         # Create deployment image
-        image_tag = deployment_service.create_deployment_image(
+        state["image_tag"] = deployment_service.create_deployment_image(
             repo_path=repo_path,
             output_dir=project.output_directory,
             project_id=project.id,
             deployment_id=deployment.id
         )
+
+
+@shared_task
+def deploy_stage(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pipeline stage that publishes static output or starts the container
+    """
+    with pipeline_stage(state, "deploy") as (db, deployment, log_writer):
+        project = deployment.project
+        artifact_path = None
+        upstream_url = None
         
-        # Deploy the image
-        deployment_url = deployment_service.deploy_image(
-            image_tag=image_tag,
-            deployment_id=deployment.id
-        )
+        if project.deployment_mode == "static":
+            # Publish the output for the shared static server, no image or container
+            artifact_path = deployment_service.publish_static_artifact(
+                source_path=state["source_path"],
+                deployment_id=deployment.id
+            )
+        else:
+            # Deploy the image
+            upstream_url = deployment_service.deploy_image(
+                image_tag=state["image_tag"],
+                deployment_id=deployment.id
+            )
+            
+        if not state["cache_hit"]:
+            crud.build_cache.record(
+                db=db,
+                fingerprint=state["fingerprint"],
+                image_tag=state.get("image_tag"),
+                artifact_path=artifact_path,
+                project_id=project.id,
+                deployment_id=deployment.id
+            )
         
         # Update deployment with URL and status
         crud.deployment.update(
             db=db, 
             db_obj=deployment, 
             obj_in={
-                "deployment_url": deployment_url,
-                "status": "ready"
+                "deployment_url": deployment_service.public_deployment_url(deployment.id),
+                "upstream_url": upstream_url,
+                "artifact_path": artifact_path,
+                "status": "ready",
+                "stage": None
             }
         )
+        log_writer.write("Deployment ready\n")
+        log_writer.flush()
         
-        # Clean up
-        deployment_service.cleanup(repo_path)
+        finish_pipeline(db, deployment, state)
+        logger.info(f"Deployment completed: {deployment.id}")
         
-        logger.info(f"Deployment completed: {deployment_id}")
-        
-    except Exception as e:
-        logger.error(f"Deployment failed: {e}")
-        
-        # Update deployment with error
-        if deployment:
+    return state
+
+
+@shared_task
+def evict_build_cache():
+    """
+    Task to drop stale build fingerprints
+    """
+    db = SessionLocal()
+    try:
+        removed = crud.build_cache.evict(
+            db=db,
+            max_age_days=settings.BUILD_CACHE_MAX_AGE_DAYS,
+            max_entries_per_project=settings.BUILD_CACHE_MAX_ENTRIES_PER_PROJECT
+        )
+        logger.info(f"Evicted {removed} build cache entries")
+    finally:
+        db.close()
+
+
+@shared_task
+def archive_legacy_build_logs(batch_size: int = 100):
+    """
+    Task to move build logs still stored in the deployments table into the log archive
+    """
+    db = SessionLocal()
+    try:
+        deployments = crud.deployment.get_with_legacy_build_logs(db=db, limit=batch_size)
+        for deployment in deployments:
+            index = build_log_archive.archive_text(deployment.id, deployment.build_logs)
             crud.deployment.update(
                 db=db, 
                 db_obj=deployment, 
                 obj_in={
-                    "status": "failed",
-                    "error_message": str(e)
+                    "build_logs": None,
+                    "build_log_archived": True,
+                    "build_log_lines": index["lines"],
+                    "build_log_bytes": index["bytes"]
                 }
             )
-            
+        logger.info(f"Archived legacy build logs of {len(deployments)} deployments")
+        
+        # Keep going until the backlog is drained
+        if len(deployments) == batch_size:
+            archive_legacy_build_logs.delay(batch_size=batch_size)
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+@shared_task
+def reap_idle_deployments():
+    """
+    Task to stop deployment containers that have been idle for too long
+    """
+    stopped = scale_to_zero.reap_idle()
+    if stopped:
+        logger.info(f"Scaled {stopped} idle deployments to zero")
+
+
+@shared_task
+def maintain_deployment_partitions():
+    """
+    Task to create upcoming deployment partitions and archive expired deployments
+    """
+    deployment_archive.ensure_partitions()
+    archived = deployment_archive.archive_expired()
+    if archived:
+        logger.info(f"Archived {archived} expired deployments")
+    deployment_archive.drop_expired_partitions()
@@ -0,0 +1,247 @@
+"""
+Consumer for queued webhook deliveries.
+
+Reads the webhook stream in batches through a Redis consumer group, matches
+pushes to projects, checks per-project secrets and submits deployments.
+Deliveries left unacknowledged by a crashed consumer or a failed submission
+are claimed again after WEBHOOK_CLAIM_IDLE_MS; after WEBHOOK_MAX_DELIVERIES
+attempts they are moved to a dead-letter stream. Run one or more with:
+
+    python -m app.workers.webhook_consumer
+"""
+import os
+import time
+import socket
+import logging
+from typing import Dict, List, Set, Tuple
+
+from redis.exceptions import ResponseError
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.db.base import SessionLocal
+from app.api import crud
+from app.api.schemas.deployment import DeploymentCreate
+from app.services.deployment_coordinator import deployment_coordinator
+from app.services.webhooks import (
+    DELIVERY_ID_HEADERS,
+    WEBHOOK_CONSUMER_GROUP,
+    WEBHOOK_DEAD_LETTER_STREAM,
+    WEBHOOK_STREAM,
+    PushEvent,
+    commit_dedupe_key,
+    delivery_dedupe_key,
+    parse_push_event,
+    verify_signature,
+)
+
+logger = logging.getLogger(__name__)
+
+# Backoff after Redis or database errors in the consume loop
+RETRY_BACKOFF_SECONDS = 1
+RETRY_BACKOFF_MAX_SECONDS = 30
+
+
+class WebhookConsumer:
+    def __init__(self, name: str = None):
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.redis = get_redis()
+        self.claim_cursor = "0-0"
+
+    def ensure_group(self):
+        try:
+            self.redis.xgroup_create(WEBHOOK_STREAM, WEBHOOK_CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def read_batch(self) -> List[Tuple[str, Dict[str, str]]]:
+        """Claim stale deliveries first, then read new ones"""
+        self.claim_cursor, claimed, *_ = self.redis.xautoclaim(
+            WEBHOOK_STREAM,
+            WEBHOOK_CONSUMER_GROUP,
+            self.name,
+            min_idle_time=settings.WEBHOOK_CLAIM_IDLE_MS,
+            start_id=self.claim_cursor,
+            count=settings.WEBHOOK_CONSUMER_BATCH,
+        )
+        if claimed:
+            return self.dead_letter_exhausted(claimed)
+
+        response = self.redis.xreadgroup(
+            WEBHOOK_CONSUMER_GROUP,
+            self.name,
+            {WEBHOOK_STREAM: ">"},
+            count=settings.WEBHOOK_CONSUMER_BATCH,
+            block=settings.WEBHOOK_CONSUMER_BLOCK_MS,
+        )
+        return response[0][1] if response else []
+
+    def dead_letter_exhausted(
+        self, messages: List[Tuple[str, Dict[str, str]]]
+    ) -> List[Tuple[str, Dict[str, str]]]:
+        """
+        Move claimed deliveries that have been attempted WEBHOOK_MAX_DELIVERIES
+        times to the dead-letter stream and return the rest
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for message_id, _ in messages:
+            pipe.xpending_range(
+                WEBHOOK_STREAM, WEBHOOK_CONSUMER_GROUP, min=message_id, max=message_id, count=1
+            )
+        deliveries = {}
+        for entries in pipe.execute():
+            for entry in entries:
+                deliveries[entry["message_id"]] = entry["times_delivered"]
+
+        remaining = []
+        for message_id, fields in messages:
+            if deliveries.get(message_id, 0) <= settings.WEBHOOK_MAX_DELIVERIES:
+                remaining.append((message_id, fields))
+                continue
+            logger.error(f"Dead-lettering webhook delivery {message_id} after {deliveries[message_id] - 1} attempts")
+            pipe = self.redis.pipeline()
+            pipe.xadd(
+                WEBHOOK_DEAD_LETTER_STREAM,
+                {**(fields or {}), "message_id": message_id},
+                maxlen=settings.WEBHOOK_STREAM_MAXLEN,
+                approximate=True,
+            )
+            pipe.xack(WEBHOOK_STREAM, WEBHOOK_CONSUMER_GROUP, message_id)
+            pipe.execute()
+        return remaining
+
+    def is_duplicate(self, provider: str, fields: Dict[str, str], message_id: str) -> bool:
+        """
+        Record a verified delivery's id and report whether another message
+        already carried it within WEBHOOK_DEDUPE_TTL_SECONDS. Only verified
+        deliveries are recorded, so a forged or misconfigured one does not
+        block the provider's redelivery.
+        """
+        delivery_id = fields.get(DELIVERY_ID_HEADERS.get(provider, ""))
+        if not delivery_id:
+            return False
+        key = delivery_dedupe_key(provider, delivery_id)
+        if self.redis.set(key, message_id, nx=True, ex=settings.WEBHOOK_DEDUPE_TTL_SECONDS):
+            return False
+        # A retry of the message that recorded the id is not a duplicate
+        return self.redis.get(key) != message_id
+
+    def handle_batch(self, messages: List[Tuple[str, Dict[str, str]]]) -> List[str]:
+        """
+        Submit deployments for a batch of deliveries and return the message
+        ids that can be acknowledged. Only the newest push of each project
+        and branch in the batch is deployed, and a commit already deployed
+        for a project within WEBHOOK_DEDUPE_TTL_SECONDS is skipped, which
+        covers the same push arriving through several hooks. The commit is
+        released again if its deployment fails or is canceled.
+        """
+        done = []
+        latest: Dict[str, Tuple[object, PushEvent, str]] = {}
+        # Deliveries whose deployment could not be submitted stay pending
+        failed: Set[str] = set()
+
+        db = SessionLocal()
+        try:
+            for message_id, fields in messages:
+                if not fields:
+                    # Trimmed from the stream before it could be handled
+                    done.append(message_id)
+                    continue
+
+                provider = fields.get("provider", "github")
+                payload = fields.get("payload", "").encode("utf-8")
+                try:
+                    event = parse_push_event(provider, payload)
+                except ValueError as e:
+                    logger.error(f"Dropping malformed webhook delivery {message_id}: {e}")
+                    done.append(message_id)
+                    continue
+
+                try:
+                    if event:
+                        projects = crud.project.get_projects_by_repo_and_branch(
+                            db=db, repository_url=event.repository_url, branch=event.branch
+                        )
+                        verified = []
+                        for project in projects:
+                            # Skip projects whose secret the delivery does not match
+                            if project.webhook_secret and not verify_signature(
+                                provider, fields, payload, project.webhook_secret
+                            ):
+                                logger.warning(f"Webhook signature mismatch for project {project.id}")
+                                continue
+                            verified.append(project)
+                        if verified and self.is_duplicate(provider, fields, message_id):
+                            logger.info(f"Skipping duplicate webhook delivery {message_id}")
+                            verified = []
+                        for project in verified:
+                            latest[project.id] = (project, event, message_id)
+                except Exception as e:
+                    # Left pending, so it is claimed and retried later
+                    db.rollback()
+                    logger.error(f"Error handling webhook delivery {message_id}: {e}")
+                    continue
+                done.append(message_id)
+
+            triggered = 0
+            for project, event, message_id in latest.values():
+                dedupe_key = commit_dedupe_key(project.id, event.commit_hash)
+                try:
+                    if not self.redis.set(dedupe_key, "1", nx=True, ex=settings.WEBHOOK_DEDUPE_TTL_SECONDS):
+                        logger.info(f"Skipping duplicate push of {event.commit_hash} for project {project.id}")
+                        continue
+                    try:
+                        deployment_coordinator.submit(
+                            db=db,
+                            project=project,
+                            obj_in=DeploymentCreate(
+                                project_id=project.id,
+                                commit_hash=event.commit_hash,
+                                commit_message=event.commit_message,
+                            ),
+                            user_id=project.owner_id,
+                        )
+                    except Exception:
+                        # Allow the retried delivery to submit it
+                        db.rollback()
+                        self.redis.delete(dedupe_key)
+                        raise
+                except Exception as e:
+                    logger.error(f"Error deploying {event.commit_hash} for project {project.id}: {e}")
+                    failed.add(message_id)
+                    continue
+                triggered += 1
+            if triggered:
+                logger.info(f"Triggered {triggered} deployments from {len(messages)} webhook deliveries")
+        finally:
+            db.close()
+
+        return [message_id for message_id in done if message_id not in failed]
+
+    def run(self):
+        logger.info(f"Webhook consumer {self.name} started")
+        group_ready = False
+        backoff = RETRY_BACKOFF_SECONDS
+        while True:
+            try:
+                if not group_ready:
+                    self.ensure_group()
+                    group_ready = True
+                messages = self.read_batch()
+                if messages:
+                    done = self.handle_batch(messages)
+                    if done:
+                        self.redis.xack(WEBHOOK_STREAM, WEBHOOK_CONSUMER_GROUP, *done)
+                backoff = RETRY_BACKOFF_SECONDS
+            except Exception as e:
+                # Unacknowledged deliveries are claimed and retried later
+                logger.error(f"Webhook consumer error, retrying in {backoff}s: {e}")
+                if isinstance(e, ResponseError) and "NOGROUP" in str(e):
+                    group_ready = False
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    WebhookConsumer().run()
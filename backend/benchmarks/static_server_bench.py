@@ -0,0 +1,142 @@
+"""
+Load benchmark for the static deployment server.
+
+Generates a synthetic site under a temporary STATIC_ROOT, starts
+app.static_server with uvicorn and reports throughput and latency for a mix
+of full, conditional and range requests.
+
+    cd backend
+    python benchmarks/static_server_bench.py --concurrency 64 --duration 20
+"""
+import os
+import sys
+import gzip
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import httpx
+
+DEPLOYMENT_ID = "bench"
+
+
+def generate_site(root: str, files: int) -> list:
+    """Write HTML pages, fingerprinted assets and images, returning their URL paths"""
+    site = os.path.join(root, DEPLOYMENT_ID)
+    os.makedirs(os.path.join(site, "assets"), exist_ok=True)
+    os.makedirs(os.path.join(site, "images"), exist_ok=True)
+    paths = []
+
+    for i in range(files):
+        page = f"<html><body>{'<p>Lorem ipsum dolor sit amet</p>' * random.randint(20, 400)}</body></html>"
+        name = "index.html" if i == 0 else f"page-{i}.html"
+        with open(os.path.join(site, name), "w") as f:
+            f.write(page)
+        paths.append("/" if i == 0 else f"/page-{i}")
+
+        script = f"function f{i}(){{return {i};}}\n" * random.randint(100, 5000)
+        asset = f"assets/app-{i:08x}.js"
+        with open(os.path.join(site, asset), "w") as f:
+            f.write(script)
+        with open(os.path.join(site, asset + ".gz"), "wb") as f:
+            f.write(gzip.compress(script.encode()))
+        paths.append(f"/{asset}")
+
+        image = f"images/photo-{i}.jpg"
+        with open(os.path.join(site, image), "wb") as f:
+            f.write(os.urandom(random.choice([8 * 1024, 256 * 1024, 2 * 1024 * 1024])))
+        paths.append(f"/{image}")
+
+    return paths
+
+
+async def worker(client: httpx.AsyncClient, paths: list, deadline: float, latencies: list, errors: list):
+    etags = {}
+    while time.monotonic() < deadline:
+        path = random.choice(paths)
+        headers = {"accept-encoding": "br, gzip"}
+        roll = random.random()
+        if roll < 0.3 and path in etags:
+            headers["if-none-match"] = etags[path]
+        elif roll < 0.4:
+            headers["range"] = "bytes=0-65535"
+
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            await response.aread()
+            if response.status_code not in (200, 206, 304):
+                errors.append(response.status_code)
+            elif "etag" in response.headers:
+                etags[path] = response.headers["etag"]
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(base_url: str, paths: list, concurrency: int, duration: float):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"host": f"{DEPLOYMENT_ID}.localhost"}
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=30) as client:
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        await asyncio.gather(*[
+            worker(client, paths, deadline, latencies, errors) for _ in range(concurrency)
+        ])
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    count = len(latencies)
+    print(f"requests:   {count}")
+    print(f"errors:     {len(errors)}")
+    print(f"req/s:      {count / elapsed:.0f}")
+    if count:
+        print(f"p50:        {latencies[count // 2] * 1000:.2f} ms")
+        print(f"p99:        {latencies[min(int(count * 0.99), count - 1)] * 1000:.2f} ms")
+
+
+def wait_until_ready(base_url: str, timeout: float = 15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(base_url, headers={"host": f"{DEPLOYMENT_ID}.localhost"}, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("static server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200, help="pages to generate, each with an asset and an image")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as static_root:
+        paths = generate_site(static_root, args.files)
+        env = {**os.environ, "STATIC_ROOT": static_root, "DEPLOYMENTS_DOMAIN": "localhost"}
+        server = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "app.static_server:app",
+                "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning",
+            ],
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_until_ready(base_url)
+            asyncio.run(run(base_url, paths, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import os
+import datetime
 import sys
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.db.models import Base, User, Project, Deployment, Domain
 from app.core.config import settings
+from app.db.partitions import add_months, ensure_partitions, month_start
 
 def init_db():
     """Initialize the database with necessary tables."""
@@ -15,6 +17,13 @@ def init_db():
         # Create all tables
         Base.metadata.create_all(bind=engine)
         
+        # Deployments are partitioned by month; create this month's and the next few
+        current = month_start(datetime.datetime.utcnow())
+        with engine.begin() as connection:
+            ensure_partitions(
+                connection, current, add_months(current, settings.DEPLOYMENT_PARTITION_PREMAKE_MONTHS)
+            )
+        
         print("Database tables created successfully!")
         return True
     except Exception as e:
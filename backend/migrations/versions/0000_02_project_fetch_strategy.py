@@ -0,0 +1,34 @@
+"""add clone settings to projects
+
+Revision ID: 0000_02_project_fetch_strategy
+Revises: 
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_02_project_fetch_strategy'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    sa.Column("fetch_strategy", sa.String(), nullable=True, server_default="full"),
+    sa.Column("sparse_paths", sa.JSON(), nullable=True),
+)
+
+
+def upgrade():
+    # Existing projects keep cloning the full history
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("projects")}
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("projects", column)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_column("projects", column.name)
@@ -0,0 +1,55 @@
+"""add build fingerprint cache
+
+Revision ID: 0000_03_build_fingerprints
+Revises: 0000_02_project_fetch_strategy
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_03_build_fingerprints'
+down_revision = '0000_02_project_fetch_strategy'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    sa.Column("build_fingerprint", sa.String(), nullable=True),
+    sa.Column("build_cache_hit", sa.Boolean(), nullable=True, server_default=sa.false()),
+    sa.Column("cached_from_deployment_id", sa.String(), nullable=True),
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("build_fingerprints"):
+        op.create_table(
+            "build_fingerprints",
+            sa.Column("fingerprint", sa.String(), primary_key=True),
+            sa.Column("image_tag", sa.String()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("last_used_at", sa.DateTime()),
+            sa.Column("hit_count", sa.Integer()),
+            sa.Column("project_id", sa.String(), sa.ForeignKey("projects.id")),
+            sa.Column("deployment_id", sa.String()),
+        )
+        op.create_index("ix_build_fingerprints_last_used_at", "build_fingerprints", ["last_used_at"])
+        op.create_index("ix_build_fingerprints_project_id", "build_fingerprints", ["project_id"])
+
+    columns = {c["name"] for c in inspector.get_columns("deployments")}
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("deployments", column)
+    indexes = {i["name"] for i in inspector.get_indexes("deployments")}
+    if "ix_deployments_build_fingerprint" not in indexes:
+        op.create_index("ix_deployments_build_fingerprint", "deployments", ["build_fingerprint"])
+
+
+def downgrade():
+    op.drop_index("ix_deployments_build_fingerprint", table_name="deployments")
+    for column in reversed(COLUMNS):
+        op.drop_column("deployments", column.name)
+    op.drop_table("build_fingerprints")
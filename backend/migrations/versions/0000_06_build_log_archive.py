@@ -0,0 +1,35 @@
+"""add build log archive columns to deployments
+
+Revision ID: 0000_06_build_log_archive
+Revises: 0000_03_build_fingerprints
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_06_build_log_archive'
+down_revision = '0000_03_build_fingerprints'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    sa.Column("build_log_archived", sa.Boolean(), nullable=True, server_default=sa.false()),
+    sa.Column("build_log_lines", sa.Integer(), nullable=True),
+    sa.Column("build_log_bytes", sa.Integer(), nullable=True),
+)
+
+
+def upgrade():
+    # Existing deployments keep reading the legacy build_logs column
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("deployments")}
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("deployments", column)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_column("deployments", column.name)
@@ -0,0 +1,35 @@
+"""add static deployment mode
+
+Revision ID: 0000_07_static_deployments
+Revises: 0000_06_build_log_archive
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_07_static_deployments'
+down_revision = '0000_06_build_log_archive'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ("projects", sa.Column("deployment_mode", sa.String(), nullable=True, server_default="container")),
+    ("deployments", sa.Column("artifact_path", sa.String(), nullable=True)),
+    ("build_fingerprints", sa.Column("artifact_path", sa.String(), nullable=True)),
+)
+
+
+def upgrade():
+    # Existing projects keep deploying containers
+    inspector = sa.inspect(op.get_bind())
+    for table, column in COLUMNS:
+        if column.name not in {c["name"] for c in inspector.get_columns(table)}:
+            op.add_column(table, column)
+
+
+def downgrade():
+    for table, column in reversed(COLUMNS):
+        op.drop_column(table, column.name)
@@ -0,0 +1,32 @@
+"""add upstream_url to deployments
+
+Revision ID: 0000_10_deployment_upstream_url
+Revises: 0000_07_static_deployments
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_10_deployment_upstream_url'
+down_revision = '0000_07_static_deployments'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    sa.Column("upstream_url", sa.String(), nullable=True),
+)
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("deployments")}
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("deployments", column)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_column("deployments", column.name)
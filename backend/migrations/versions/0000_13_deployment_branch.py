@@ -0,0 +1,32 @@
+"""add branch to deployments
+
+Revision ID: 0000_13_deployment_branch
+Revises: 0000_12_deployment_stage
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_13_deployment_branch'
+down_revision = '0000_12_deployment_stage'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    sa.Column("branch", sa.String(), nullable=True),
+)
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("deployments")}
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("deployments", column)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_column("deployments", column.name)
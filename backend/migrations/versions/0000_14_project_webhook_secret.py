@@ -0,0 +1,32 @@
+"""add webhook_secret to projects
+
+Revision ID: 0000_14_project_webhook_secret
+Revises: 0000_13_deployment_branch
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0000_14_project_webhook_secret'
+down_revision = '0000_13_deployment_branch'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    sa.Column("webhook_secret", sa.String(), nullable=True),
+)
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("projects")}
+    for column in COLUMNS:
+        if column.name not in columns:
+            op.add_column("projects", column)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_column("projects", column.name)
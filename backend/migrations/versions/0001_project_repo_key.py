@@ -0,0 +1,53 @@
+"""add normalized repo_key to projects
+
+Revision ID: 0001_project_repo_key
+Revises: 0000_14_project_webhook_secret
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.repository import normalize_repository_url
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_project_repo_key'
+down_revision = '0000_14_project_webhook_secret'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created by init_db.py may already have the column and index
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("projects")}
+    indexes = {i["name"] for i in inspector.get_indexes("projects")}
+
+    if "repo_key" not in columns:
+        op.add_column("projects", sa.Column("repo_key", sa.String(), nullable=True))
+    if "ix_projects_repo_key_branch" not in indexes:
+        op.create_index("ix_projects_repo_key_branch", "projects", ["repo_key", "branch"])
+
+    # Backfill with the same normalizer the application uses
+    projects = sa.table(
+        "projects",
+        sa.column("id", sa.String),
+        sa.column("repository_url", sa.String),
+        sa.column("repo_key", sa.String),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(projects.c.id, projects.c.repository_url).where(projects.c.repo_key.is_(None))
+    ).fetchall()
+    for project_id, repository_url in rows:
+        bind.execute(
+            projects.update()
+            .where(projects.c.id == project_id)
+            .values(repo_key=normalize_repository_url(repository_url or ""))
+        )
+
+
+def downgrade():
+    op.drop_index("ix_projects_repo_key_branch", table_name="projects")
+    op.drop_column("projects", "repo_key")
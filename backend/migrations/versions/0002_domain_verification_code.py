@@ -0,0 +1,26 @@
+"""add verification_code to domains
+
+Revision ID: 0002_domain_verification_code
+Revises: 0001_project_repo_key
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_domain_verification_code'
+down_revision = '0001_project_repo_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("domains")}
+    if "verification_code" not in columns:
+        op.add_column("domains", sa.Column("verification_code", sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("domains", "verification_code")
@@ -0,0 +1,34 @@
+"""index project ownership and team membership
+
+Revision ID: 0003_membership_indexes
+Revises: 0002_domain_verification_code
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_membership_indexes'
+down_revision = '0002_domain_verification_code'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_projects_owner_id", "projects", ["owner_id"]),
+    ("ix_project_team_members_project_user", "project_team_members", ["project_id", "user_id"]),
+    ("ix_project_team_members_user", "project_team_members", ["user_id"]),
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,41 @@
+"""index deployment history for keyset pagination
+
+Revision ID: 0004_deployment_history_indexes
+Revises: 0003_membership_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_deployment_history_indexes'
+down_revision = '0003_membership_indexes'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_deployments_project_history", "project_id"),
+    ("ix_deployments_user_history", "user_id"),
+)
+
+
+def upgrade():
+    existing = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("deployments")}
+    # Build without blocking deployment writes on large tables
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES:
+            if name not in existing:
+                op.create_index(
+                    name,
+                    "deployments",
+                    [column, sa.text("created_at DESC"), sa.text("id DESC")],
+                    postgresql_concurrently=True,
+                )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="deployments", postgresql_concurrently=True)
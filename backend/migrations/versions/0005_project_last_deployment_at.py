@@ -0,0 +1,39 @@
+"""add last_deployment_at to projects
+
+Revision ID: 0005_project_last_deployment_at
+Revises: 0004_deployment_history_indexes
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_project_last_deployment_at'
+down_revision = '0004_deployment_history_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("projects")}
+    if "last_deployment_at" not in columns:
+        op.add_column("projects", sa.Column("last_deployment_at", sa.DateTime(), nullable=True))
+
+    # Backfill from the newest deployment of each project
+    op.execute(
+        """
+        UPDATE projects
+        SET last_deployment_at = (
+            SELECT max(deployments.created_at)
+            FROM deployments
+            WHERE deployments.project_id = projects.id
+        )
+        WHERE last_deployment_at IS NULL
+        """
+    )
+
+
+def downgrade():
+    op.drop_column("projects", "last_deployment_at")
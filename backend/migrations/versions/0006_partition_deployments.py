@@ -0,0 +1,89 @@
+"""partition deployments by month of created_at
+
+Revision ID: 0006_partition_deployments
+Revises: 0005_project_last_deployment_at
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db.partitions import add_months, ensure_partitions, is_partitioned, month_start
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_partition_deployments'
+down_revision = '0005_project_last_deployment_at'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_deployments_build_fingerprint", "(build_fingerprint)"),
+    ("ix_deployments_project_history", "(project_id, created_at DESC, id DESC)"),
+    ("ix_deployments_user_history", "(user_id, created_at DESC, id DESC)"),
+)
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("deployments")}
+    if "restored_at" not in columns:
+        op.add_column("deployments", sa.Column("restored_at", sa.DateTime(), nullable=True))
+
+    if bind.dialect.name != "postgresql" or is_partitioned(bind):
+        return
+
+    # Rebuild the table partitioned, copying every row into its month
+    op.execute("UPDATE deployments SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL")
+    op.execute(
+        "CREATE TABLE deployments_partitioned (LIKE deployments INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    op.execute("ALTER TABLE deployments_partitioned ALTER COLUMN created_at SET NOT NULL")
+    op.execute(
+        "ALTER TABLE deployments_partitioned "
+        "ADD CONSTRAINT deployments_partitioned_pkey PRIMARY KEY (id, created_at)"
+    )
+
+    current = month_start(datetime.datetime.utcnow())
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM deployments")).scalar()
+    ensure_partitions(
+        bind,
+        month_start(oldest) if oldest else current,
+        add_months(current, settings.DEPLOYMENT_PARTITION_PREMAKE_MONTHS),
+        table="deployments_partitioned",
+    )
+    op.execute("INSERT INTO deployments_partitioned SELECT * FROM deployments")
+
+    op.execute("DROP TABLE deployments")
+    op.execute("ALTER TABLE deployments_partitioned RENAME TO deployments")
+    op.execute("ALTER TABLE deployments RENAME CONSTRAINT deployments_partitioned_pkey TO deployments_pkey")
+    op.execute(
+        "ALTER TABLE deployments ADD FOREIGN KEY (project_id) REFERENCES projects (id), "
+        "ADD FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+
+    # Partitioned indexes cascade to every partition
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON deployments {columns}")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and is_partitioned(bind):
+        op.execute("CREATE TABLE deployments_plain (LIKE deployments INCLUDING DEFAULTS)")
+        op.execute("INSERT INTO deployments_plain SELECT * FROM deployments")
+        op.execute("DROP TABLE deployments CASCADE")
+        op.execute("ALTER TABLE deployments_plain RENAME TO deployments")
+        op.execute(
+            "ALTER TABLE deployments ADD PRIMARY KEY (id), "
+            "ADD FOREIGN KEY (project_id) REFERENCES projects (id), "
+            "ADD FOREIGN KEY (user_id) REFERENCES users (id)"
+        )
+        for name, columns in INDEXES:
+            op.execute(f"CREATE INDEX {name} ON deployments {columns}")
+
+    op.drop_column("deployments", "restored_at")
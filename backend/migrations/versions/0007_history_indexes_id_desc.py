@@ -0,0 +1,48 @@
+"""order deployment history indexes by id descending
+
+Revision ID: 0007_history_indexes_id_desc
+Revises: 0006_partition_deployments
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_history_indexes_id_desc'
+down_revision = '0006_partition_deployments'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("ix_deployments_project_history", "project_id"),
+    ("ix_deployments_user_history", "user_id"),
+)
+
+
+def index_definition(bind, name):
+    return bind.execute(
+        sa.text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"), {"name": name}
+    ).scalar()
+
+
+def rebuild(id_order):
+    # Keyset pages compare (created_at, id) as one row, which an index only
+    # serves as a single range when both columns run in the query's order
+    bind = op.get_bind()
+    suffix = "created_at DESC, id DESC)" if id_order == "DESC" else "created_at DESC, id)"
+    for name, column in INDEXES:
+        if bind.dialect.name == "postgresql" and (index_definition(bind, name) or "").endswith(suffix):
+            continue
+        # The partitioned table cannot be indexed concurrently
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+        op.execute(f"CREATE INDEX {name} ON deployments ({column}, created_at DESC, id {id_order})")
+
+
+def upgrade():
+    rebuild("DESC")
+
+
+def downgrade():
+    rebuild("ASC")
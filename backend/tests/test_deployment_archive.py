@@ -0,0 +1,109 @@
+import os
+import datetime
+
+import pytest
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.db.models import Deployment, Project
+from app.db.partitions import add_months, ensure_partitions, list_partitions, month_start, partition_name
+from app.services.deployment_archive import deployment_archive
+from app.services.log_archive import build_log_archive
+
+
+def expired_deployment(engine, db, project, **values) -> Deployment:
+    """A finished deployment created well before the retention window, with its partition"""
+    created_at = datetime.datetime.utcnow() - datetime.timedelta(days=settings.DEPLOYMENT_RETENTION_DAYS + 40)
+    current = month_start(datetime.datetime.utcnow())
+    with engine.begin() as connection:
+        ensure_partitions(connection, month_start(created_at), current)
+
+    deployment = Deployment(
+        project_id=project.id,
+        user_id=project.owner_id,
+        commit_hash="abc123",
+        status="failed",
+        error_message="Build failed with exit code 1",
+        created_at=created_at,
+        **values,
+    )
+    db.add(deployment)
+    db.commit()
+    return deployment
+
+
+def find(db, deployment_id: str):
+    db.expire_all()
+    return db.scalars(select(Deployment).where(Deployment.id == deployment_id)).first()
+
+
+def test_archive_and_restore_round_trip(engine, db, project):
+    deployment = expired_deployment(engine, db, project, build_logs="Installing\nBuilding\n")
+    deployment_id, created_at = deployment.id, deployment.created_at
+
+    assert deployment_archive.archive_expired() == 1
+    assert find(db, deployment_id) is None
+    record = deployment_archive.load(deployment_id)
+    assert record["project_id"] == project.id
+    assert record["created_at"] == created_at
+    assert record["build_log_archived"] is True
+
+    assert deployment_archive.restore(deployment_id) == project.id
+    restored = find(db, deployment_id)
+    assert restored.created_at == created_at
+    assert restored.status == "failed"
+    assert restored.error_message == "Build failed with exit code 1"
+    assert restored.restored_at is not None
+    assert restored.build_logs is None
+    assert deployment_archive.load(deployment_id) is None
+
+    index = build_log_archive.index(deployment_id)
+    assert build_log_archive.read_lines(deployment_id, index, 0, 10) == ["Installing\n", "Building\n"]
+
+    # Restored deployments get a fresh retention window
+    assert deployment_archive.archive_expired() == 0
+
+
+def test_production_deployment_is_not_archived(engine, db, project):
+    deployment = expired_deployment(engine, db, project)
+    deployment.status = "ready"
+    db.commit()
+
+    assert deployment_archive.archive_expired() == 0
+    assert find(db, deployment.id) is not None
+
+
+def test_restore_skips_deployments_of_deleted_projects(engine, db, project):
+    deployment_id = expired_deployment(engine, db, project).id
+    assert deployment_archive.archive_expired() == 1
+
+    db.delete(db.get(Project, project.id))
+    db.commit()
+
+    assert deployment_archive.restore(deployment_id) is None
+    assert find(db, deployment_id) is None
+    # The archived record is kept
+    assert deployment_archive.load(deployment_id) is not None
+
+
+def test_drop_expired_partitions_keeps_non_empty_months(engine, db, project):
+    kept = expired_deployment(engine, db, project)
+    kept.status = "ready"
+    db.commit()
+    current = month_start(datetime.datetime.utcnow())
+    empty = add_months(month_start(kept.created_at), -1)
+    with engine.begin() as connection:
+        ensure_partitions(connection, empty, current)
+
+    dropped = deployment_archive.drop_expired_partitions()
+
+    assert partition_name(empty) in dropped
+    with engine.connect() as connection:
+        partitions = list_partitions(connection)
+        assert partition_name(empty) not in partitions
+        assert partition_name(month_start(kept.created_at)) in partitions
+        assert connection.execute(text("SELECT count(*) FROM deployments")).scalar() == 1
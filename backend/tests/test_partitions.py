@@ -0,0 +1,71 @@
+import os
+import datetime
+
+import pytest
+
+if not os.getenv("TEST_DATABASE_URL"):
+    pytest.skip("TEST_DATABASE_URL is not set", allow_module_level=True)
+
+from sqlalchemy import text
+
+from app.db.models import Deployment
+from app.db.partitions import (
+    DEFAULT_PARTITION,
+    add_months,
+    ensure_partitions,
+    list_partitions,
+    month_start,
+    partition_name,
+)
+
+
+def count(connection, table: str) -> int:
+    return connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def test_create_partition_moves_rows_out_of_the_default_partition(engine, db, project):
+    current = month_start(datetime.datetime.utcnow())
+    later = add_months(current, 6)
+    with engine.begin() as connection:
+        ensure_partitions(connection, current, current)
+
+    # No partition covers this month yet, so the row lands in the default one
+    deployment = Deployment(
+        project_id=project.id,
+        user_id=project.owner_id,
+        commit_hash="abc123",
+        status="failed",
+        created_at=datetime.datetime(later.year, later.month, 15),
+    )
+    db.add(deployment)
+    db.commit()
+    with engine.connect() as connection:
+        assert count(connection, DEFAULT_PARTITION) == 1
+
+    with engine.begin() as connection:
+        created = ensure_partitions(connection, later, later)
+
+    name = partition_name(later)
+    assert created == [name]
+    with engine.connect() as connection:
+        assert count(connection, DEFAULT_PARTITION) == 0
+        assert count(connection, name) == 1
+        assert name in list_partitions(connection)
+        # The default partition is attached again for later inserts
+        assert DEFAULT_PARTITION in connection.execute(
+            text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'deployments'::regclass")
+        ).scalars().all()
+
+    db.expire_all()
+    assert db.get(Deployment, deployment.id).commit_hash == "abc123"
+
+
+def test_ensure_partitions_skips_existing_months(engine):
+    current = month_start(datetime.datetime.utcnow())
+    with engine.begin() as connection:
+        first = ensure_partitions(connection, current, add_months(current, 1))
+    with engine.begin() as connection:
+        second = ensure_partitions(connection, current, add_months(current, 2))
+
+    assert first == [partition_name(current), partition_name(add_months(current, 1))]
+    assert second == [partition_name(add_months(current, 2))]
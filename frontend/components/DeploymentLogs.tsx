@@ -35,12 +35,17 @@ const DeploymentLogs: React.FC<DeploymentLogsProps> = ({ deploymentId }) => {
       const response = await api.get(`/deployments/${deploymentId}`);
       setDeployment(response.data);
       
+      // Build logs are stored out of the deployment record
+      const logsResponse = await api.get(`/deployments/${deploymentId}/logs`, {
+        params: { tail: 5000 },
+      });
+      
       // Set logs from deployment data
       let logContent = '';
       
-      if (response.data.build_logs) {
+      if (logsResponse.data.lines.length) {
         logContent += "=== BUILD LOGS ===\n";
-        logContent += response.data.build_logs;
+        logContent += logsResponse.data.lines.join('');
         logContent += "\n\n";
       }
       